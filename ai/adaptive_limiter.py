@@ -0,0 +1,160 @@
+"""AIMD concurrency limiter with priority admission for LLM calls."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+from config import settings
+from shared.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitError(Exception):
+    """The LLM API asked us to slow down (HTTP 429 or 503)."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header in either of its forms."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """Cap concurrent LLM calls with a limit that adapts to the upstream.
+
+    Each successful call adds ``1 / limit`` to the limit, about one extra
+    slot per round of calls; a rate-limit response multiplies it by
+    ``backoff`` and holds new admissions until its Retry-After has passed.
+    Waiting calls are admitted lowest priority value first, so interactive
+    and short turns overtake background work.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float,
+        min_limit: float,
+        max_limit: float,
+        backoff: float,
+        default_retry_after: float,
+    ) -> None:
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.backoff = backoff
+        self.default_retry_after = default_retry_after
+        self.in_flight = 0
+        self._waiters: list[tuple[tuple, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._resume: asyncio.TimerHandle | None = None
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, f in self._waiters if not f.done())
+
+    def has_capacity(self) -> bool:
+        """Whether a call would be admitted right now without queueing."""
+        return self._has_capacity() and not self.queued
+
+    @asynccontextmanager
+    async def slot(self, priority: tuple = ()) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of a call."""
+        await self._acquire(priority)
+        try:
+            yield
+        except RateLimitError as e:
+            self._on_rate_limited(e.retry_after)
+            raise
+        else:
+            self._on_success()
+        finally:
+            self.release()
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free now; pair with release().
+
+        Used for extra attempts such as hedges, which should not move the
+        limit on their own.
+        """
+        if not self.has_capacity():
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _has_capacity(self) -> bool:
+        return (
+            self.in_flight < int(self.limit) and time.monotonic() >= self._paused_until
+        )
+
+    async def _acquire(self, priority: tuple) -> None:
+        if self.has_capacity():
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        metrics.increment("llm_calls_queued")
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled: hand the slot on
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def _on_rate_limited(self, retry_after: float | None) -> None:
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        delay = retry_after if retry_after is not None else self.default_retry_after
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        metrics.increment("llm_rate_limited")
+        logger.warning(
+            f"LLM rate limited; limit now {self.limit:.1f}, pausing {delay:.1f}s"
+        )
+        if self._resume is not None:
+            self._resume.cancel()
+        self._resume = asyncio.get_running_loop().call_later(
+            self._paused_until - time.monotonic(), self._wake
+        )
+
+
+llm_limiter = AdaptiveLimiter(
+    initial_limit=settings.LLM_CONCURRENCY_INITIAL,
+    min_limit=settings.LLM_CONCURRENCY_MIN,
+    max_limit=settings.LLM_CONCURRENCY_MAX,
+    backoff=settings.LLM_CONCURRENCY_BACKOFF,
+    default_retry_after=settings.LLM_DEFAULT_RETRY_AFTER,
+)
@@ -1,23 +1,37 @@
 import logging
+from collections.abc import AsyncIterator
 from typing import Any
 from ai.deepseek_models import ChatCompletion
 from config import settings
 from ai.mcp_service import DeepSeekService
 from ai.mcp_client import MCPClient
 from ai.mcp_models import AgentMessage
+from ai.single_flight import Flight, SingleFlight
+from ai.stream_segmenter import segment_stream
+from cache import CacheManager
+from shared.metrics import metrics
 
 
 from messaging.models import MCPMessage, MCPRequest, MCPResponse
 
 
 class AgentService:
-    def __init__(self):
+    def __init__(self, cache_manager: CacheManager | None = None):
+        self.cache_manager = cache_manager
         self.api_key = settings.DEEPSEEK_API_KEY
         self.base_url = settings.DEEPSEEK_BASE_URL
         self.model = settings.DEEPSEEK_MODEL
         self.logger = logging.getLogger(__name__)
         self.deepseek_service = DeepSeekService()
-        self.mcp_client = MCPClient()  # Placeholder for MCP client if needed
+        # Placeholder for MCP client if needed
+        self.mcp_client = MCPClient(self.deepseek_service)
+        self.single_flight: SingleFlight | None = None
+        if cache_manager is not None and settings.SINGLE_FLIGHT_ENABLED:
+            self.single_flight = SingleFlight(
+                cache_manager,
+                lock_ttl=settings.SINGLE_FLIGHT_LOCK_TTL,
+                wait_timeout=settings.SINGLE_FLIGHT_WAIT_TIMEOUT,
+            )
 
     async def send(
         self,
@@ -25,28 +39,132 @@ class AgentService:
         max_tokens: int = 2048,
         temperature: float = 0.4,
         stream: bool = False,
+        deadline: float | None = None,
     ) -> MCPResponse:
+        """Answer from the cache or the LLM.
+
+        ``deadline`` is an absolute ``time.time()`` by which the LLM must
+        answer; DeadlineExceeded is raised when it passes.
+        """
+        cache_text = self._cache_text(messages)
+        cached = await self._get_cached(cache_text)
+        if cached is not None:
+            return MCPResponse(response=cached)
+        flight = await self._begin_flight(cache_text, deadline)
+        if flight is not None and flight.answer is not None:
+            return MCPResponse(response=flight.answer)
+
         result = None
+        content = None
         try:
-            # Fallback to DeepSeekService
-            result = await self.deepseek_service.chat_completion(
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stream=stream,
-            )
+            if settings.MCP_TOOLS_ENABLED:
+                result = await self.mcp_client.run(messages, deadline=deadline)
+            else:
+                # Fallback to DeepSeekService
+                result = await self.deepseek_service.chat_completion(
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=stream,
+                    deadline=deadline,
+                )
             logging.debug(f"DeepSeekService result: {result}")
             content = (
                 result.content if isinstance(result, ChatCompletion) else str(result)
             )
+            if cache_text is not None:
+                await self.cache_manager.set_cached_response(cache_text, content)
             return MCPResponse(response=content)
         except Exception as e:
             self.logger.error(f"Error in MCPClient send_message: {e}")
             raise
+        finally:
+            if flight is not None and flight.leader:
+                await self.single_flight.finish(flight, content)
 
-    async def close(self):
-        # await self.client.aclose()
-        pass
+    async def send_stream(
+        self,
+        messages: list[AgentMessage],
+        max_tokens: int = 2048,
+        deadline: float | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield the reply in sentence or paragraph sized segments."""
+        cache_text = self._cache_text(messages)
+        cached = await self._get_cached(cache_text)
+        if cached is not None:
+            yield cached
+            return
+        flight = await self._begin_flight(cache_text, deadline)
+        if flight is not None and flight.answer is not None:
+            # Another request streamed this answer; it arrives in one piece
+            yield flight.answer
+            return
 
+        content = None
+        if settings.MCP_TOOLS_ENABLED:
+            # Tool rounds need whole responses; send the answer in one piece
+            try:
+                result = await self.mcp_client.run(messages, deadline=deadline)
+                content = result.content
+                if cache_text is not None:
+                    await self.cache_manager.set_cached_response(cache_text, content)
+            finally:
+                if flight is not None and flight.leader:
+                    await self.single_flight.finish(flight, content)
+            yield content
+            return
 
-agent_service = AgentService()
+        try:
+            deltas = self.deepseek_service.stream_completion(
+                messages=messages, max_tokens=max_tokens, deadline=deadline
+            )
+            segments = []
+            async for segment in segment_stream(
+                deltas,
+                min_chars=settings.STREAM_MIN_SEGMENT_CHARS,
+                max_chars=settings.STREAM_MAX_SEGMENT_CHARS,
+            ):
+                segments.append(segment)
+                yield segment
+            content = "\n\n".join(segments)
+            if cache_text is not None:
+                await self.cache_manager.set_cached_response(cache_text, content)
+        finally:
+            if flight is not None and flight.leader:
+                await self.single_flight.finish(flight, content)
+
+    async def regenerate(self, message: str) -> str:
+        """Answer a cached message again, bypassing the cache."""
+        result = await self.deepseek_service.chat_completion(
+            messages=[AgentMessage(role="user", content=message)], background=True
+        )
+        return result.content
+
+    async def _begin_flight(
+        self, cache_text: str | None, deadline: float | None = None
+    ) -> Flight | None:
+        if cache_text is None or self.single_flight is None:
+            return None
+        return await self.single_flight.begin(cache_text, deadline)
+
+    def _cache_text(self, messages: list[AgentMessage]) -> str | None:
+        if self.cache_manager is None:
+            return None
+        cache_text = self.cache_manager.cacheable_message(messages)
+        if cache_text is None:
+            metrics.increment("cache_uncacheable")
+        return cache_text
+
+    async def _get_cached(self, cache_text: str | None) -> str | None:
+        if cache_text is None:
+            return None
+        cached = await self.cache_manager.get_cached_response(cache_text)
+        if cached is None:
+            metrics.increment("cache_misses")
+            return None
+        metrics.increment("cache_hits")
+        return cached["response"]
+
+    async def close(self):
+        await self.mcp_client.close()
+        await self.deepseek_service.close()
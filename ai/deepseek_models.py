@@ -14,3 +14,4 @@ class DeepSeekChatResponse(BaseModel):
 class ChatCompletion(BaseModel):
     content: str
     model: str
+    tool_calls: list[dict[str, Any]] | None = None
@@ -0,0 +1,60 @@
+"""Reply deadlines and hedging policy for LLM requests."""
+
+import asyncio
+import time
+from collections import deque
+
+
+class DeadlineExceeded(TimeoutError):
+    """The reply's latency budget ran out before the LLM answered."""
+
+
+def deadline_timeout(deadline: float | None) -> asyncio.Timeout:
+    """Timeout context for an absolute ``time.time()`` deadline, if any."""
+    if deadline is None:
+        return asyncio.timeout(None)
+    return asyncio.timeout(deadline - time.time())
+
+
+class HedgePolicy:
+    """Decide when to send a backup request and how many are allowed.
+
+    The hedge delay is a quantile of recent time-to-first-byte samples.
+    Each request earns ``budget_percent / 100`` of a hedge token and each
+    hedge spends one, so hedges stay near that share of traffic even when
+    the upstream is slow for everyone.
+    """
+
+    def __init__(
+        self,
+        quantile: float,
+        min_samples: int,
+        window: int,
+        budget_percent: float,
+        max_tokens: float = 10.0,
+    ) -> None:
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.budget_ratio = budget_percent / 100
+        self.max_tokens = max_tokens
+        self._samples: deque[float] = deque(maxlen=window)
+        self._tokens = 0.0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def delay(self) -> float | None:
+        """Seconds to wait for a first byte before hedging; None when unsure."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+    def on_request(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.budget_ratio)
+
+    def try_acquire(self) -> bool:
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
@@ -0,0 +1,155 @@
+"""Latency-aware routing over several OpenAI-compatible LLM backends."""
+
+import logging
+import time
+from collections.abc import Iterable
+
+from ai.llm_transport import LLMTransport, llm_transport
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    """One OpenAI-compatible endpoint and its live routing statistics."""
+
+    __slots__ = (
+        "name",
+        "transport",
+        "model",
+        "models",
+        "weight",
+        "outstanding",
+        "latency",
+        "error_rate",
+        "down_until",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        transport: LLMTransport,
+        model: str,
+        weight: float = 1.0,
+        models: dict[str, str] | None = None,
+    ) -> None:
+        self.name = name
+        self.transport = transport
+        self.model = model
+        # Requested model -> name served here; None serves any name as given
+        self.models = models
+        self.weight = weight
+        self.outstanding = 0
+        # EWMA of seconds to response headers; None until the first success
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.down_until = 0.0
+
+    def model_for(self, requested: str | None) -> str:
+        """Name to send for ``requested``, falling back to our own model."""
+        if requested is None:
+            return self.model
+        if self.models is None:
+            return requested
+        return self.models.get(requested, self.model)
+
+
+class LLMRouter:
+    """Pick the backend with the lowest expected wait.
+
+    A backend's score is its EWMA latency scaled by requests in flight
+    plus one, inflated by its EWMA error rate and divided by its weight;
+    the lowest score wins. Backends without a successful sample are scored
+    at the mean latency of the others, or ``default_latency`` when none
+    has one, so a new backend competes on equal terms and one that only
+    ever fails still pays its error penalty. A failed backend sits out
+    ``cooldown`` seconds unless every backend is cooling down.
+    """
+
+    def __init__(
+        self,
+        backends: list[Backend],
+        alpha: float = 0.3,
+        error_weight: float = 4.0,
+        cooldown: float = 10.0,
+        default_latency: float = 1.0,
+    ) -> None:
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self.alpha = alpha
+        self.error_weight = error_weight
+        self.cooldown = cooldown
+        self.default_latency = default_latency
+
+    @classmethod
+    def from_settings(cls) -> "LLMRouter":
+        """DeepSeek on the shared transport, plus any LLM_BACKENDS entries."""
+        backends = [Backend("deepseek", llm_transport, settings.DEEPSEEK_MODEL)]
+        for entry in settings.LLM_BACKENDS:
+            transport = LLMTransport(
+                base_url=entry["base_url"], api_key=entry.get("api_key", "")
+            )
+            backends.append(
+                Backend(
+                    entry["name"],
+                    transport,
+                    entry.get("model", settings.DEEPSEEK_MODEL),
+                    float(entry.get("weight", 1.0)),
+                    entry.get("models", {}),
+                )
+            )
+        return cls(
+            backends,
+            alpha=settings.LLM_ROUTER_EWMA_ALPHA,
+            error_weight=settings.LLM_ROUTER_ERROR_WEIGHT,
+            cooldown=settings.LLM_BACKEND_COOLDOWN,
+            default_latency=settings.LLM_ROUTER_DEFAULT_LATENCY,
+        )
+
+    def _prior_latency(self) -> float:
+        sampled = [b.latency for b in self.backends if b.latency is not None]
+        return sum(sampled) / len(sampled) if sampled else self.default_latency
+
+    def score(self, backend: Backend) -> float:
+        latency = backend.latency
+        if latency is None:
+            latency = self._prior_latency()
+        penalty = 1.0 + self.error_weight * backend.error_rate
+        return (backend.outstanding + 1) * latency * penalty / backend.weight
+
+    def choose(self, exclude: Iterable[str] = ()) -> Backend:
+        """Return the best backend not in ``exclude``, if any is left."""
+        excluded = set(exclude)
+        candidates = [b for b in self.backends if b.name not in excluded]
+        candidates = candidates or self.backends
+        now = time.monotonic()
+        healthy = [b for b in candidates if b.down_until <= now]
+        return min(
+            healthy or candidates,
+            key=lambda b: (self.score(b), b.outstanding / b.weight),
+        )
+
+    def record_success(self, backend: Backend, latency: float) -> None:
+        if backend.latency is None:
+            backend.latency = latency
+        else:
+            backend.latency += self.alpha * (latency - backend.latency)
+        backend.error_rate *= 1.0 - self.alpha
+        backend.down_until = 0.0
+
+    def record_failure(self, backend: Backend) -> None:
+        backend.error_rate += self.alpha * (1.0 - backend.error_rate)
+        if backend.down_until <= time.monotonic():
+            logger.warning(
+                f"LLM backend {backend.name} failed; "
+                f"skipping it for {self.cooldown:.0f}s"
+            )
+        backend.down_until = time.monotonic() + self.cooldown
+
+    async def aclose(self) -> None:
+        for backend in self.backends:
+            await backend.transport.close()
+
+
+llm_router = LLMRouter.from_settings()
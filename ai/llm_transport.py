@@ -0,0 +1,75 @@
+"""Shared, pooled HTTP transport for OpenAI-compatible LLM APIs."""
+
+import logging
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class LLMTransport:
+    """Own one keep-alive connection pool per LLM endpoint.
+
+    The client is created on first use and closed by the application
+    lifespan, so every caller shares warm connections instead of paying a
+    TLS handshake per message.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: float = settings.LLM_TIMEOUT,
+        connect_timeout: float = settings.LLM_CONNECT_TIMEOUT,
+        max_connections: int = settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = settings.LLM_KEEPALIVE_EXPIRY,
+        http2: bool = settings.LLM_HTTP2,
+    ) -> None:
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.warning("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1")
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+llm_transport = LLMTransport(
+    base_url=settings.DEEPSEEK_BASE_URL, api_key=settings.DEEPSEEK_API_KEY
+)
@@ -1,18 +1,330 @@
-import ai.mcp_service as mcp_service
-from config import settings
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import time
+from typing import Any
+
+import httpx
 
-from ai.mcp_models import AgentMessage, CallToolResult, ContentType, TextContent
+from ai.deepseek_models import ChatCompletion
+from ai.mcp_models import (
+    AgentMessage,
+    CallToolRequest,
+    CallToolResult,
+    ListToolsResult,
+    TextContent,
+    ToolDefinition,
+    ToolType,
+)
+from ai.mcp_service import DeepSeekService
+from config import settings
+from local_cache import LocalCache
 from messaging.models import MCPRequest, MCPResponse
+from shared.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MCP_PROTOCOL_VERSION = "2025-03-26"
+
+
+class MCPError(Exception):
+    """The MCP server answered a JSON-RPC request with an error."""
 
 
 class MCPClient:
-    def __init__(self) -> None:
+    """Talk JSON-RPC to the MCP server and run the model's tool calls.
+
+    The session is initialized on first use. In run(), every round's tool
+    calls execute concurrently, each under its own timeout, so a turn that
+    needs several tools costs one round trip of wall-clock time.
+
+    The tool catalog is cached for ``tools_ttl`` seconds or until the
+    server reports that it changed. Results of tools annotated read-only
+    or idempotent, or given a TTL in MCP_TOOL_RESULT_TTLS, are memoized
+    by tool name and canonical arguments in a size-bounded LRU.
+    """
+
+    def __init__(self, deepseek_service: DeepSeekService) -> None:
+        self.deepseek_service = deepseek_service
         self.base_url = settings.MCP_SERVER_URL
         self.headers = {
             "Authorization": f"Bearer {settings.MCP_API_KEY}",
             "Content-Type": "application/json",
+            "Accept": "application/json, text/event-stream",
+        }
+        self.tool_timeout = settings.MCP_TOOL_TIMEOUT
+        self.tool_timeouts: dict[str, float] = settings.MCP_TOOL_TIMEOUTS
+        self.max_iterations = settings.MCP_MAX_TOOL_ITERATIONS
+        self.tools_ttl = settings.MCP_TOOLS_CACHE_TTL
+        self.result_ttls: dict[str, float] = settings.MCP_TOOL_RESULT_TTLS
+        self.results = LocalCache(
+            max_bytes=settings.MCP_TOOL_RESULT_CACHE_MAX_BYTES,
+            ttl=settings.MCP_TOOL_RESULT_TTL,
+        )
+        self._tools: ListToolsResult | None = None
+        self._tools_expires_at = 0.0
+        self._tools_lock = asyncio.Lock()
+        self._memoized: set[str] = set()
+        self._client: httpx.AsyncClient | None = None
+        self._ids = itertools.count(1)
+        self._session_id: str | None = None
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers, timeout=settings.MCP_TIMEOUT
+            )
+        return self._client
+
+    async def _post(self, payload: dict[str, Any]) -> httpx.Response:
+        headers = {}
+        if self._session_id is not None:
+            headers["Mcp-Session-Id"] = self._session_id
+        response = await self.client.post(self.base_url, json=payload, headers=headers)
+        response.raise_for_status()
+        return response
+
+    def _parse(self, response: httpx.Response) -> dict[str, Any]:
+        """Read a JSON-RPC reply sent as JSON or as server-sent events.
+
+        Notifications that arrive ahead of the reply are handled here.
+        """
+        if not response.headers.get("content-type", "").startswith("text/event-stream"):
+            return response.json()
+        reply: dict[str, Any] = {}
+        for line in response.text.splitlines():
+            if not line.startswith("data:"):
+                continue
+            message = json.loads(line[5:])
+            if message.get("method") == "notifications/tools/list_changed":
+                self.invalidate_tools()
+            elif "id" in message:
+                reply = message
+        return reply
+
+    async def _rpc(self, method: str, params: dict[str, Any] | None = None) -> Any:
+        payload = {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params or {},
+        }
+        session_id = self._session_id
+        try:
+            response = await self._post(payload)
+        except httpx.HTTPStatusError as e:
+            # The server dropped our session (restart or expiry); start over once
+            if e.response.status_code != 404 or session_id is None:
+                raise
+            await self._restart_session(session_id)
+            response = await self._post(payload)
+        reply = self._parse(response)
+        if "error" in reply:
+            error = reply["error"]
+            raise MCPError(f"MCP error {error.get('code')}: {error.get('message')}")
+        return reply.get("result", {})
+
+    async def _ensure_initialized(self) -> None:
+        async with self._init_lock:
+            if self._initialized:
+                return
+            response = await self._post(
+                {
+                    "jsonrpc": "2.0",
+                    "id": next(self._ids),
+                    "method": "initialize",
+                    "params": {
+                        "protocolVersion": MCP_PROTOCOL_VERSION,
+                        "capabilities": {},
+                        "clientInfo": {
+                            "name": "evolution-mcp-bridge",
+                            "version": "1.0",
+                        },
+                    },
+                }
+            )
+            self._session_id = response.headers.get("mcp-session-id")
+            await self._post({"jsonrpc": "2.0", "method": "notifications/initialized"})
+            self._initialized = True
+
+    async def _restart_session(self, stale_session_id: str) -> None:
+        async with self._init_lock:
+            # Concurrent callers may have restarted it already
+            if self._session_id == stale_session_id:
+                logger.warning(f"MCP session {stale_session_id} expired, reconnecting")
+                metrics.increment("mcp_session_restarts")
+                self._session_id = None
+                self._initialized = False
+        await self._ensure_initialized()
+
+    async def health_check(self) -> bool:
+        """Whether the MCP server answers a ping."""
+        try:
+            await self._ensure_initialized()
+            await self._rpc("ping")
+        except Exception as e:
+            logger.warning(f"MCP health check failed: {str(e)}")
+            return False
+        return True
+
+    async def preload(self) -> None:
+        """Fetch the tool catalog ahead of the first message."""
+        try:
+            tools = await self.list_tools()
+        except Exception as e:
+            logger.warning(f"Could not preload MCP tools: {str(e)}")
+            return
+        logger.info(f"Loaded {len(tools.tools)} MCP tools")
+
+    def invalidate_tools(self) -> None:
+        """Drop the cached catalog and any results of the old tools."""
+        self._tools_expires_at = 0.0
+        self.results.clear()
+
+    async def list_tools(self) -> ListToolsResult:
+        """Return the tool catalog, fetching it again once it is stale.
+
+        If a refresh fails, the previous catalog is served until the next
+        attempt.
+        """
+        if self._tools is not None and time.monotonic() < self._tools_expires_at:
+            return self._tools
+        async with self._tools_lock:
+            if self._tools is not None and time.monotonic() < self._tools_expires_at:
+                return self._tools
+            try:
+                await self._ensure_initialized()
+                tools = ListToolsResult.model_validate(await self._rpc("tools/list"))
+            except Exception as e:
+                if self._tools is None:
+                    raise
+                logger.warning(f"MCP tools refresh failed, using cached: {str(e)}")
+                return self._tools
+            self._tools = tools
+            self._tools_expires_at = time.monotonic() + self.tools_ttl
+            self._memoized = {
+                tool.name
+                for tool in tools.tools
+                if tool.name in self.result_ttls
+                or (tool.annotations or {}).get("readOnlyHint")
+                or (tool.annotations or {}).get("idempotentHint")
+            }
+            metrics.increment("mcp_tools_refreshed")
+        return tools
+
+    @staticmethod
+    def _result_key(request: CallToolRequest) -> str:
+        arguments = json.dumps(
+            request.arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        )
+        digest = hashlib.sha256(arguments.encode()).hexdigest()
+        return f"{request.name}:{digest}"
+
+    async def call_tool(self, request: CallToolRequest) -> CallToolResult:
+        key = None
+        if request.name in self._memoized:
+            key = self._result_key(request)
+            cached = self.results.get(key)
+            if cached is not None:
+                metrics.increment("mcp_tool_cache_hits")
+                return cached
+
+        await self._ensure_initialized()
+        result = await self._rpc("tools/call", request.model_dump())
+        result = CallToolResult.model_validate(result)
+        if key is not None and not result.isError:
+            self.results.set(
+                key,
+                result,
+                len(result.model_dump_json()),
+                ttl=self.result_ttls.get(request.name),
+            )
+        return result
+
+    @staticmethod
+    def _function(tool: ToolDefinition) -> dict[str, Any]:
+        """Describe an MCP tool as an OpenAI-style function."""
+        return {
+            "type": ToolType.FUNCTION.value,
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.inputSchema,
+            },
         }
 
+    async def _run_tool(self, call: dict[str, Any]) -> AgentMessage:
+        """Execute one tool call; failures become text for the model to read."""
+        name = call["function"]["name"]
+        timeout = self.tool_timeouts.get(name, self.tool_timeout)
+        metrics.increment("mcp_tool_calls")
+        try:
+            arguments = json.loads(call["function"].get("arguments") or "{}")
+            result = await asyncio.wait_for(
+                self.call_tool(CallToolRequest(name=name, arguments=arguments)),
+                timeout,
+            )
+            text = "\n".join(
+                part.text for part in result.content if isinstance(part, TextContent)
+            )
+            if result.isError:
+                metrics.increment("mcp_tool_errors")
+                text = f"Tool {name} failed: {text}"
+        except TimeoutError:
+            logger.warning(f"MCP tool {name} timed out after {timeout}s")
+            metrics.increment("mcp_tool_timeouts")
+            text = f"Tool {name} timed out after {timeout:g}s"
+        except Exception as e:
+            logger.error(f"MCP tool {name} failed: {str(e)}")
+            metrics.increment("mcp_tool_errors")
+            text = f"Tool {name} failed: {str(e)}"
+        return AgentMessage(role="tool", content=text, tool_call_id=call["id"])
+
+    async def run(
+        self, messages: list[AgentMessage], deadline: float | None = None
+    ) -> ChatCompletion:
+        """Answer with the model, letting it call MCP tools along the way.
+
+        After ``max_iterations`` rounds of tool calls the model is asked
+        once more without tools, so the loop always ends with an answer.
+        Without a tool catalog the model answers without tools.
+        """
+        try:
+            catalog = await self.list_tools()
+        except Exception as e:
+            logger.warning(f"MCP tools unavailable, answering without them: {str(e)}")
+            metrics.increment("mcp_tools_unavailable")
+            return await self.deepseek_service.chat_completion(
+                messages=messages, deadline=deadline
+            )
+        tools = [self._function(tool) for tool in catalog.tools]
+        messages = list(messages)
+        for _ in range(self.max_iterations):
+            result = await self.deepseek_service.chat_completion(
+                messages=messages, tools=tools or None, deadline=deadline
+            )
+            if not result.tool_calls:
+                return result
+            messages.append(
+                AgentMessage(
+                    role="assistant",
+                    content=result.content,
+                    tool_calls=result.tool_calls,
+                )
+            )
+            messages.extend(
+                await asyncio.gather(*map(self._run_tool, result.tool_calls))
+            )
+        metrics.increment("mcp_tool_iterations_exhausted")
+        return await self.deepseek_service.chat_completion(
+            messages=messages, deadline=deadline
+        )
+
     async def send_message(self, request: MCPRequest) -> MCPResponse:
         """Send message to MCP server and get response"""
         try:
@@ -24,15 +336,19 @@ class MCPClient:
                         content=f"<{request.session_id}>\n\n" + msg.content,
                     )
                 )
-            ds_service = mcp_service.DeepSeekService()
-            result = await ds_service.chat_completion(messages=messages)
-
-            CallToolResult(
-                content=[TextContent(type=ContentType.TEXT, text=result.content)]
-            )
-
+            result = await self.run(messages)
             return MCPResponse(response=result.content)
 
         except Exception as e:
             # return MCPResponse(response=str(e))
             raise Exception(f"MCP Client HTTP error: {str(e)}") from e
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._initialized = False
+        self._session_id = None
+        self._tools = None
+        self._tools_expires_at = 0.0
+        self.results.clear()
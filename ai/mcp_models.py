@@ -1,12 +1,27 @@
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_serializer
 
 
 class AgentMessage(BaseModel):
     role: str = Field(..., description="The role of the message sender")
     content: str = Field(..., description="The content of the message")
+    tool_calls: list[dict[str, Any]] | None = Field(
+        default=None, description="Tool calls requested by the assistant"
+    )
+    tool_call_id: str | None = Field(
+        default=None, description="The tool call a tool message answers"
+    )
+
+    @model_serializer(mode="wrap")
+    def _omit_unused_tool_fields(self, handler) -> dict[str, Any]:
+        # Plain chat turns serialize, and are stored, as role and content only
+        data = handler(self)
+        for field in ("tool_calls", "tool_call_id"):
+            if data.get(field) is None:
+                data.pop(field, None)
+        return data
 
 
 class AgentRequest(BaseModel):
@@ -17,6 +32,7 @@ class AgentRequest(BaseModel):
     stream: bool = Field(default=False)
     presence_penalty: float | None = Field(default=0.0, ge=-2.0, le=2.0)
     frequency_penalty: float | None = Field(default=0.0, ge=-2.0, le=2.0)
+    tools: list[dict[str, Any]] | None = Field(default=None)
 
 
 class ToolType(str, Enum):
@@ -46,6 +62,8 @@ class ToolDefinition(BaseModel):
     name: str
     description: str
     inputSchema: dict[str, Any]
+    # MCP behaviour hints such as readOnlyHint and idempotentHint
+    annotations: dict[str, Any] | None = None
 
 
 class CallToolRequest(BaseModel):
@@ -55,6 +73,7 @@ class CallToolRequest(BaseModel):
 
 class CallToolResult(BaseModel):
     content: list[Content]
+    isError: bool = False
 
 
 class ListToolsResult(BaseModel):
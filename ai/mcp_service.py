@@ -1,26 +1,99 @@
+import asyncio
+import json
 import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
+from typing import Any
 
 import httpx
 
+from ai.adaptive_limiter import (
+    AdaptiveLimiter,
+    RateLimitError,
+    llm_limiter,
+    parse_retry_after,
+)
 from ai.deepseek_models import ChatCompletion
+from ai.latency_budget import DeadlineExceeded, HedgePolicy, deadline_timeout
+from ai.llm_router import Backend, LLMRouter, llm_router
 from ai.mcp_models import AgentMessage, AgentRequest
 from config import settings
+from shared.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "You are a travel assistant. Help the user plan their trips effectively. And with english and spanish translations. when asked for translate"
+
+
+# Upstream statuses that mean "slow down" rather than "this request failed"
+RATE_LIMIT_STATUSES = {429, 503}
+# Statuses after which the request is retried on another backend, if any
+FAILOVER_STATUSES = RATE_LIMIT_STATUSES | {500, 502, 504}
+
+
+def _default_hedging() -> HedgePolicy | None:
+    if not settings.LLM_HEDGING_ENABLED:
+        return None
+    return HedgePolicy(
+        quantile=settings.LLM_HEDGE_QUANTILE,
+        min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+        window=settings.LLM_HEDGE_WINDOW,
+        budget_percent=settings.LLM_HEDGE_BUDGET_PERCENT,
+    )
+
 
 class DeepSeekService:
-    def __init__(self):
-        self.api_key = settings.DEEPSEEK_API_KEY
-        self.base_url = settings.DEEPSEEK_BASE_URL
+    def __init__(
+        self,
+        router: LLMRouter = llm_router,
+        limiter: AdaptiveLimiter = llm_limiter,
+        hedging: HedgePolicy | None = None,
+    ):
         self.model = settings.DEEPSEEK_MODEL
-        self.client = httpx.AsyncClient(
-            base_url=self.base_url,
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            },
-            timeout=120.0,
+        self.router = router
+        self.limiter = limiter
+        self.hedging = hedging or _default_hedging()
+
+    @staticmethod
+    def _priority(messages: list[AgentMessage], background: bool) -> tuple:
+        """Interactive turns before background work, shorter prompts first."""
+        return (int(background), sum(len(m.content) for m in messages))
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response) -> None:
+        if response.status_code == 200:
+            return
+        error_msg = f"DeepSeek API error: {response.status_code} - {response.text}"
+        logger.error(error_msg)
+        if response.status_code in RATE_LIMIT_STATUSES:
+            raise RateLimitError(
+                error_msg, parse_retry_after(response.headers.get("retry-after"))
+            )
+        raise Exception(error_msg)
+
+    def _build_request(
+        self,
+        messages: list[AgentMessage],
+        max_tokens: int,
+        stream: bool,
+        prompt: str,
+        model: str | None,
+        tools: list[dict[str, Any]] | None = None,
+    ) -> AgentRequest:
+        return AgentRequest(
+            model=model or self.model,
+            messages=[
+                AgentMessage(
+                    role="system",
+                    content=prompt or SYSTEM_PROMPT,
+                ),
+            ]
+            + messages,
+            max_tokens=max_tokens,
+            stream=stream,
+            temperature=0.4,
+            tools=tools,
         )
 
     async def chat_completion(
@@ -30,39 +103,53 @@ class DeepSeekService:
         temperature: float = 0.7,
         stream: bool = False,
         prompt: str = "",
+        model: str | None = None,
+        background: bool = False,
+        deadline: float | None = None,
+        tools: list[dict[str, Any]] | None = None,
     ) -> ChatCompletion:
-        request_data = AgentRequest(
-            model="deepseek-chat",
-            messages=[
-                AgentMessage(
-                    role="system",
-                    content="You are a travel assistant. Help the user plan their trips effectively. And with english and spanish translations. when asked for translate",
-                ),
+        if stream:
+            parts = [
+                delta
+                async for delta in self.stream_completion(
+                    messages,
+                    max_tokens=max_tokens,
+                    prompt=prompt,
+                    model=model,
+                    background=background,
+                    deadline=deadline,
+                )
             ]
-            + messages,
-            stream=False,
-            temperature=0.4,
+            return ChatCompletion(content="".join(parts), model=model or self.model)
+
+        request_data = self._build_request(
+            messages, max_tokens, False, prompt, model, tools
         )
         logger.debug(f"DeepSeek API request data: {request_data.model_dump()}")
         try:
-            response = await self.client.post(
-                "/chat/completions", json=request_data.model_dump()
-            )
-
-            if response.status_code != 200:
-                error_msg = (
-                    f"DeepSeek API error: {response.status_code} - {response.text}"
-                )
-                logger.error(error_msg)
-                raise Exception(error_msg)
+            async with (
+                deadline_timeout(deadline),
+                self.limiter.slot(self._priority(messages, background)),
+            ):
+                backend, response = await self._open(request_data, model)
+                try:
+                    await response.aread()
+                finally:
+                    await self._release(backend, response)
+                self._raise_for_status(response)
 
             data = response.json()
             logger.debug(f"DeepSeek API response data: {data}")
+            message = data["choices"][0]["message"]
             return ChatCompletion(
-                content=data["choices"][0]["message"]["content"],
+                content=message.get("content") or "",
                 model=data["model"],
+                tool_calls=message.get("tool_calls") or None,
             )
 
+        except TimeoutError:
+            logger.error("DeepSeek API reply deadline exceeded")
+            raise DeadlineExceeded("Reply deadline exceeded. Please try again.")
         except httpx.TimeoutException:
             logger.error("DeepSeek API request timeout")
             raise Exception("Request timeout. Please try again.")
@@ -73,8 +160,189 @@ class DeepSeekService:
             logger.error(f"Unexpected error in DeepSeek service: {str(e)}")
             raise
 
-    async def close(self):
-        await self.client.aclose()
+    async def stream_completion(
+        self,
+        messages: list[AgentMessage],
+        max_tokens: int = 2048,
+        prompt: str = "",
+        model: str | None = None,
+        background: bool = False,
+        deadline: float | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield content deltas from the server-sent event stream.
+
+        The deadline covers queueing and the time to the first byte; once
+        text is flowing the user is already seeing progress.
+        """
+        request_data = self._build_request(messages, max_tokens, True, prompt, model)
+        try:
+            async with AsyncExitStack() as stack:
+                async with deadline_timeout(deadline):
+                    await stack.enter_async_context(
+                        self.limiter.slot(self._priority(messages, background))
+                    )
+                    backend, response = await self._open(request_data, model)
+                stack.push_async_callback(self._release, backend, response)
+                if response.status_code != 200:
+                    await response.aread()
+                self._raise_for_status(response)
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+
+        except TimeoutError:
+            logger.error("DeepSeek API stream deadline exceeded")
+            raise DeadlineExceeded("Reply deadline exceeded. Please try again.")
+        except httpx.TimeoutException:
+            logger.error("DeepSeek API stream timeout")
+            raise Exception("Request timeout. Please try again.")
+        except httpx.RequestError as e:
+            logger.error(f"DeepSeek API stream error: {str(e)}")
+            raise Exception("Service temporarily unavailable. Please try again.")
+
+    async def _send(
+        self, backend: Backend, request_data: AgentRequest, model: str | None
+    ) -> httpx.Response:
+        """Send one attempt to ``backend`` and return once headers arrive.
+
+        The request counts as outstanding on the backend until _release().
+        """
+        client = backend.transport.client
+        body = request_data.model_dump(exclude_none=True)
+        body["model"] = backend.model_for(model)
+        request = client.build_request("POST", "/chat/completions", json=body)
+        backend.outstanding += 1
+        started = time.monotonic()
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.RequestError:
+            backend.outstanding -= 1
+            self.router.record_failure(backend)
+            raise
+        except asyncio.CancelledError:
+            backend.outstanding -= 1
+            raise
+
+        elapsed = time.monotonic() - started
+        if response.status_code in FAILOVER_STATUSES:
+            self.router.record_failure(backend)
+        else:
+            self.router.record_success(backend, elapsed)
+            if self.hedging is not None:
+                self.hedging.record(elapsed)
+        return response
+
+    @staticmethod
+    async def _release(backend: Backend, response: httpx.Response) -> None:
+        backend.outstanding -= 1
+        await response.aclose()
+
+    async def _attempt(
+        self, request_data: AgentRequest, model: str | None, tried: set[str]
+    ) -> tuple[Backend, httpx.Response]:
+        """Send to the best backend, failing over while untried ones are left.
+
+        Backends used are added to ``tried``.
+        """
+        while True:
+            backend = self.router.choose(tried)
+            tried.add(backend.name)
+            last = len(tried) >= len(self.router.backends)
+            try:
+                response = await self._send(backend, request_data, model)
+            except httpx.RequestError as e:
+                if last:
+                    raise
+                logger.warning(f"LLM backend {backend.name} unreachable: {e}")
+                metrics.increment("llm_failovers")
+                continue
+            if response.status_code in FAILOVER_STATUSES and not last:
+                await self._release(backend, response)
+                metrics.increment("llm_failovers")
+                continue
+            return backend, response
+
+    async def _open(
+        self, request_data: AgentRequest, model: str | None
+    ) -> tuple[Backend, httpx.Response]:
+        """Send the request, hedging it when the first byte is slower than usual.
 
+        The first 2xx response wins; the other attempt is cancelled or
+        closed. An error response is only returned once neither attempt can
+        succeed. A hedge prefers a backend the primary has not used and
+        holds its own limiter slot while it runs, so it is skipped when the
+        limiter has no spare capacity.
+        """
+        tried: set[str] = set()
+        if self.hedging is None:
+            return await self._attempt(request_data, model, tried)
+        self.hedging.on_request()
+        delay = self.hedging.delay()
+        if delay is None:
+            return await self._attempt(request_data, model, tried)
 
-deepseek_service = DeepSeekService()
+        primary = asyncio.create_task(self._attempt(request_data, model, tried))
+        attempts = [primary]
+        winner = None
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done and self.limiter.try_acquire():
+                if self.hedging.try_acquire():
+                    metrics.increment("llm_hedges_sent")
+                    attempts.append(
+                        asyncio.create_task(
+                            self._hedge(request_data, model, set(tried))
+                        )
+                    )
+                else:
+                    self.limiter.release()
+
+            pending = set(attempts)
+            error: BaseException | None = None
+            failed = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None and task.result()[1].is_success:
+                        winner = task
+                    elif failed is None:
+                        failed = task
+            # With no success left to wait for, surface the error response
+            winner = winner or failed
+            if winner is None:
+                raise error
+            if winner is not primary:
+                metrics.increment("llm_hedges_won")
+            return winner.result()
+        finally:
+            for task in attempts:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    await self._release(*task.result())
+
+    async def _hedge(
+        self, request_data: AgentRequest, model: str | None, tried: set[str]
+    ) -> tuple[Backend, httpx.Response]:
+        """Run a hedge attempt in the limiter slot taken for it."""
+        try:
+            return await self._attempt(request_data, model, tried)
+        finally:
+            self.limiter.release()
+
+    async def close(self):
+        await self.router.aclose()
@@ -0,0 +1,89 @@
+"""Share one LLM call among identical cacheable requests in flight."""
+
+import asyncio
+import time
+from typing import Any
+
+from cache import CacheManager
+from shared.metrics import metrics
+
+
+class Flight:
+    """Outcome of SingleFlight.begin for one request."""
+
+    __slots__ = ("message", "leader", "answer", "locked")
+
+    def __init__(
+        self,
+        message: str,
+        leader: bool,
+        answer: Any | None = None,
+        locked: bool = False,
+    ) -> None:
+        self.message = message
+        self.leader = leader
+        self.answer = answer
+        self.locked = locked
+
+
+class SingleFlight:
+    """Coalesce concurrent requests that share a cache key.
+
+    Within a worker, followers await the leader's future. Across workers,
+    the leader holds a short Redis claim and the others wait for the cache
+    fill notification, falling back to their own call after
+    ``wait_timeout`` seconds or if the leader fails.
+    """
+
+    def __init__(
+        self, cache_manager: CacheManager, lock_ttl: float, wait_timeout: float
+    ) -> None:
+        self.cache_manager = cache_manager
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def begin(self, message: str, deadline: float | None = None) -> Flight:
+        """Return a shared answer, or make the caller the leader.
+
+        A leader must report back with finish(), also when its call fails.
+        A follower whose leader failed gets no answer and is not a leader;
+        it makes its own call. Waiting on another worker stops early enough
+        to leave half of the time left before ``deadline`` for that call.
+        """
+        key = self.cache_manager.cache_key(message)
+        existing = self._inflight.get(key)
+        if existing is not None:
+            metrics.increment("single_flight_shared")
+            return Flight(message, leader=False, answer=await asyncio.shield(existing))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        if await self.cache_manager.acquire_fill(message, self.lock_ttl):
+            return Flight(message, leader=True, locked=True)
+
+        timeout = self.wait_timeout
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, (deadline - time.time()) / 2))
+        cached = await self.cache_manager.wait_for_fill(message, timeout)
+        if cached is None:
+            # The other worker failed or is too slow: answer it here instead
+            return Flight(message, leader=True)
+        metrics.increment("single_flight_shared")
+        self._resolve(key, future, cached["response"])
+        return Flight(message, leader=False, answer=cached["response"])
+
+    async def finish(self, flight: Flight, answer: Any | None) -> None:
+        """Hand the leader's answer, or None on failure, to its followers."""
+        key = self.cache_manager.cache_key(flight.message)
+        if flight.locked:
+            await self.cache_manager.release_fill(flight.message, answer is not None)
+        future = self._inflight.get(key)
+        if future is not None:
+            self._resolve(key, future, answer)
+
+    def _resolve(self, key: str, future: asyncio.Future, answer: Any | None) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.done():
+            future.set_result(answer)
@@ -0,0 +1,39 @@
+"""Split a token stream into WhatsApp-sized messages at natural boundaries."""
+
+import re
+from collections.abc import AsyncIterator
+
+# Paragraph breaks, line breaks, or sentence punctuation followed by space
+_BOUNDARY = re.compile(r"\n\s*\n|\n|[.!?…](?=\s)")
+
+
+async def segment_stream(
+    deltas: AsyncIterator[str], min_chars: int, max_chars: int
+) -> AsyncIterator[str]:
+    """Yield text once a paragraph or sentence closes past ``min_chars``.
+
+    Short answers come out as a single segment; text running past
+    ``max_chars`` without a boundary is cut at the last whitespace.
+    """
+    buffer = ""
+    async for delta in deltas:
+        buffer += delta
+        while len(buffer) >= min_chars:
+            cut = _find_cut(buffer, min_chars, max_chars)
+            if cut is None:
+                break
+            segment, buffer = buffer[:cut].strip(), buffer[cut:].lstrip()
+            if segment:
+                yield segment
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def _find_cut(buffer: str, min_chars: int, max_chars: int) -> int | None:
+    boundary = _BOUNDARY.search(buffer, min_chars)
+    if boundary:
+        return boundary.end()
+    if len(buffer) > max_chars:
+        space = buffer.rfind(" ", 0, max_chars)
+        return space if space > 0 else max_chars
+    return None
@@ -0,0 +1,88 @@
+"""Background compaction of long conversations into a rolling summary."""
+
+import asyncio
+import logging
+
+from ai.mcp_models import AgentMessage
+from ai.mcp_service import DeepSeekService
+from shared.metrics import metrics
+from shared.session_store import SessionStore, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for an assistant that will continue it. "
+    "Keep names, dates, destinations, preferences, decisions and open questions. "
+    "Write at most a few short paragraphs in the language of the conversation."
+)
+
+
+class ConversationSummarizer:
+    """Fold older turns into one summary once a session passes a token budget."""
+
+    def __init__(
+        self,
+        store: SessionStore,
+        deepseek_service: DeepSeekService,
+        threshold_tokens: int,
+        keep_turns: int,
+        model: str,
+        max_tokens: int,
+    ) -> None:
+        self.store = store
+        self.deepseek_service = deepseek_service
+        self.threshold_tokens = threshold_tokens
+        self.keep_turns = keep_turns
+        self.model = model
+        self.max_tokens = max_tokens
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def maybe_schedule(self, session_id: str, history: list[AgentMessage]) -> None:
+        """Start a background compaction if the history is over the threshold."""
+        if session_id in self._tasks:
+            return
+        if sum(estimate_tokens(m) for m in history) < self.threshold_tokens:
+            return
+        task = asyncio.create_task(self._compact(session_id, history))
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(session_id, None))
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _compact(self, session_id: str, history: list[AgentMessage]) -> None:
+        previous = [
+            m
+            for m in history
+            if m.role == "system" and m.content.startswith(SUMMARY_PREFIX)
+        ]
+        turns = [m for m in history if m.role != "system"]
+        older = turns[: max(0, len(turns) - self.keep_turns)]
+        if not older:
+            return
+
+        transcript = "\n".join(f"{m.role}: {m.content}" for m in previous + older)
+        try:
+            result = await self.deepseek_service.chat_completion(
+                messages=[AgentMessage(role="user", content=transcript)],
+                max_tokens=self.max_tokens,
+                prompt=SUMMARY_PROMPT,
+                model=self.model,
+                background=True,
+            )
+        except Exception as e:
+            logger.error(f"Error summarizing session {session_id}: {e}")
+            return
+
+        summary = AgentMessage(role="system", content=SUMMARY_PREFIX + result.content)
+        if not await self.store.compact(session_id, summary, older):
+            # The summarized turns were trimmed while the summary ran
+            logger.info(f"Skipped stale compaction of session {session_id}")
+            metrics.increment("session_compactions_skipped")
+            return
+        metrics.increment("sessions_compacted")
+        logger.info(f"Compacted {len(older)} turns of session {session_id}")
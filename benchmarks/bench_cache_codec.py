@@ -0,0 +1,79 @@
+"""Compare bytes per entry and encode/decode cost of cache value formats.
+
+Run with ``python benchmarks/bench_cache_codec.py`` from the repository root.
+"""
+
+import json
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cache_codec import decode_entry, encode_entry  # noqa: E402
+
+MESSAGE = "Quais são os horários de funcionamento no fim de semana?"
+RESPONSES = {
+    "short": "Abrimos das 9h às 18h, inclusive aos sábados.",
+    "medium": (
+        "No fim de semana funcionamos das 9h às 18h aos sábados e das 10h "
+        "às 16h aos domingos. Feriados podem ter horário reduzido. "
+    )
+    * 4,
+    "long": (
+        "Para viagens internacionais recomendamos chegar ao aeroporto com "
+        "três horas de antecedência, levar passaporte válido por seis meses "
+        "e conferir as exigências de visto do destino.\n\n"
+    )
+    * 20,
+}
+NUMBER = 20_000
+
+
+def legacy_encode(response: str) -> bytes:
+    return json.dumps(
+        {
+            "response": response,
+            "message": MESSAGE,
+            "session_id": None,
+            "cached_at": datetime.now().isoformat(),
+            "popularity": 0,
+        }
+    ).encode()
+
+
+def per_call_us(fn) -> float:
+    return timeit.timeit(fn, number=NUMBER) / NUMBER * 1e6
+
+
+def main() -> None:
+    print(
+        f"{'answer':<8} {'format':<8} {'bytes':>7} {'encode µs':>10} {'decode µs':>10}"
+    )
+    for name, response in RESPONSES.items():
+        legacy = legacy_encode(response)
+        binary = encode_entry(MESSAGE, response)
+        rows = [
+            (
+                "json",
+                legacy,
+                per_call_us(lambda r=response: legacy_encode(r)),
+                per_call_us(lambda d=legacy: json.loads(d)),
+            ),
+            (
+                "v1",
+                binary,
+                per_call_us(lambda r=response: encode_entry(MESSAGE, r)),
+                per_call_us(lambda d=binary: decode_entry(d)),
+            ),
+        ]
+        for fmt, data, encode_us, decode_us in rows:
+            print(
+                f"{name:<8} {fmt:<8} {len(data):>7} {encode_us:>10.2f} "
+                f"{decode_us:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
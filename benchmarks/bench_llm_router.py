@@ -0,0 +1,127 @@
+"""Compare latency-aware routing with round robin over fake LLM backends.
+
+Run with ``python benchmarks/bench_llm_router.py`` from the repository root.
+Backends are in-process fake OpenAI servers, so no network is needed.
+"""
+
+import asyncio
+import itertools
+import logging
+import statistics
+import sys
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai.adaptive_limiter import AdaptiveLimiter  # noqa: E402
+from ai.llm_router import Backend, LLMRouter  # noqa: E402
+from ai.llm_transport import LLMTransport  # noqa: E402
+from ai.mcp_models import AgentMessage  # noqa: E402
+from ai.mcp_service import DeepSeekService  # noqa: E402
+from benchmarks.fake_openai_server import create_app  # noqa: E402
+
+BACKENDS = {
+    "fast": {"latency": 0.05, "jitter": 0.01},
+    "slow": {"latency": 0.25, "jitter": 0.05},
+    "flaky": {"latency": 0.05, "jitter": 0.01, "error_rate": 0.3},
+}
+REQUESTS = 400
+CONCURRENCY = 16
+
+
+class RoundRobinRouter(LLMRouter):
+    """Baseline that ignores latency and errors."""
+
+    def __init__(self, backends: list[Backend]) -> None:
+        super().__init__(backends)
+        self._next = itertools.cycle(backends)
+
+    def choose(self, exclude: Iterable[str] = ()) -> Backend:
+        excluded = set(exclude)
+        for _ in self.backends:
+            backend = next(self._next)
+            if backend.name not in excluded:
+                return backend
+        return next(self._next)
+
+
+def make_backends() -> list[Backend]:
+    backends = []
+    for name, options in BACKENDS.items():
+        transport = LLMTransport(base_url=f"http://{name}", api_key="bench")
+        transport._client = httpx.AsyncClient(
+            base_url=f"http://{name}",
+            transport=httpx.ASGITransport(app=create_app(name=name, **options)),
+        )
+        backends.append(Backend(name, transport, "fake-model"))
+    return backends
+
+
+async def run(router: LLMRouter) -> tuple[list[float], int, dict[str, int]]:
+    limiter = AdaptiveLimiter(
+        initial_limit=CONCURRENCY,
+        min_limit=CONCURRENCY,
+        max_limit=CONCURRENCY,
+        backoff=1.0,
+        default_retry_after=0,
+    )
+    service = DeepSeekService(router, limiter)
+    messages = [AgentMessage(role="user", content="Oi")]
+    latencies: list[float] = []
+    errors = 0
+    served = {backend.name: 0 for backend in router.backends}
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(REQUESTS):
+        queue.put_nowait(i)
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await service.chat_completion(messages)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    for backend in router.backends:
+        app = backend.transport.client._transport.app
+        served[backend.name] = app.state.requests
+    await service.close()
+    return latencies, errors, served
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def main() -> None:
+    # Failover warnings would drown out the table
+    logging.disable(logging.WARNING)
+    print(
+        f"{'router':<12} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+        f"{'errors':>6}  requests per backend"
+    )
+    for label, router in (
+        ("round-robin", RoundRobinRouter(make_backends())),
+        ("ewma", LLMRouter(make_backends())),
+    ):
+        latencies, errors, served = await run(router)
+        shares = ", ".join(f"{name}={count}" for name, count in served.items())
+        print(
+            f"{label:<12} {statistics.median(latencies) * 1000:>7.1f} "
+            f"{percentile(latencies, 0.95) * 1000:>7.1f} "
+            f"{percentile(latencies, 0.99) * 1000:>7.1f} {errors:>6}  {shares}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""Minimal OpenAI-compatible chat completions server for offline testing.
+
+Each instance answers with a fixed reply after a configurable delay and
+fails a configurable share of requests, which is enough to exercise LLM
+routing, failover and hedging without network access. Serve it with::
+
+    python benchmarks/fake_openai_server.py --port 9001 --latency 0.2
+
+or mount ``create_app()`` in-process through ``httpx.ASGITransport``.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections.abc import AsyncIterator
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_app(
+    name: str = "fake",
+    latency: float = 0.05,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    reply: str = "Olá! Como posso ajudar?",
+) -> FastAPI:
+    """Build a server that sleeps ``latency`` ± ``jitter`` seconds per call."""
+    app = FastAPI(title=f"Fake OpenAI ({name})")
+    app.state.requests = 0
+
+    async def wait() -> None:
+        await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+    @app.post("/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        model = body.get("model", name)
+        await wait()
+        if random.random() < error_rate:
+            return JSONResponse(
+                {"error": {"message": f"{name} is overloaded"}},
+                status_code=error_status,
+            )
+
+        if not body.get("stream"):
+            return {
+                "id": f"{name}-{app.state.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": reply},
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
+
+        async def events() -> AsyncIterator[str]:
+            for i, word in enumerate(reply.split(" ")):
+                delta = {"content": word if i == 0 else f" {word}"}
+                chunk = {"model": model, "choices": [{"delta": delta}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--name", default="fake")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    app = create_app(
+        name=args.name,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
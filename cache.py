@@ -1,13 +1,28 @@
 """Redis cache implementation for message caching with popularity tracking."""
 
+import asyncio
 import hashlib
 import json
-from datetime import datetime
-from typing import Any, dict
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from typing import Any
 
-import redis.asyncio as redis
+from redis import exceptions as redis_exceptions
+from redis.asyncio.client import Pipeline
 
+from ai.mcp_models import AgentMessage
+from cache_codec import decode_entry, encode_entry
+from cache_shards import ShardedRedis, ShardUnavailable
 from config import settings
+from local_cache import LocalCache
+from semantic_cache import SemanticIndex
+from shared.metrics import metrics
+
+# Hash tag of the shard carrying cross-worker invalidations
+_CONTROL_TAG = "control"
+# Pub/sub read timeout; shorter than an idle channel is normal
+_PUBSUB_POLL_SECONDS = 5.0
 
 
 class CacheManager:
@@ -15,24 +30,111 @@ class CacheManager:
 
     def __init__(self):
         """Initialize cache manager."""
-        self.redis_client: redis.Redis | None = None
+        self.shards: ShardedRedis | None = None
         self.cache_enabled = settings.CACHE_ENABLED
+        self.semantic_index: SemanticIndex | None = None
+        if settings.SEMANTIC_CACHE_ENABLED:
+            self.semantic_index = SemanticIndex(
+                dim=settings.SEMANTIC_CACHE_DIM,
+                capacity=settings.CACHE_MAX_ENTRIES,
+                threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                ttl=settings.CACHE_TTL,
+            )
+        self.local_cache: LocalCache | None = None
+        if settings.CACHE_LOCAL_ENABLED:
+            self.local_cache = LocalCache(
+                max_bytes=settings.CACHE_LOCAL_MAX_BYTES,
+                ttl=settings.CACHE_LOCAL_TTL,
+            )
+        # Identifies this worker's own invalidation messages
+        self.worker_id = uuid.uuid4().hex
+        self._pending_hits: Counter[str] = Counter()
+        # Woken when another worker fills or gives up on a cache key
+        self._fill_waiters: dict[str, asyncio.Future] = {}
+        self._background_tasks: list[asyncio.Task] = []
 
     async def initialize(self):
-        """Initialize Redis connection."""
+        """Initialize Redis connections."""
         if not self.cache_enabled:
             return
 
-        try:
-            self.redis_client = redis.from_url(
-                settings.REDIS_URL, encoding="utf-8", decode_responses=True
-            )
-            # Test connection
-            await self.redis_client.ping()
-            print("✅ Redis cache connected successfully")
-        except Exception as e:
-            print(f"❌ Redis connection failed: {e}")
+        self.shards = ShardedRedis.from_urls(
+            settings.REDIS_URLS,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            retry_after=settings.CACHE_SHARD_RETRY_SECONDS,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        # Test connections; the cache keeps running on the shards that answer
+        healthy = await self.shards.ping()
+        if healthy == 0:
+            print("❌ Redis connection failed: no shard is reachable")
+            await self.shards.aclose()
+            self.shards = None
             self.cache_enabled = False
+            return
+        print(
+            f"✅ Redis cache connected successfully "
+            f"({healthy}/{len(self.shards.clients)} shards)"
+        )
+
+        await self._drop_legacy_keys()
+        self._start_background_tasks()
+
+    async def _drop_legacy_keys(self) -> None:
+        """Delete the unbucketed popularity set left from before sharding.
+
+        It has no TTL, so it would otherwise stay forever. Entries under the
+        old ``response:<hash>`` keys are not migrated; they expire after
+        CACHE_TTL like any other entry.
+        """
+        legacy_key = f"{settings.CACHE_PREFIX}:popularity"
+        for name, client in self.shards.clients.items():
+            if not self.shards.is_up(name):
+                continue
+            try:
+                await client.delete(legacy_key)
+            except Exception as e:
+                print(f"Error deleting legacy cache keys: {e}")
+
+    def _start_background_tasks(self) -> None:
+        self._background_tasks = [asyncio.create_task(self._listen_invalidations())]
+        if self.local_cache is not None:
+            self._background_tasks.append(
+                asyncio.create_task(self._flush_hits_periodically())
+            )
+
+    async def close(self) -> None:
+        """Close Redis connections."""
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks = []
+        if self.shards:
+            await self._flush_hits()
+            await self.shards.aclose()
+            self.shards = None
+
+    def cacheable_message(self, messages: list[AgentMessage]) -> str | None:
+        """Return the text to cache on, or None when the turn depends on context.
+
+        Only the latest user message is used as the key, so a turn is cacheable
+        when it has at most CACHE_MAX_HISTORY_TURNS earlier turns, no pinned
+        system context (such as a conversation summary) and a short message.
+        """
+        if not self.cache_enabled or not messages:
+            return None
+
+        last = messages[-1]
+        if last.role != "user" or len(last.content) > settings.CACHE_MAX_MESSAGE_CHARS:
+            return None
+
+        context = messages[:-1]
+        if any(m.role == "system" for m in context):
+            return None
+        if len(context) > settings.CACHE_MAX_HISTORY_TURNS:
+            return None
+        return last.content
 
     def _generate_cache_key(self, message: str, session_id: str | None = None) -> str:
         """Generate a cache key from message content and optional session ID."""
@@ -45,85 +147,555 @@ class CacheManager:
             content_to_hash += f"_{session_id}"
 
         content_hash = hashlib.md5(content_to_hash.encode()).hexdigest()
-        return f"{settings.CACHE_PREFIX}:response:{content_hash}"
+        return self._member_cache_key(content_hash)
 
-    def _generate_popularity_key(self, message: str) -> str:
-        """Generate key for tracking message popularity."""
-        normalized_msg = " ".join(message.strip().lower().split())
-        content_hash = hashlib.md5(normalized_msg.encode()).hexdigest()
-        return f"{settings.CACHE_PREFIX}:popularity:{content_hash}"
+    def cache_key(self, message: str) -> str:
+        """Key under which a shared answer to ``message`` is cached."""
+        return self._generate_cache_key(message)
+
+    @staticmethod
+    def _bucket(member: str) -> str:
+        """Hash tag shared by an entry and the popularity set that tracks it."""
+        return str(int(member[:8], 16) % settings.CACHE_HASH_BUCKETS)
+
+    @staticmethod
+    def _popularity_key(bucket: str) -> str:
+        """Sorted set scoring each cached entry of a bucket by its hit count."""
+        return f"{settings.CACHE_PREFIX}:popularity:{{{bucket}}}"
+
+    @staticmethod
+    def _recent_hits_key(bucket: str) -> str:
+        """Sorted set of each entry's hits since it was last refreshed."""
+        return f"{settings.CACHE_PREFIX}:recent:{{{bucket}}}"
+
+    @staticmethod
+    def _popularity_member(cache_key: str) -> str:
+        return cache_key.rsplit(":", 1)[-1]
+
+    @staticmethod
+    def _decode_members(members: list[bytes]) -> list[str]:
+        return [m.decode() for m in members]
+
+    @classmethod
+    def _member_cache_key(cls, member: str) -> str:
+        return f"{settings.CACHE_PREFIX}:response:{{{cls._bucket(member)}}}:{member}"
+
+    @classmethod
+    def _refresh_lock_key(cls, member: str) -> str:
+        return f"{settings.CACHE_PREFIX}:refresh:{{{cls._bucket(member)}}}:{member}"
+
+    @classmethod
+    def _fill_lock_key(cls, member: str) -> str:
+        return f"{settings.CACHE_PREFIX}:fill:{{{cls._bucket(member)}}}:{member}"
+
+    def _bucket_capacity(self) -> int:
+        return -(-settings.CACHE_MAX_ENTRIES // settings.CACHE_HASH_BUCKETS)
+
+    def _all_buckets(self) -> list[str]:
+        return [str(b) for b in range(settings.CACHE_HASH_BUCKETS)]
+
+    def _invalidation_channel(self) -> str:
+        return f"{settings.CACHE_PREFIX}:invalidate"
+
+    def _invalidation_event(self, keys: list[str]) -> str:
+        return json.dumps({"origin": self.worker_id, "keys": keys})
 
     def _generate_session_key(self, session_id: str) -> str:
         """Generate key for session-based caching."""
         return f"{settings.CACHE_PREFIX}:session:{session_id}"
 
+    async def _fan_out(
+        self,
+        items: list[str],
+        tag_of: Callable[[str], str],
+        command: Callable[[Pipeline, str], Any],
+    ) -> list[tuple[str, Any]]:
+        """Queue ``command`` per item, one pipeline per healthy shard.
+
+        Returns ``(item, result)`` pairs; items on shards that are down or fail
+        are left out.
+        """
+        by_tag: dict[str, list[str]] = {}
+        for item in items:
+            by_tag.setdefault(tag_of(item), []).append(item)
+
+        async def run(tags: list[str]) -> list[tuple[str, Any]]:
+            shard_items = [item for tag in tags for item in by_tag[tag]]
+            pipe = self.shards.client(tags[0]).pipeline(transaction=False)
+            for item in shard_items:
+                command(pipe, item)
+            try:
+                results = await pipe.execute()
+            except Exception as e:
+                self.shards.report_failure(tags[0], e)
+                print(f"Error reading from cache shard: {e}")
+                return []
+            return list(zip(shard_items, results, strict=True))
+
+        groups = self.shards.partition(by_tag)
+        results = await asyncio.gather(*(run(tags) for tags in groups.values()))
+        return [pair for shard_results in results for pair in shard_results]
+
     async def get_cached_response(
         self, message: str, session_id: str | None = None
     ) -> Any | None:
         """Get cached response for a message."""
-        if not self.cache_enabled or not self.redis_client:
+        if not self.cache_enabled or not self.shards:
             return None
 
         try:
             cache_key = self._generate_cache_key(message, session_id)
-            cached_data = await self.redis_client.get(cache_key)
+            if self.local_cache is not None:
+                data = self.local_cache.get(cache_key)
+                if data is not None:
+                    # Counted in Redis on the next flush, keeping L1 hits local
+                    self._pending_hits[self._popularity_member(cache_key)] += 1
+                    metrics.increment("cache_l1_hits")
+                    return data
 
+            cached_data = await self._read_and_bump(cache_key)
             if cached_data:
-                # Update popularity score
-                await self._increment_popularity(message)
-                return json.loads(cached_data)
+                metrics.increment("cache_l2_hits")
+                data = decode_entry(cached_data)
+                if self.local_cache is not None:
+                    self.local_cache.set(cache_key, data, len(cached_data))
+                return data
+
+            if self.semantic_index is not None and session_id is None:
+                return await self._get_semantic_match(message)
 
         except Exception as e:
             print(f"Error reading from cache: {e}")
 
         return None
 
+    async def _read_and_bump(self, cache_key: str) -> bytes | None:
+        """Read an entry and count the hit in a single round trip.
+
+        ``ZADD XX INCR`` only touches members written by set_cached_response,
+        so misses never create popularity or recent-hit entries. Entries on a
+        shard that is down read as misses.
+        """
+        member = self._popularity_member(cache_key)
+        bucket = self._bucket(member)
+        try:
+            pipe = self.shards.client(bucket).pipeline(transaction=False)
+            pipe.get(cache_key)
+            pipe.zadd(self._popularity_key(bucket), {member: 1}, xx=True, incr=True)
+            pipe.zadd(self._recent_hits_key(bucket), {member: 1}, xx=True, incr=True)
+            cached_data, _, _ = await pipe.execute()
+        except ShardUnavailable:
+            metrics.increment("cache_shard_skips")
+            return None
+        except Exception as e:
+            self.shards.report_failure(bucket, e)
+            raise
+        return cached_data
+
+    async def _get_semantic_match(self, message: str) -> Any | None:
+        """Fall back to the closest rephrasing of an already cached message."""
+        for cache_key, _score in self.semantic_index.lookup(
+            message, k=settings.SEMANTIC_CACHE_TOP_K
+        ):
+            cached_data = await self._read_and_bump(cache_key)
+            if not cached_data:
+                # Expired or evicted in Redis: keep the index in step
+                self.semantic_index.remove(cache_key)
+                continue
+            metrics.increment("cache_semantic_hits")
+            return decode_entry(cached_data)
+        return None
+
     async def set_cached_response(
-        self, message: str, response: dict[str, Any], session_id: str | None = None
+        self, message: str, response: Any, session_id: str | None = None
     ) -> None:
         """Cache a response for a message."""
-        if not self.cache_enabled or not self.redis_client:
+        if not self.cache_enabled or not self.shards:
             return
 
+        cache_key = self._generate_cache_key(message, session_id)
+        member = self._popularity_member(cache_key)
+        bucket = self._bucket(member)
         try:
-            cache_key = self._generate_cache_key(message, session_id)
-            popularity_key = self._generate_popularity_key(message)
-
-            # Prepare cache data
-            cache_data = {
-                "response": response,
-                "message": message,
-                "session_id": session_id,
-                "cached_at": datetime.now().isoformat(),
-                "popularity": 0,
-            }
-
-            # Store in cache with TTL
-            await self.redis_client.setex(
-                cache_key, settings.CACHE_TTL, json.dumps(cache_data)
+            payload = encode_entry(
+                message,
+                response,
+                session_id,
+                compress_min_bytes=settings.CACHE_COMPRESS_MIN_BYTES,
+                compression_level=settings.CACHE_COMPRESSION_LEVEL,
+            )
+
+            # Store the entry, register it for popularity tracking and read
+            # the bucket size in one round trip
+            pipe = self.shards.client(bucket).pipeline(transaction=True)
+            pipe.set(cache_key, payload, ex=settings.CACHE_TTL)
+            pipe.zadd(self._popularity_key(bucket), {member: 0}, nx=True)
+            pipe.zadd(self._recent_hits_key(bucket), {member: 0}, nx=True)
+            pipe.zcard(self._popularity_key(bucket))
+            _, _, _, size = await pipe.execute()
+            # Only now can other workers refetch the new value when they drop
+            # their local copy
+            await self._publish_invalidation([cache_key])
+
+            if self.local_cache is not None:
+                cache_data = {
+                    "response": response,
+                    "message": message,
+                    "session_id": session_id,
+                }
+                self.local_cache.set(cache_key, cache_data, len(payload))
+            if self.semantic_index is not None and session_id is None:
+                self.semantic_index.add(cache_key, message)
+
+            capacity = self._bucket_capacity()
+            if size > capacity:
+                await self._evict(bucket, size - capacity, keep=member)
+
+        except ShardUnavailable:
+            metrics.increment("cache_shard_skips")
+        except Exception as e:
+            self.shards.report_failure(bucket, e)
+            print(f"Error writing to cache: {e}")
+
+    async def _evict(self, bucket: str, excess: int, keep: str) -> None:
+        """Drop the least popular entries until the bucket is back under its cap.
+
+        Entries with at least CACHE_POPULAR_THRESHOLD hits are only dropped
+        once their response has already expired.
+        """
+        client = self.shards.client(bucket)
+        popularity_key = self._popularity_key(bucket)
+        victims = [
+            member
+            for member in self._decode_members(
+                await client.zrangebyscore(
+                    popularity_key,
+                    "-inf",
+                    f"({settings.CACHE_POPULAR_THRESHOLD}",
+                    start=0,
+                    num=excess + 1,
+                )
             )
+            if member != keep
+        ][:excess]
 
-            # Initialize popularity if not exists
-            if not await self.redis_client.exists(popularity_key):
-                await self.redis_client.setex(
+        if len(victims) < excess:
+            # Only popular entries left: reclaim the ones Redis already expired
+            popular = self._decode_members(
+                await client.zrangebyscore(
                     popularity_key,
-                    settings.CACHE_TTL * 2,  # Longer TTL for popularity
-                    1,
+                    settings.CACHE_POPULAR_THRESHOLD,
+                    "+inf",
+                    start=0,
+                    num=excess - len(victims),
                 )
+            )
+            pipe = client.pipeline(transaction=False)
+            for member in popular:
+                pipe.exists(self._member_cache_key(member))
+            alive = await pipe.execute()
+            victims += [m for m, live in zip(popular, alive, strict=True) if not live]
+
+        if not victims:
+            return
+
+        await self._drop(bucket, [self._member_cache_key(m) for m in victims])
+        metrics.increment("cache_evictions", len(victims))
+
+    async def _top_members(
+        self,
+        limit: int,
+        min_score: float | str = "-inf",
+        key: Callable[[str], str] | None = None,
+    ) -> list[str]:
+        """Highest-scored members across every bucket on a healthy shard.
+
+        Scores come from the popularity sets unless ``key`` names another
+        per-bucket sorted set.
+        """
+        key = key or self._popularity_key
+        results = await self._fan_out(
+            self._all_buckets(),
+            lambda bucket: bucket,
+            lambda pipe, bucket: pipe.zrevrangebyscore(
+                key(bucket),
+                "+inf",
+                min_score,
+                start=0,
+                num=limit,
+                withscores=True,
+            ),
+        )
+        scored = [pair for _, pairs in results for pair in pairs]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return self._decode_members([member for member, _ in scored[:limit]])
 
-            # Clean up if we have too many entries
-            await self._cleanup_old_entries()
+    async def warm_up(self, limit: int) -> int:
+        """Load the most popular entries into the local and semantic tiers."""
+        if not self.cache_enabled or not self.shards or limit <= 0:
+            return 0
 
+        try:
+            members = await self._top_members(limit)
+            values = await self._fan_out(
+                members,
+                self._bucket,
+                lambda pipe, member: pipe.get(self._member_cache_key(member)),
+            )
         except Exception as e:
-            print(f"Error writing to cache: {e}")
+            print(f"Error warming up cache: {e}")
+            return 0
 
-    async def _increment_popularity(self, message: str) -> None:
-        """Increment popularity counter for a message."""
-        if not self.cache_enabled or not self.redis_client:
+        loaded = 0
+        for member, cached_data in values:
+            if not cached_data:
+                continue
+            cache_key = self._member_cache_key(member)
+            data = decode_entry(cached_data)
+            if self.local_cache is not None:
+                self.local_cache.set(cache_key, data, len(cached_data))
+            if self.semantic_index is not None and data.get("session_id") is None:
+                self.semantic_index.add(cache_key, data["message"])
+            loaded += 1
+        metrics.increment("cache_warmed_entries", loaded)
+        return loaded
+
+    async def refresh_candidates(self, window: int, limit: int) -> list[dict[str, Any]]:
+        """Return popular shared entries that expire within ``window`` seconds.
+
+        Each entry returned is claimed with a lock lasting ``window`` seconds,
+        so only one worker regenerates it. Entries are picked by their hits
+        since the last refresh, which the claim resets, so old traffic alone
+        never earns another refresh. Popularity, which guards entries from
+        eviction, is left as it is.
+        """
+        if not self.cache_enabled or not self.shards:
+            return []
+
+        try:
+            members = await self._top_members(
+                limit,
+                min_score=settings.CACHE_POPULAR_THRESHOLD,
+                key=self._recent_hits_key,
+            )
+            ttls = await self._fan_out(
+                members,
+                self._bucket,
+                lambda pipe, member: pipe.ttl(self._member_cache_key(member)),
+            )
+            due = [member for member, ttl in ttls if 0 < ttl <= window]
+            claims = await self._fan_out(
+                due,
+                self._bucket,
+                lambda pipe, member: pipe.set(
+                    self._refresh_lock_key(member),
+                    self.worker_id,
+                    nx=True,
+                    ex=window,
+                ),
+            )
+            claimed = [member for member, claimed in claims if claimed]
+            values = await self._fan_out(
+                claimed,
+                self._bucket,
+                lambda pipe, member: pipe.get(self._member_cache_key(member)),
+            )
+            await self._fan_out(
+                claimed,
+                self._bucket,
+                lambda pipe, member: pipe.zadd(
+                    self._recent_hits_key(self._bucket(member)), {member: 0}, xx=True
+                ),
+            )
+        except Exception as e:
+            print(f"Error reading refresh candidates: {e}")
+            return []
+
+        entries = []
+        for _, cached_data in values:
+            if not cached_data:
+                continue
+            data = decode_entry(cached_data)
+            if data.get("session_id") is None:
+                entries.append(data)
+        return entries
+
+    async def invalidate(self, message: str, session_id: str | None = None) -> None:
+        """Remove a cached response from Redis and every worker's local tier."""
+        if not self.cache_enabled or not self.shards:
             return
 
+        cache_key = self._generate_cache_key(message, session_id)
+        bucket = self._bucket(self._popularity_member(cache_key))
         try:
-            popularity_key = self._generate_popularity_key(message)
-            await self.redis_client.incr(popularity_key)
+            await self._drop(bucket, [cache_key])
+        except Exception as e:
+            self.shards.report_failure(bucket, e)
+            print(f"Error invalidating cache: {e}")
+
+    async def _drop(self, bucket: str, cache_keys: list[str]) -> None:
+        """Delete entries of one bucket everywhere they are cached."""
+        pipe = self.shards.client(bucket).pipeline(transaction=True)
+        pipe.delete(*cache_keys)
+        members = [self._popularity_member(k) for k in cache_keys]
+        pipe.zrem(self._popularity_key(bucket), *members)
+        pipe.zrem(self._recent_hits_key(bucket), *members)
+        await pipe.execute()
+        await self._publish_invalidation(cache_keys)
+        for cache_key in cache_keys:
+            if self.local_cache is not None:
+                self.local_cache.discard(cache_key)
+            if self.semantic_index is not None:
+                self.semantic_index.remove(cache_key)
+
+    async def acquire_fill(self, message: str, ttl: float) -> bool:
+        """Claim the upstream call for ``message`` across workers.
+
+        Returns False when another worker already holds the claim; the caller
+        should then wait_for_fill(). The wait is registered before the claim
+        is tried, so a fill finishing in between is not missed. Without a
+        reachable shard every caller is its own leader.
+        """
+        if not self.cache_enabled or not self.shards:
+            return True
+
+        cache_key = self._generate_cache_key(message)
+        member = self._popularity_member(cache_key)
+        bucket = self._bucket(member)
+        waiter = self._fill_waiters.get(cache_key)
+        if waiter is None or waiter.done():
+            waiter = asyncio.get_running_loop().create_future()
+            self._fill_waiters[cache_key] = waiter
+        try:
+            acquired = await self.shards.client(bucket).set(
+                self._fill_lock_key(member),
+                self.worker_id,
+                nx=True,
+                px=int(ttl * 1000),
+            )
+        except ShardUnavailable:
+            acquired = True
+        except Exception as e:
+            self.shards.report_failure(bucket, e)
+            print(f"Error acquiring cache fill lock: {e}")
+            acquired = True
+
+        if acquired:
+            self._fill_waiters.pop(cache_key, None)
+        return bool(acquired)
+
+    async def wait_for_fill(self, message: str, timeout: float) -> Any | None:
+        """Wait for another worker's fill of ``message``, then read the cache."""
+        cache_key = self._generate_cache_key(message)
+        waiter = self._fill_waiters.get(cache_key)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            except TimeoutError:
+                metrics.increment("single_flight_wait_timeouts")
+            finally:
+                if self._fill_waiters.get(cache_key) is waiter:
+                    del self._fill_waiters[cache_key]
+        return await self.get_cached_response(message)
+
+    async def release_fill(self, message: str, filled: bool) -> None:
+        """Give up the claim taken by acquire_fill.
+
+        When nothing was cached, waiting workers are told to stop waiting;
+        a successful fill already notified them through set_cached_response.
+        """
+        if not self.cache_enabled or not self.shards:
+            return
+
+        cache_key = self._generate_cache_key(message)
+        member = self._popularity_member(cache_key)
+        bucket = self._bucket(member)
+        lock_key = self._fill_lock_key(member)
+        try:
+            client = self.shards.client(bucket)
+            # Only delete our own claim; after the TTL it may be someone else's
+            if await client.get(lock_key) == self.worker_id.encode():
+                await client.delete(lock_key)
+        except ShardUnavailable:
+            return
+        except Exception as e:
+            self.shards.report_failure(bucket, e)
+            print(f"Error releasing cache fill lock: {e}")
+        if not filled:
+            await self._publish_invalidation([cache_key])
+
+    async def _publish_invalidation(self, cache_keys: list[str]) -> None:
+        try:
+            await self.shards.client(_CONTROL_TAG).publish(
+                self._invalidation_channel(), self._invalidation_event(cache_keys)
+            )
+        except ShardUnavailable:
+            # Listeners are disconnected too and clear their local tier
+            pass
+        except Exception as e:
+            self.shards.report_failure(_CONTROL_TAG, e)
+            print(f"Error publishing cache invalidation: {e}")
+
+    async def _listen_invalidations(self) -> None:
+        """Drop local entries that another worker overwrote or removed."""
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.shards.client(_CONTROL_TAG).pubsub()
+                await pubsub.subscribe(self._invalidation_channel())
+                while True:
+                    # listen() would read under the client's socket_timeout
+                    # and fail whenever the channel stays quiet that long
+                    message = await pubsub.get_message(timeout=_PUBSUB_POLL_SECONDS)
+                    if message is None or message["type"] != "message":
+                        continue
+                    event = json.loads(message["data"])
+                    for cache_key in event.get("keys", []):
+                        waiter = self._fill_waiters.pop(cache_key, None)
+                        if waiter is not None and not waiter.done():
+                            waiter.set_result(None)
+                    if event.get("origin") == self.worker_id:
+                        continue
+                    if self.local_cache is not None:
+                        for cache_key in event.get("keys", []):
+                            self.local_cache.discard(cache_key)
+                    metrics.increment("cache_invalidations_received")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A stalled subscription is not a down shard; just reconnect
+                if not isinstance(e, (ShardUnavailable, redis_exceptions.TimeoutError)):
+                    self.shards.report_failure(_CONTROL_TAG, e)
+                    print(f"Cache invalidation listener failed: {e}")
+                # Invalidations may have been missed while disconnected
+                if self.local_cache is not None:
+                    self.local_cache.clear()
+                await asyncio.sleep(1.0)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+    async def _flush_hits_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(settings.CACHE_HIT_FLUSH_INTERVAL)
+            await self._flush_hits()
+
+    async def _flush_hits(self) -> None:
+        """Add hits served from the local tier to the popularity sets."""
+        if not self._pending_hits:
+            return
+        hits, self._pending_hits = self._pending_hits, Counter()
+        try:
+            for key in (self._popularity_key, self._recent_hits_key):
+                await self._fan_out(
+                    list(hits),
+                    self._bucket,
+                    lambda pipe, member, key=key: pipe.zadd(
+                        key(self._bucket(member)),
+                        {member: hits[member]},
+                        xx=True,
+                        incr=True,
+                    ),
+                )
         except Exception as e:
-            print(f"Error incrementing popularity: {e}")
+            print(f"Error flushing cache hits: {e}")
@@ -0,0 +1,77 @@
+"""Compact binary encoding for cached responses."""
+
+import json
+import struct
+import zlib
+from typing import Any
+
+VERSION = 1
+
+# Flag bits stored after the version byte
+FLAG_COMPRESSED = 0x01
+FLAG_JSON_RESPONSE = 0x02
+FLAG_SESSION = 0x04
+
+_HEADER = struct.Struct("!BB")
+_LENGTH = struct.Struct("!I")
+
+
+def encode_entry(
+    message: str,
+    response: Any,
+    session_id: str | None = None,
+    compress_min_bytes: int = 512,
+    compression_level: int = 6,
+) -> bytes:
+    """Pack an entry as version, flags, then length-prefixed fields.
+
+    The body is ``message``, optionally ``session_id``, then the response
+    running to the end. Bodies of at least ``compress_min_bytes`` are
+    zlib-compressed when that makes them smaller.
+    """
+    flags = 0
+    if isinstance(response, str):
+        response_bytes = response.encode()
+    else:
+        response_bytes = json.dumps(response, separators=(",", ":")).encode()
+        flags |= FLAG_JSON_RESPONSE
+
+    message_bytes = message.encode()
+    parts = [_LENGTH.pack(len(message_bytes)), message_bytes]
+    if session_id is not None:
+        session_bytes = session_id.encode()
+        parts += [_LENGTH.pack(len(session_bytes)), session_bytes]
+        flags |= FLAG_SESSION
+    parts.append(response_bytes)
+    body = b"".join(parts)
+
+    if len(body) >= compress_min_bytes:
+        compressed = zlib.compress(body, compression_level)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= FLAG_COMPRESSED
+    return _HEADER.pack(VERSION, flags) + body
+
+
+def decode_entry(data: bytes) -> dict[str, Any]:
+    """Decode an entry written by encode_entry."""
+    version, flags = _HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"Unsupported cache entry version: {version}")
+    body = memoryview(data)[_HEADER.size :]
+    if flags & FLAG_COMPRESSED:
+        body = memoryview(zlib.decompress(body))
+
+    (length,) = _LENGTH.unpack_from(body)
+    offset = _LENGTH.size + length
+    message = str(body[_LENGTH.size : offset], "utf-8")
+    session_id = None
+    if flags & FLAG_SESSION:
+        (length,) = _LENGTH.unpack_from(body, offset)
+        start = offset + _LENGTH.size
+        offset = start + length
+        session_id = str(body[start:offset], "utf-8")
+    response: Any = str(body[offset:], "utf-8")
+    if flags & FLAG_JSON_RESPONSE:
+        response = json.loads(response)
+    return {"response": response, "message": message, "session_id": session_id}
@@ -0,0 +1,78 @@
+"""Refresh-ahead regeneration of popular cached answers."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from cache import CacheManager
+from shared.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CacheRefresher:
+    """Regenerate hot entries shortly before their Redis TTL runs out.
+
+    Every ``interval`` seconds the most popular entries expiring within
+    ``refresh_ahead`` seconds are answered again and rewritten, so users
+    asking them never pay for a cold miss. At most ``max_concurrency``
+    regeneration calls run at once.
+    """
+
+    def __init__(
+        self,
+        cache_manager: CacheManager,
+        regenerate: Callable[[str], Awaitable[str]],
+        interval: float,
+        refresh_ahead: int,
+        top_n: int,
+        max_concurrency: int,
+    ) -> None:
+        self.cache_manager = cache_manager
+        self.regenerate = regenerate
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.top_n = top_n
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_due()
+            except Exception as e:
+                logger.error(f"Error refreshing cache: {e}")
+
+    async def refresh_due(self) -> int:
+        """Regenerate the entries that are about to expire."""
+        entries = await self.cache_manager.refresh_candidates(
+            self.refresh_ahead, self.top_n
+        )
+        refreshed = await asyncio.gather(
+            *(self._refresh(entry["message"]) for entry in entries)
+        )
+        return sum(refreshed)
+
+    async def _refresh(self, message: str) -> bool:
+        async with self._semaphore:
+            try:
+                response = await self.regenerate(message)
+            except Exception as e:
+                logger.warning(f"Error regenerating cached answer: {e}")
+                metrics.increment("cache_refresh_errors")
+                return False
+        await self.cache_manager.set_cached_response(message, response)
+        metrics.increment("cache_refreshes")
+        return True
@@ -0,0 +1,130 @@
+"""Client-side consistent-hash sharding of the cache over several Redis nodes."""
+
+import bisect
+import hashlib
+import time
+from collections.abc import Iterable
+from urllib.parse import urlsplit
+
+import redis.asyncio as redis
+from redis import exceptions as redis_exceptions
+
+from shared.metrics import metrics
+
+
+class ShardUnavailable(Exception):
+    """Raised when the node owning a hash tag is marked down."""
+
+
+class ShardedRedis:
+    """Route hash tags to Redis nodes on a consistent-hash ring.
+
+    Keys that belong together share a hash tag and therefore a node, so
+    pipelines and transactions never span shards. A node that fails with a
+    connection error is skipped for ``retry_after`` seconds; its keys read
+    as misses instead of moving to another node, which keeps the ring and
+    everyone's view of it stable.
+    """
+
+    def __init__(
+        self,
+        clients: dict[str, redis.Redis],
+        retry_after: float = 30.0,
+        replicas: int = 128,
+    ) -> None:
+        self.clients = clients
+        self.retry_after = retry_after
+        self._down_until: dict[str, float] = {}
+        ring = sorted(
+            (self._hash(f"{name}#{i}"), name)
+            for name in clients
+            for i in range(replicas)
+        )
+        self._points = [point for point, _ in ring]
+        self._names = [name for _, name in ring]
+
+    @classmethod
+    def from_urls(
+        cls,
+        urls: list[str],
+        max_connections: int,
+        socket_timeout: float,
+        retry_after: float,
+        health_check_interval: float = 0.0,
+    ) -> "ShardedRedis":
+        clients = {
+            url: redis.from_url(
+                url,
+                decode_responses=False,
+                max_connections=max_connections,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_timeout,
+                # Pings quiet pub/sub connections too, so a dead one is noticed
+                health_check_interval=health_check_interval,
+            )
+            for url in urls
+        }
+        return cls(clients, retry_after)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    @staticmethod
+    def _label(name: str) -> str:
+        """Shard name without credentials, for logs."""
+        parts = urlsplit(name)
+        return parts.netloc.rsplit("@", 1)[-1] or name
+
+    def shard_for(self, tag: str) -> str:
+        index = bisect.bisect(self._points, self._hash(tag)) % len(self._points)
+        return self._names[index]
+
+    def is_up(self, name: str) -> bool:
+        return self._down_until.get(name, 0.0) <= time.monotonic()
+
+    def client(self, tag: str) -> redis.Redis:
+        """Return the client owning ``tag``, or raise ShardUnavailable."""
+        name = self.shard_for(tag)
+        if not self.is_up(name):
+            raise ShardUnavailable(f"Redis shard {self._label(name)} is down")
+        return self.clients[name]
+
+    def partition(self, tags: Iterable[str]) -> dict[str, list[str]]:
+        """Group tags by the healthy shard that owns them."""
+        groups: dict[str, list[str]] = {}
+        for tag in tags:
+            name = self.shard_for(tag)
+            if self.is_up(name):
+                groups.setdefault(name, []).append(tag)
+        return groups
+
+    def report_failure(self, tag: str, error: Exception) -> None:
+        """Take the shard owning ``tag`` out of rotation after a connection error."""
+        if not isinstance(
+            error, (redis_exceptions.ConnectionError, redis_exceptions.TimeoutError)
+        ):
+            return
+        name = self.shard_for(tag)
+        if self.is_up(name):
+            print(f"❌ Redis shard {self._label(name)} unavailable: {error}")
+            metrics.increment("cache_shard_failures")
+        self._down_until[name] = time.monotonic() + self.retry_after
+
+    async def ping(self) -> int:
+        """Ping every shard, marking failures down; return the healthy count."""
+        healthy = 0
+        for name, client in self.clients.items():
+            try:
+                await client.ping()
+            except Exception as e:
+                print(f"❌ Redis shard {self._label(name)} unavailable: {e}")
+                self._down_until[name] = time.monotonic() + self.retry_after
+                continue
+            self._down_until.pop(name, None)
+            healthy += 1
+        return healthy
+
+    async def aclose(self) -> None:
+        for client in self.clients.values():
+            await client.aclose()
@@ -1,5 +1,6 @@
 """Configuration settings for the Evolution API - MCP Bridge."""
 
+import json
 import os
 
 from dotenv import load_dotenv
@@ -15,10 +16,26 @@ class Settings:
         "EVOLUTION_API_BASE_URL", "http://localhost:8080"
     )
     EVOLUTION_API_KEY = os.getenv("EVOLUTION_API_KEY", "")
+    EVOLUTION_PRESENCE_DELAY = int(os.getenv("EVOLUTION_PRESENCE_DELAY", "10000"))
 
     # MCP Server Configuration
     MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8001")
     MCP_API_KEY = os.getenv("MCP_API_KEY", "")
+    # Let the model call the MCP server's tools while answering
+    MCP_TOOLS_ENABLED = os.getenv("MCP_TOOLS_ENABLED", "false").lower() == "true"
+    MCP_TIMEOUT = float(os.getenv("MCP_TIMEOUT", "30"))
+    MCP_TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", "15"))
+    # JSON object of per-tool timeouts in seconds, e.g. {"search_flights": 30}
+    MCP_TOOL_TIMEOUTS = json.loads(os.getenv("MCP_TOOL_TIMEOUTS", "{}"))
+    MCP_MAX_TOOL_ITERATIONS = int(os.getenv("MCP_MAX_TOOL_ITERATIONS", "4"))
+    MCP_TOOLS_CACHE_TTL = float(os.getenv("MCP_TOOLS_CACHE_TTL", "300"))
+    # Results of read-only or idempotent tools are reused for this long
+    MCP_TOOL_RESULT_TTL = float(os.getenv("MCP_TOOL_RESULT_TTL", "60"))
+    # JSON object of per-tool result TTLs; listed tools are memoized too
+    MCP_TOOL_RESULT_TTLS = json.loads(os.getenv("MCP_TOOL_RESULT_TTLS", "{}"))
+    MCP_TOOL_RESULT_CACHE_MAX_BYTES = int(
+        os.getenv("MCP_TOOL_RESULT_CACHE_MAX_BYTES", "4194304")
+    )
 
     # FastAPI Configuration
     HOST = os.getenv("HOST", "0.0.0.0")
@@ -30,8 +47,58 @@ class Settings:
     DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
 
     DEEPSEEK_MODEL = "deepseek-chat"
+
+    # LLM HTTP Transport Configuration
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(
+        os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+    LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() == "true"
+
+    # LLM Concurrency Configuration
+    LLM_CONCURRENCY_INITIAL = float(os.getenv("LLM_CONCURRENCY_INITIAL", "8"))
+    LLM_CONCURRENCY_MIN = float(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+    LLM_CONCURRENCY_MAX = float(os.getenv("LLM_CONCURRENCY_MAX", "64"))
+    LLM_CONCURRENCY_BACKOFF = float(os.getenv("LLM_CONCURRENCY_BACKOFF", "0.5"))
+    LLM_DEFAULT_RETRY_AFTER = float(os.getenv("LLM_DEFAULT_RETRY_AFTER", "1"))
+
+    # LLM Routing Configuration
+    # JSON list of extra OpenAI-compatible backends next to DeepSeek, e.g.
+    # [{"name": "local", "base_url": "http://vllm:8000/v1", "model": "qwen"}]
+    # Callers asking for a specific model (e.g. SUMMARY_MODEL) get "model"
+    # there unless "models" maps it, e.g. {"deepseek-chat": "qwen-small"}
+    LLM_BACKENDS = json.loads(os.getenv("LLM_BACKENDS", "[]"))
+    LLM_ROUTER_EWMA_ALPHA = float(os.getenv("LLM_ROUTER_EWMA_ALPHA", "0.3"))
+    LLM_ROUTER_ERROR_WEIGHT = float(os.getenv("LLM_ROUTER_ERROR_WEIGHT", "4"))
+    LLM_BACKEND_COOLDOWN = float(os.getenv("LLM_BACKEND_COOLDOWN", "10"))
+    # Assumed seconds to first byte while no backend has answered yet
+    LLM_ROUTER_DEFAULT_LATENCY = float(os.getenv("LLM_ROUTER_DEFAULT_LATENCY", "1"))
+
+    # Latency Budget Configuration
+    REPLY_DEADLINE_SECONDS = float(os.getenv("REPLY_DEADLINE_SECONDS", "60"))
+    LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+    LLM_HEDGE_BUDGET_PERCENT = float(os.getenv("LLM_HEDGE_BUDGET_PERCENT", "5"))
+
+    # Response Streaming Configuration
+    LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+    STREAM_MIN_SEGMENT_CHARS = int(os.getenv("STREAM_MIN_SEGMENT_CHARS", "280"))
+    STREAM_MAX_SEGMENT_CHARS = int(os.getenv("STREAM_MAX_SEGMENT_CHARS", "1500"))
     # Redis Cache Configuration
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+    # Comma-separated shard URLs; defaults to the single REDIS_URL
+    REDIS_URLS = [
+        url.strip() for url in os.getenv("REDIS_URLS", "").split(",") if url.strip()
+    ] or [REDIS_URL]
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "1.0"))
+    # Seconds idle before a connection is pinged, including pub/sub
+    REDIS_HEALTH_CHECK_INTERVAL = float(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
     CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
     CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))  # 1 hour default
     CACHE_PREFIX = os.getenv("CACHE_PREFIX", "evolution_mcp")
@@ -39,8 +106,78 @@ class Settings:
     # Cache Strategy Configuration
     CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
     CACHE_POPULAR_THRESHOLD = int(os.getenv("CACHE_POPULAR_THRESHOLD", "5"))
+    CACHE_HASH_BUCKETS = int(os.getenv("CACHE_HASH_BUCKETS", "64"))
+    CACHE_SHARD_RETRY_SECONDS = float(os.getenv("CACHE_SHARD_RETRY_SECONDS", "30"))
+    CACHE_MAX_HISTORY_TURNS = int(os.getenv("CACHE_MAX_HISTORY_TURNS", "0"))
+    CACHE_MAX_MESSAGE_CHARS = int(os.getenv("CACHE_MAX_MESSAGE_CHARS", "200"))
+    CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "512"))
+    CACHE_COMPRESSION_LEVEL = int(os.getenv("CACHE_COMPRESSION_LEVEL", "6"))
+
+    # Local Cache Configuration
+    CACHE_LOCAL_ENABLED = os.getenv("CACHE_LOCAL_ENABLED", "true").lower() == "true"
+    CACHE_LOCAL_MAX_BYTES = int(os.getenv("CACHE_LOCAL_MAX_BYTES", "16777216"))
+    CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", "60"))
+    CACHE_HIT_FLUSH_INTERVAL = float(os.getenv("CACHE_HIT_FLUSH_INTERVAL", "5"))
+
+    # Cache Refresh Configuration
+    CACHE_REFRESH_ENABLED = os.getenv("CACHE_REFRESH_ENABLED", "true").lower() == "true"
+    CACHE_REFRESH_INTERVAL = float(os.getenv("CACHE_REFRESH_INTERVAL", "60"))
+    CACHE_REFRESH_AHEAD = int(os.getenv("CACHE_REFRESH_AHEAD", "300"))
+    CACHE_REFRESH_TOP_N = int(os.getenv("CACHE_REFRESH_TOP_N", "50"))
+    CACHE_REFRESH_CONCURRENCY = int(os.getenv("CACHE_REFRESH_CONCURRENCY", "2"))
+    CACHE_WARMUP_TOP_N = int(os.getenv("CACHE_WARMUP_TOP_N", "100"))
+
+    # Single-Flight Configuration
+    SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+    SINGLE_FLIGHT_LOCK_TTL = float(os.getenv("SINGLE_FLIGHT_LOCK_TTL", "30"))
+    SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT", "30"))
+
+    # Semantic Cache Configuration
+    SEMANTIC_CACHE_ENABLED = (
+        os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    )
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.5"))
+    SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "2048"))
+    SEMANTIC_CACHE_TOP_K = int(os.getenv("SEMANTIC_CACHE_TOP_K", "3"))
     RABBITMQ_URL = os.getenv("RABBITMQ_URL", "amqp://guest:guest:@localhost:15672/")
     CONTACT = os.getenv("CONTACT", "SUPPORT_NUMBER")
+    # Seconds between error notifications sent to CONTACT
+    ERROR_NOTIFY_INTERVAL = float(os.getenv("ERROR_NOTIFY_INTERVAL", "300"))
+
+    # Webhook Ingestion Configuration
+    INGESTION_QUEUE_MAXSIZE = int(os.getenv("INGESTION_QUEUE_MAXSIZE", "1000"))
+    INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "16"))
+    INGESTION_RETRY_AFTER = int(os.getenv("INGESTION_RETRY_AFTER", "5"))
+    WEBHOOK_LOG_SAMPLE_RATE = float(os.getenv("WEBHOOK_LOG_SAMPLE_RATE", "0.01"))
+    WEBHOOK_LOG_MAX_BYTES = int(os.getenv("WEBHOOK_LOG_MAX_BYTES", "2048"))
+
+    # Per-session Scheduling Configuration
+    SESSION_MAX_CONCURRENCY = int(os.getenv("SESSION_MAX_CONCURRENCY", "64"))
+    SESSION_MAX_PENDING = int(os.getenv("SESSION_MAX_PENDING", "5000"))
+
+    # Conversation Memory Configuration
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+    SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", REDIS_URL)
+    SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))
+    SESSION_MAX_TOKENS = int(os.getenv("SESSION_MAX_TOKENS", "6000"))
+    SESSION_MAX_TOTAL_TOKENS = int(os.getenv("SESSION_MAX_TOTAL_TOKENS", "50000000"))
+    SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "86400"))
+    SESSION_EXPORT_PAGE_SIZE = int(os.getenv("SESSION_EXPORT_PAGE_SIZE", "200"))
+
+    # Conversation Summarization Configuration
+    SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "true").lower() == "true"
+    SUMMARY_THRESHOLD_TOKENS = int(os.getenv("SUMMARY_THRESHOLD_TOKENS", "4000"))
+    SUMMARY_KEEP_TURNS = int(os.getenv("SUMMARY_KEEP_TURNS", "6"))
+    SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "deepseek-chat")
+    SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "512"))
+
+    # Message Coalescing Configuration
+    COALESCE_WINDOW_SECONDS = float(os.getenv("COALESCE_WINDOW_SECONDS", "1.5"))
+    COALESCE_MAX_MESSAGES = int(os.getenv("COALESCE_MAX_MESSAGES", "5"))
+
+    # Webhook Deduplication Configuration
+    DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "10000"))
+    DEDUP_TTL = int(os.getenv("DEDUP_TTL", "86400"))
 
 
 settings = Settings()
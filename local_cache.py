@@ -0,0 +1,58 @@
+"""In-process size-bounded LRU caches."""
+
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class LocalCache:
+    """Size-bounded LRU with a per-entry TTL.
+
+    Entries are charged by the size of their serialized form, so the cap
+    tracks memory use rather than entry count. The TTL is kept short: it
+    bounds staleness if a cross-worker invalidation is missed.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[Any, int, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, _size, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int, ttl: float | None = None) -> None:
+        """Store ``value``, charged ``size`` bytes; ``ttl`` overrides the default."""
+        self.discard(key)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (value, size, expires_at)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
@@ -1,17 +1,27 @@
 import asyncio
+import json
 import logging
 from typing import Any
 
-from fastapi import BackgroundTasks, FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.concurrency import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from ai.adaptive_limiter import llm_limiter
+from ai.llm_router import llm_router
 from ai.ai_service import AgentService
 from ai.mcp_models import AgentMessage
+from ai.summarizer import ConversationSummarizer
+from cache import CacheManager
+from cache_refresher import CacheRefresher
 from config import settings
 
 from messaging.evolution_client import EvolutionClient
 from ai.mcp_client import MCPClient
+from messaging.deduplicator import MessageDeduplicator
+from messaging.error_notifier import ErrorNotifier
+from messaging.ingestion_queue import IngestionQueue, IngestionQueueFull
+from messaging.session_scheduler import SessionScheduler
 from messaging.message_service import MessageService
 from messaging.models import (
     MCPMessage,
@@ -21,6 +31,14 @@ from messaging.models import (
     WebhookPayload,
 )
 from messaging.rabbitmq_consumer import EvolutionRabbitMQConsumer
+from messaging.webhook_parser import (
+    WebhookParseError,
+    log_payload_sample,
+    parse_webhook_batch_body,
+    parse_webhook_body,
+)
+from shared.metrics import metrics
+from shared.session_store import create_session_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,9 +47,28 @@ logger = logging.getLogger(__name__)
 
 # Client instances
 evolution_client = EvolutionClient()
-agent_service = AgentService()
+cache_manager = CacheManager()
+agent_service = AgentService(cache_manager)
+mcp_client = agent_service.mcp_client
+cache_refresher = CacheRefresher(
+    cache_manager,
+    agent_service.regenerate,
+    interval=settings.CACHE_REFRESH_INTERVAL,
+    refresh_ahead=settings.CACHE_REFRESH_AHEAD,
+    top_n=settings.CACHE_REFRESH_TOP_N,
+    max_concurrency=settings.CACHE_REFRESH_CONCURRENCY,
+)
 message_service = MessageService()
 rabbitmq_consumer = EvolutionRabbitMQConsumer(rabbitmq_url=settings.RABBITMQ_URL)
+ingestion_queue = IngestionQueue(
+    maxsize=settings.INGESTION_QUEUE_MAXSIZE, workers=settings.INGESTION_WORKERS
+)
+message_deduplicator = MessageDeduplicator(
+    max_entries=settings.DEDUP_MAX_ENTRIES, ttl=settings.DEDUP_TTL
+)
+error_notifier = ErrorNotifier(
+    evolution_client, settings.CONTACT, interval=settings.ERROR_NOTIFY_INTERVAL
+)
 
 
 @asynccontextmanager
@@ -39,8 +76,25 @@ async def lifespan(app: FastAPI):
     # Code to run on startup
     # await rabbitmq_consumer.connect()
     print("Application startup!")
+    await session_store.initialize()
+    await cache_manager.initialize()
+    await cache_manager.warm_up(settings.CACHE_WARMUP_TOP_N)
+    if settings.MCP_TOOLS_ENABLED:
+        await mcp_client.preload()
+    if settings.CACHE_REFRESH_ENABLED:
+        cache_refresher.start()
+    await message_deduplicator.initialize()
+    await ingestion_queue.start(process_webhook_message)
     yield
     # Code to run on shutdown
+    await ingestion_queue.stop()
+    await session_scheduler.stop()
+    await conversation_summarizer.stop()
+    await cache_refresher.stop()
+    await agent_service.close()
+    await cache_manager.close()
+    await message_deduplicator.close()
+    await session_store.close()
     print("Application shutdown!")
 
 
@@ -61,8 +115,19 @@ app.add_middleware(
 )
 
 
+# Fire-and-forget tasks are referenced here until they finish
+background_tasks: set[asyncio.Task] = set()
+
 # Store conversation sessions
-conversation_sessions: dict[str, list[AgentMessage]] = {}
+session_store = create_session_store()
+conversation_summarizer = ConversationSummarizer(
+    session_store,
+    agent_service.deepseek_service,
+    threshold_tokens=settings.SUMMARY_THRESHOLD_TOKENS,
+    keep_turns=settings.SUMMARY_KEEP_TURNS,
+    model=settings.SUMMARY_MODEL,
+    max_tokens=settings.SUMMARY_MAX_TOKENS,
+)
 
 
 async def startup_event() -> None:
@@ -78,14 +143,37 @@ async def root() -> dict[str, str]:
 @app.get("/health")
 async def health_check() -> dict[str, Any]:
     """Health check endpoint"""
-    try:  # todo
-        mcp_health = {"stable": True}  # await mcp_client.health_check()
+    try:
+        mcp_health = await mcp_client.health_check()
         return {"status": "healthy", "mcp_server_available": mcp_health}
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         return {"status": "unhealthy", "mcp_server_available": False}
 
 
+@app.get("/metrics")
+async def get_metrics() -> dict[str, Any]:
+    """Expose pipeline counters and gauges"""
+    metrics.set_gauge("ingestion_queue_depth", ingestion_queue.qsize())
+    metrics.set_gauge("active_sessions", session_scheduler.active_sessions)
+    metrics.set_gauge("pending_session_messages", session_scheduler.pending)
+    metrics.set_gauge("stored_sessions", await session_store.count())
+    metrics.set_gauge("llm_concurrency_limit", llm_limiter.limit)
+    metrics.set_gauge("llm_in_flight", llm_limiter.in_flight)
+    metrics.set_gauge("llm_queue_depth", llm_limiter.queued)
+    for backend in llm_router.backends:
+        metrics.set_gauge(
+            f"llm_backend_{backend.name}_outstanding", backend.outstanding
+        )
+        metrics.set_gauge(
+            f"llm_backend_{backend.name}_latency_ms", (backend.latency or 0.0) * 1000
+        )
+    if cache_manager.local_cache is not None:
+        metrics.set_gauge("cache_local_entries", len(cache_manager.local_cache))
+        metrics.set_gauge("cache_local_bytes", cache_manager.local_cache.size)
+    return metrics.snapshot()
+
+
 @app.post("/send-message")
 async def send_message(request: SendMessageRequest):
     """Send message via Evolution API"""
@@ -108,94 +196,225 @@ async def send_media(request: SendMediaRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/webhook")
-async def webhook_handler(
-    payload: WebhookPayload, background_tasks: BackgroundTasks
-) -> dict[str, str]:
+@app.post("/webhook", status_code=202)
+async def webhook_handler(request: Request) -> dict[str, str]:
     """Handle incoming webhook messages from Evolution API"""
+    raw = await request.body()
     try:
-        logger.info(f"Received webhook from instance: {payload.instance}")
-        logger.info(f"Webhook data: {payload.data}")
-
-        # Process webhook in background
-        # background_tasks.add_task(process_webhook_message, payload)
-        await run_in_threadpool(process, payload)
-        return {"status": "received"}
-    except Exception as e:
-        logger.error(f"Error processing webhook: {str(e)}")
-        return {"status": "error", "message": str(e)}
+        payload = parse_webhook_body(raw)
+    except WebhookParseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    logger.debug("Received webhook from instance: %s", payload.instance)
+    log_payload_sample(logger, raw)
 
+    # Processing happens on the ingestion workers; only enqueue here
+    try:
+        ingestion_queue.submit(payload)
+    except IngestionQueueFull as e:
+        logger.warning(f"Rejecting webhook: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(settings.INGESTION_RETRY_AFTER)},
+        )
+    return {"status": "received"}
 
-def process(payload: WebhookPayload) -> None:
-    """Wrapper to run async process_webhook_message in sync context"""
-    asyncio.run(process_webhook_message(payload))
 
+@app.post("/webhook/batch", status_code=202)
+async def webhook_batch_handler(request: Request) -> dict[str, Any]:
+    """Handle an array of webhook events in a single request"""
+    raw = await request.body()
+    try:
+        payloads = parse_webhook_batch_body(raw)
+    except WebhookParseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    logger.debug("Received webhook batch with %d events", len(payloads))
+    log_payload_sample(logger, raw)
 
-async def process_webhook_message(payload: WebhookPayload) -> None:
-    """Process incoming webhook message and forward to MCP"""
     try:
-        # Extract message data from webhook payload
-        message_data = message_service.extract_message_data(payload.data)
+        ingestion_queue.submit_many(payloads)
+    except IngestionQueueFull as e:
+        logger.warning(f"Rejecting webhook batch: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(settings.INGESTION_RETRY_AFTER)},
+        )
+    return {"status": "received", "accepted": len(payloads)}
 
-        if not message_data or not message_data.get("text"):
+
+async def process_webhook_message(payload: WebhookPayload) -> None:
+    """Extract every message from a webhook and schedule it on its session"""
+    # Extract message data from webhook payload
+    messages = message_service.extract_messages(payload.data)
+    if not messages:
+        logger.info("No message found in webhook")
+        return
+
+    for message_data in messages:
+        if not message_data.get("text"):
             logger.info("No text message found in webhook")
-            return
+            continue
 
         # Get phone number as session identifier
         phone_number = message_data.get("from")
         if not phone_number:
             logger.warning("No phone number found in message")
-            return
+            continue
 
-        # Get or create conversation session
-        session_id = f"whatsapp_{phone_number}"
-        if session_id not in conversation_sessions:
-            conversation_sessions[session_id] = []
+        # Evolution retries webhooks and may also publish to RabbitMQ
+        if await message_deduplicator.is_duplicate(
+            payload.instance, message_data.get("id")
+        ):
+            logger.info(f"Dropping duplicate message {message_data.get('id')}")
+            metrics.increment("duplicate_messages_dropped")
+            continue
 
+        message_data["deadline"] = payload.received_at + settings.REPLY_DEADLINE_SECONDS
+        session_id = f"whatsapp_{phone_number}"
+        await session_scheduler.submit(session_id, message_data)
+
+
+async def process_session_message(session_id: str, batch: list[dict[str, Any]]) -> None:
+    """Forward a message batch to the agent; runs in order within its session"""
+    phone_number = batch[-1]["from"]
+    metrics.increment("messages_received", len(batch))
+    if len(batch) > 1:
+        # A burst of messages becomes one user turn and one LLM call
+        metrics.increment("llm_calls_saved_by_coalescing", len(batch) - 1)
+    # The oldest message in the batch sets how long the reply may take
+    deadline = min(
+        (m["deadline"] for m in batch if m.get("deadline") is not None),
+        default=None,
+    )
+    try:
         # Add user message to session
-        user_message = AgentMessage(role="user", content=message_data["text"])
-        conversation_sessions[session_id].append(user_message)
+        text = "\n".join(message_data["text"] for message_data in batch)
+        user_message = AgentMessage(role="user", content=text)
+        history = await session_store.append(session_id, user_message)
+
+        if settings.LLM_STREAMING:
+            reply = await stream_reply(phone_number, history, deadline)
+        else:
+            mcp_response = await agent_service.send(history, deadline=deadline)
+            reply = mcp_response.response
+
+            # Send response back via Evolution API
+            send_request = SendMessageRequest(number=phone_number, text=reply)
+            await evolution_client.send_message(send_request)
+        logger.info(f"Response sent to {phone_number}")
 
-        mcp_response = await agent_service.send(conversation_sessions[session_id])
         # Add assistant response to session
-        assistant_message = AgentMessage(
-            role="assistant", content=mcp_response.response
-        )
-        conversation_sessions[session_id].append(assistant_message)
-
-        # Send response back via Evolution API
-        send_request = SendMessageRequest(
-            number=phone_number, text=mcp_response.response
-        )
-
-        await evolution_client.send_message(send_request)
-        logger.info(f"Response sent to {phone_number}")
+        assistant_message = AgentMessage(role="assistant", content=reply)
+        history = await session_store.append(session_id, assistant_message)
+        if settings.SUMMARY_ENABLED:
+            conversation_summarizer.maybe_schedule(session_id, history)
 
     except Exception as e:
         logger.error(f"Error processing webhook message: {str(e)}")
+        await error_notifier.notify(e)
 
-        send_request = SendMessageRequest(
-            number=settings.CONTACT, text=f"erro ao acessar o  agente => {str(e)}"
-        )
+
+async def stream_reply(
+    phone_number: str, history: list[AgentMessage], deadline: float | None = None
+) -> str:
+    """Send the reply segment by segment while it is being generated"""
+    show_presence(phone_number)
+    segments = []
+    async for segment in agent_service.send_stream(history, deadline=deadline):
+        send_request = SendMessageRequest(number=phone_number, text=segment)
         await evolution_client.send_message(send_request)
+        if not segments:
+            metrics.increment("streamed_replies")
+        metrics.increment("streamed_segments_sent")
+        segments.append(segment)
+    return "\n\n".join(segments)
+
+
+def show_presence(phone_number: str) -> None:
+    """Show "composing" to the user without delaying the LLM request"""
+
+    async def send() -> None:
+        try:
+            await evolution_client.send_presence(phone_number)
+        except Exception as e:
+            logger.warning(f"Error sending presence to {phone_number}: {str(e)}")
+
+    task = asyncio.create_task(send())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+session_scheduler = SessionScheduler(
+    process_session_message,
+    max_concurrency=settings.SESSION_MAX_CONCURRENCY,
+    max_pending=settings.SESSION_MAX_PENDING,
+    coalesce_window=settings.COALESCE_WINDOW_SECONDS,
+    coalesce_max=settings.COALESCE_MAX_MESSAGES,
+)
 
 
 @app.get("/sessions")
-async def get_sessions() -> Any:
-    """Get all active conversation sessions"""
-    return {
-        "sessions": {
-            session_id: [msg.dict() for msg in messages]
-            for session_id, messages in conversation_sessions.items()
-        }
-    }
+async def get_sessions(
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    summary: bool = False,
+) -> dict[str, Any]:
+    """Get one page of active conversation sessions"""
+    summaries, next_cursor = await session_store.list_sessions(cursor, limit)
+    if summary:
+        sessions = [item.model_dump() for item in summaries]
+    else:
+        sessions = [
+            {
+                **item.model_dump(),
+                "messages": [
+                    msg.model_dump()
+                    for msg in await session_store.peek(item.session_id)
+                ],
+            }
+            for item in summaries
+        ]
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+
+@app.get("/sessions/export")
+async def export_sessions() -> StreamingResponse:
+    """Stream every session as newline-delimited JSON"""
+
+    async def generate():
+        cursor = None
+        while True:
+            summaries, cursor = await session_store.list_sessions(
+                cursor, settings.SESSION_EXPORT_PAGE_SIZE
+            )
+            for item in summaries:
+                messages = await session_store.peek(item.session_id)
+                line = {
+                    **item.model_dump(),
+                    "messages": [msg.model_dump() for msg in messages],
+                }
+                yield json.dumps(line) + "\n"
+            if cursor is None:
+                break
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str) -> dict[str, Any]:
+    """Get a single conversation session with its messages"""
+    item = await session_store.summary(session_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    messages = await session_store.peek(session_id)
+    return {**item.model_dump(), "messages": [msg.model_dump() for msg in messages]}
 
 
 @app.delete("/sessions/{session_id}")
 async def clear_session(session_id: str):
     """Clear a specific conversation session"""
-    if session_id in conversation_sessions:
-        del conversation_sessions[session_id]
+    if await session_store.delete(session_id):
         return {"status": "success", "message": f"Session {session_id} cleared"}
     else:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -0,0 +1,62 @@
+"""Idempotency check for Evolution message ids across deliveries and workers."""
+
+import logging
+from collections import OrderedDict
+
+import redis.asyncio as redis
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MessageDeduplicator:
+    """Drop messages already seen, using a local LRU in front of Redis SET NX."""
+
+    def __init__(self, max_entries: int, ttl: int) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis_client: redis.Redis | None = None
+        self._seen: OrderedDict[str, None] = OrderedDict()
+
+    async def initialize(self) -> None:
+        """Connect to Redis; without it deduplication is per process only."""
+        try:
+            self.redis_client = redis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+            await self.redis_client.ping()
+        except Exception as e:
+            logger.warning(f"Deduplication falling back to local memory: {e}")
+            self.redis_client = None
+
+    async def close(self) -> None:
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+            self.redis_client = None
+
+    async def is_duplicate(self, instance: str, message_id: str | None) -> bool:
+        """Return True if this message was already accepted, else record it."""
+        if not message_id:
+            return False
+
+        key = f"{instance}:{message_id}"
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return True
+
+        self._seen[key] = None
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+        if self.redis_client is None:
+            return False
+        try:
+            created = await self.redis_client.set(
+                f"{settings.CACHE_PREFIX}:dedup:{key}", 1, nx=True, ex=self.ttl
+            )
+            return not created
+        except Exception as e:
+            # Prefer a possible duplicate reply over dropping a real message
+            logger.error(f"Error checking message id in Redis: {e}")
+            return False
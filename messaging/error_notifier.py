@@ -0,0 +1,46 @@
+"""Throttled error reports to the support contact."""
+
+import logging
+import time
+
+from messaging.evolution_client import EvolutionClient
+from messaging.models import SendMessageRequest
+from shared.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorNotifier:
+    """Send at most one error message to ``contact`` per ``interval`` seconds.
+
+    An upstream outage fails every message at once; the errors dropped in
+    between are counted and reported with the next notification.
+    """
+
+    def __init__(
+        self, evolution_client: EvolutionClient, contact: str, interval: float
+    ) -> None:
+        self.evolution_client = evolution_client
+        self.contact = contact
+        self.interval = interval
+        self.suppressed = 0
+        self._last_sent: float | None = None
+
+    async def notify(self, error: Exception) -> None:
+        now = time.monotonic()
+        if self._last_sent is not None and now - self._last_sent < self.interval:
+            self.suppressed += 1
+            metrics.increment("error_notifications_suppressed")
+            return
+
+        text = f"erro ao acessar o  agente => {str(error)}"
+        if self.suppressed:
+            text += f" (+{self.suppressed} erros desde o último aviso)"
+        self._last_sent = now
+        self.suppressed = 0
+        try:
+            await self.evolution_client.send_message(
+                SendMessageRequest(number=self.contact, text=text)
+            )
+        except Exception as e:
+            logger.error(f"Error notifying {self.contact}: {str(e)}")
@@ -31,6 +31,25 @@ class EvolutionClient:
             response.raise_for_status()
             return response.json()
 
+    async def send_presence(
+        self, number: str, presence: str = "composing", delay: int | None = None
+    ) -> Any:
+        """Show a presence such as "composing" in the user's chat"""
+        async with httpx.AsyncClient() as client:
+            payload = {
+                "number": number,
+                "presence": presence,
+                "delay": delay or settings.EVOLUTION_PRESENCE_DELAY,
+            }
+
+            response = await client.post(
+                f"{self.base_url}/chat/sendPresence/mcp",
+                json=payload,
+                headers=self.headers,
+            )
+            response.raise_for_status()
+            return response.json()
+
     async def send_media(self, request: SendMediaRequest) -> Any:
         """Send media message via Evolution API"""
         async with httpx.AsyncClient() as client:
@@ -0,0 +1,89 @@
+"""Bounded asyncio ingestion queue drained by a pool of worker tasks."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the ingestion queue cannot accept more events."""
+
+
+class IngestionQueue:
+    """Accept webhook events without blocking and process them on the app loop."""
+
+    def __init__(self, maxsize: int, workers: int) -> None:
+        self.maxsize = maxsize
+        self.workers = workers
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=maxsize)
+        self._tasks: list[asyncio.Task] = []
+        self._handler: Callable[[Any], Awaitable[None]] | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self, handler: Callable[[Any], Awaitable[None]]) -> None:
+        """Spawn the worker pool on the running event loop."""
+        if self._tasks:
+            return
+        self._handler = handler
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(
+            f"Ingestion queue started with {self.workers} workers "
+            f"(maxsize={self.maxsize})"
+        )
+
+    def submit(self, event: Any) -> None:
+        """Enqueue an event or raise IngestionQueueFull immediately."""
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            raise IngestionQueueFull(
+                f"Ingestion queue is full ({self.maxsize} pending events)"
+            )
+
+    def submit_many(self, events: list[Any]) -> None:
+        """Enqueue all events, or none of them if they do not fit."""
+        free = self.maxsize - self._queue.qsize() if self.maxsize > 0 else len(events)
+        if len(events) > free:
+            raise IngestionQueueFull(
+                f"Ingestion queue cannot take {len(events)} events ({free} free)"
+            )
+        for event in events:
+            self._queue.put_nowait(event)
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Give pending events a chance to finish, then cancel the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except TimeoutError:
+            logger.warning(
+                f"Ingestion queue stopped with {self._queue.qsize()} pending events"
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            event = await self._queue.get()
+            try:
+                if self._handler is not None:
+                    await self._handler(event)
+            except Exception as e:
+                logger.error(f"Ingestion worker {index} failed to process event: {e}")
+            finally:
+                self._queue.task_done()
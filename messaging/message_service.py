@@ -18,11 +18,17 @@ class MessageService:
 
     @staticmethod
     def extract_message_data(webhook_data: dict[str, Any]) -> dict[str, Any]:
-        """Extract message data from Evolution API webhook payload"""
+        """Extract the first message from Evolution API webhook payload"""
+        messages = MessageService.extract_messages(webhook_data)
+        return messages[0] if messages else {}
+
+    @staticmethod
+    def extract_messages(webhook_data: dict[str, Any]) -> list[dict[str, Any]]:
+        """Extract every message from Evolution API webhook payload"""
         try:
             if not isinstance(webhook_data, dict):
                 logger.error("Webhook data is not a dictionary")
-                return {}
+                return []
 
             # First structure validation
             if "key" in webhook_data and "message" in webhook_data:
@@ -31,18 +37,20 @@ class MessageService:
 
                 if not isinstance(key_data, dict) or not isinstance(message_data, dict):
                     logger.error("Invalid key or message structure")
-                    return {}
+                    return []
 
                 if "remoteJid" not in key_data:
                     logger.error("Missing remoteJid in key data")
-                    return {}
+                    return []
 
-                return {
-                    "from": key_data["remoteJid"].replace("@s.whatsapp.net", ""),
-                    "text": message_data.get("conversation", ""),
-                    "timestamp": webhook_data.get("messageTimestamp"),
-                    "id": key_data.get("id"),
-                }
+                return [
+                    {
+                        "from": key_data["remoteJid"].replace("@s.whatsapp.net", ""),
+                        "text": message_data.get("conversation", ""),
+                        "timestamp": webhook_data.get("messageTimestamp"),
+                        "id": key_data.get("id"),
+                    }
+                ]
 
             # Second structure validation
             elif "messages" in webhook_data:
@@ -50,29 +58,35 @@ class MessageService:
 
                 if not isinstance(messages, list) or not messages:
                     logger.error("Messages field is not a list or is empty")
-                    return {}
-
-                message = messages[0]
-                if not isinstance(message, dict):
-                    logger.error("Message is not a dictionary")
-                    return {}
-
-                if "chatId" not in message:
-                    logger.error("Missing chatId in message")
-                    return {}
-
-                return {
-                    "from": message["chatId"].replace("@s.whatsapp.net", ""),
-                    "text": message.get("body", ""),
-                    "timestamp": message.get("timestamp"),
-                    "id": message.get("id"),
-                }
+                    return []
+
+                extracted = []
+                for message in messages:
+                    if not isinstance(message, dict):
+                        logger.error("Message is not a dictionary")
+                        continue
+
+                    if "chatId" not in message:
+                        logger.error("Missing chatId in message")
+                        continue
+
+                    extracted.append(
+                        {
+                            "from": message["chatId"].replace("@s.whatsapp.net", ""),
+                            "text": message.get("body", ""),
+                            "timestamp": message.get("timestamp"),
+                            "id": message.get("id"),
+                        }
+                    )
+                return extracted
             else:
-                logger.warning(f"Unknown webhook structure: {webhook_data}")
-                return {}
+                logger.warning(
+                    "Unknown webhook structure with keys: %s", list(webhook_data)
+                )
+                return []
         except Exception as e:
             logger.error(f"Error extracting message data: {str(e)}")
-            return {}
+            return []
 
 
 message_service = MessageService()
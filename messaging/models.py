@@ -1,7 +1,8 @@
+import time
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from ai.mcp_models import AgentMessage
 
@@ -51,3 +52,5 @@ class MCPResponse(BaseModel):
 class WebhookPayload(BaseModel):
     instance: str
     data: dict[str, Any]
+    # When we received the event; the reply deadline counts from here
+    received_at: float = Field(default_factory=time.time, exclude=True)
@@ -0,0 +1,123 @@
+"""Actor-style scheduler: ordered per session, parallel across sessions."""
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class _Mailbox:
+    __slots__ = ("items", "task", "wakeup")
+
+    def __init__(self) -> None:
+        self.items: deque[Any] = deque()
+        self.task: asyncio.Task | None = None
+        self.wakeup = asyncio.Event()
+
+
+class SessionScheduler:
+    """Run items one at a time per key while different keys run concurrently.
+
+    A mailbox only exists while its key has pending work; once drained the
+    actor task exits and the mailbox is dropped, so idle contacts cost nothing.
+
+    The handler receives a batch: up to ``coalesce_max`` items that were
+    already queued or arrived within ``coalesce_window`` seconds of quiet.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, list[Any]], Awaitable[None]],
+        max_concurrency: int,
+        max_pending: int,
+        coalesce_window: float = 0.0,
+        coalesce_max: int = 1,
+    ) -> None:
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+        self.coalesce_max = max(1, coalesce_max)
+        self._mailboxes: dict[str, _Mailbox] = {}
+        self._running = asyncio.Semaphore(max_concurrency)
+        self._capacity = asyncio.Semaphore(max_pending)
+        self._pending = 0
+
+    @property
+    def active_sessions(self) -> int:
+        return len(self._mailboxes)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def submit(self, key: str, item: Any) -> None:
+        """Queue an item for a key, waiting while the scheduler is saturated."""
+        await self._capacity.acquire()
+        self._pending += 1
+        mailbox = self._mailboxes.get(key)
+        if mailbox is None:
+            mailbox = _Mailbox()
+            self._mailboxes[key] = mailbox
+            mailbox.task = asyncio.create_task(
+                self._run(key, mailbox), name=f"session-{key}"
+            )
+        mailbox.items.append(item)
+        mailbox.wakeup.set()
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Wait for in-flight sessions to finish, then cancel what is left."""
+        tasks = [m.task for m in self._mailboxes.values() if m.task is not None]
+        if not tasks:
+            return
+        _, still_running = await asyncio.wait(tasks, timeout=drain_timeout)
+        for task in still_running:
+            task.cancel()
+        await asyncio.gather(*still_running, return_exceptions=True)
+        if still_running:
+            logger.warning(
+                f"Session scheduler stopped with {len(still_running)} busy sessions"
+            )
+
+    async def _run(self, key: str, mailbox: _Mailbox) -> None:
+        try:
+            while mailbox.items:
+                batch = await self._next_batch(mailbox)
+                try:
+                    async with self._running:
+                        await self.handler(key, batch)
+                except Exception as e:
+                    logger.error(f"Session {key} failed to process batch: {e}")
+                finally:
+                    self._pending -= len(batch)
+                    for _ in batch:
+                        self._capacity.release()
+        finally:
+            # Nothing can be appended between the empty check and this point
+            # because there is no await in between, so the mailbox is safe to drop.
+            if self._mailboxes.get(key) is mailbox:
+                del self._mailboxes[key]
+            for _ in mailbox.items:
+                self._pending -= 1
+                self._capacity.release()
+
+    async def _next_batch(self, mailbox: _Mailbox) -> list[Any]:
+        batch = [mailbox.items.popleft()]
+        while len(batch) < self.coalesce_max:
+            if mailbox.items:
+                batch.append(mailbox.items.popleft())
+                continue
+            if self.coalesce_window <= 0:
+                break
+            # Debounce: every new item restarts the quiet window
+            mailbox.wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    mailbox.wakeup.wait(), timeout=self.coalesce_window
+                )
+            except TimeoutError:
+                break
+        return batch
@@ -0,0 +1,61 @@
+"""Validation-free parsing of raw webhook request bodies."""
+
+import json
+import logging
+import random
+from typing import Any
+
+from config import settings
+from messaging.models import WebhookPayload
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional
+    _loads = json.loads
+
+
+class WebhookParseError(ValueError):
+    """Raised when a webhook body is not a usable Evolution event."""
+
+
+def _to_payload(event: Any) -> WebhookPayload:
+    if not isinstance(event, dict):
+        raise WebhookParseError("Webhook event must be a JSON object")
+    instance = event.get("instance")
+    data = event.get("data")
+    if not isinstance(instance, str) or not isinstance(data, dict):
+        raise WebhookParseError("Webhook event needs a string instance and object data")
+    # Fields were checked above; skip pydantic validation of the arbitrary data
+    return WebhookPayload.model_construct(instance=instance, data=data)
+
+
+def _decode(raw: bytes) -> Any:
+    try:
+        return _loads(raw)
+    except ValueError as e:
+        raise WebhookParseError(f"Invalid JSON body: {e}")
+
+
+def parse_webhook_body(raw: bytes) -> WebhookPayload:
+    """Decode a single webhook event from the raw request body."""
+    return _to_payload(_decode(raw))
+
+
+def parse_webhook_batch_body(raw: bytes) -> list[WebhookPayload]:
+    """Decode an array of webhook events from the raw request body."""
+    events = _decode(raw)
+    if not isinstance(events, list):
+        raise WebhookParseError("Webhook batch must be a JSON array")
+    return [_to_payload(event) for event in events]
+
+
+def log_payload_sample(logger: logging.Logger, raw: bytes) -> None:
+    """Log a truncated raw body for a sampled fraction of requests at DEBUG."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= settings.WEBHOOK_LOG_SAMPLE_RATE:
+        return
+    limit = settings.WEBHOOK_LOG_MAX_BYTES
+    logger.debug("Webhook payload sample (%d bytes): %r", len(raw), raw[:limit])
@@ -0,0 +1,237 @@
+"""Local vector index for near-duplicate lookups in the response cache."""
+
+import math
+import time
+import zlib
+
+import numpy as np
+
+# Function words that may differ between two phrasings of one question
+STOPWORDS = frozenset(
+    """
+    a an the is are was were be been am do does did i you we they it my your
+    our their me us to of in on at for from with about by and or can could
+    would will should may please what which who how when where there this
+    that these those any some hi hello
+    o os as um uma uns umas de do da dos das na nos nas em por para com e
+    ou que qual quais quem como quando onde eu voce você vocês meu minha seu
+    sua é esta está tem há pode poderia favor oi ola olá
+    el la los las un una unos unas del al en con y es son hay puedo puede
+    usted mi su hola
+    """.split()
+)
+
+# Words that change the answer when added, dropped or swapped
+QUALIFIERS = frozenset(
+    """
+    not no never none nothing today tonight tomorrow yesterday now
+    monday tuesday wednesday thursday friday saturday sunday weekend
+    não nao nunca nada hoje amanhã amanha ontem agora
+    segunda terça terca quarta quinta sexta sábado sabado domingo
+    hoy mañana manana ayer ahora nadie
+    lunes martes miércoles miercoles jueves viernes
+    """.split()
+)
+
+_SUFFIXES = ("ing", "es", "ed", "s")
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    cleaned = "".join(c if c.isalnum() else " " for c in message.lower())
+    return " ".join(cleaned.split())
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def content_words(message: str) -> list[str]:
+    """Stemmed words that carry the meaning of a message, in order."""
+    return [
+        _stem(word)
+        for word in normalize_message(message).split()
+        if word not in STOPWORDS
+    ]
+
+
+class MessageTerms:
+    """What two messages must share to be treated as the same question.
+
+    ``anchors`` are numbers and QUALIFIERS, which must be identical.
+    ``names`` are capitalized words after the first one; each must appear in
+    the other message, in any case. Of the remaining content words, one
+    message's must all appear in the other's, so a rephrasing may add or
+    drop detail but never swap a word (paris for rome, available for
+    unavailable), and the two sets must overlap by at least ``min_overlap``.
+    """
+
+    __slots__ = ("words", "anchors", "names")
+
+    def __init__(self, message: str) -> None:
+        self.words = frozenset(content_words(message))
+        self.anchors = frozenset(
+            word
+            for word in normalize_message(message).split()
+            if word in QUALIFIERS or any(c.isdigit() for c in word)
+        )
+        tokens = "".join(c if c.isalnum() else " " for c in message).split()
+        self.names = frozenset(
+            _stem(token.lower())
+            for token in tokens[1:]
+            if token[0].isupper() and token.lower() not in STOPWORDS
+        )
+
+    def matches(self, other: "MessageTerms", min_overlap: float) -> bool:
+        if self.anchors != other.anchors:
+            return False
+        if not (self.names <= other.words and other.names <= self.words):
+            return False
+        shared = len(self.words & other.words)
+        if shared < min(len(self.words), len(other.words)):
+            return False
+        union = len(self.words | other.words)
+        return union == 0 or shared / union >= min_overlap
+
+
+class SemanticIndex:
+    """Hashed character n-gram TF-IDF vectors in a NumPy matrix.
+
+    Entry vectors are L2-normalized columns of a feature-major matrix, so a
+    lookup only touches the rows of the query's few non-zero features before
+    a top-k selection. Columns are allocated as entries arrive, doubling up
+    to ``capacity``. Each entry carries the cache key it points to and an
+    expiry matching the Redis TTL; full indexes evict the entry closest to
+    expiring.
+
+    Vectors are built from the content words only, so function words do
+    not dilute the score. N-gram overlap still measures spelling, not
+    meaning: "a flight to paris" and "a flight to rome" score high. A
+    candidate is only returned when its MessageTerms also match the
+    query's.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        capacity: int,
+        threshold: float,
+        ttl: int,
+        ngram_range: tuple[int, int] = (3, 5),
+        min_overlap: float = 0.5,
+    ) -> None:
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.ngram_range = ngram_range
+        self.min_overlap = min_overlap
+        self._matrix = np.zeros((dim, 0), dtype=np.float32)
+        self._expires = np.zeros(0, dtype=np.float64)
+        self._keys: list[str] = []
+        self._rows: dict[str, int] = {}
+        # Non-zero feature ids per entry, for df bookkeeping on removal
+        self._features: list[np.ndarray] = []
+        self._terms: list[MessageTerms] = []
+        self._df = np.zeros(dim, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _reserve(self, count: int) -> None:
+        """Make room for ``count`` entries."""
+        allocated = self._matrix.shape[1]
+        if count <= allocated:
+            return
+        size = min(self.capacity, max(count, 2 * allocated, 64))
+        matrix = np.zeros((self.dim, size), dtype=np.float32)
+        matrix[:, :allocated] = self._matrix
+        expires = np.zeros(size, dtype=np.float64)
+        expires[:allocated] = self._expires
+        self._matrix, self._expires = matrix, expires
+
+    def _hashed_ngrams(self, message: str) -> np.ndarray:
+        text = f" {' '.join(content_words(message))} "
+        low, high = self.ngram_range
+        grams = [
+            text[i : i + n]
+            for n in range(low, high + 1)
+            for i in range(len(text) - n + 1)
+        ]
+        return np.fromiter(
+            (zlib.crc32(g.encode()) % self.dim for g in grams),
+            dtype=np.int64,
+            count=len(grams),
+        )
+
+    def _vector(self, features: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return the non-zero feature ids and their normalized weights."""
+        ids, counts = np.unique(features, return_counts=True)
+        tf = 1.0 + np.log(counts.astype(np.float32))
+        idf = np.log((1.0 + len(self._keys)) / (1.0 + self._df[ids])) + 1.0
+        weights = tf * idf
+        norm = float(np.linalg.norm(weights))
+        return ids, weights / norm if norm > 0 else weights
+
+    def add(self, key: str, message: str) -> None:
+        """Index a cached message under its cache key."""
+        if key in self._rows:
+            self.remove(key)
+        if len(self._keys) >= self.capacity:
+            soonest = int(np.argmin(self._expires[: len(self._keys)]))
+            self.remove(self._keys[soonest])
+
+        features = self._hashed_ngrams(message)
+        ids, weights = self._vector(features)
+        self._df[ids] += 1
+        col = len(self._keys)
+        self._reserve(col + 1)
+        self._matrix[ids, col] = weights
+        self._expires[col] = time.time() + self.ttl
+        self._keys.append(key)
+        self._features.append(ids)
+        self._terms.append(MessageTerms(message))
+        self._rows[key] = col
+
+    def remove(self, key: str) -> None:
+        """Drop a key, moving the last entry into its slot."""
+        col = self._rows.pop(key, None)
+        if col is None:
+            return
+        self._df[self._features[col]] -= 1
+        last = len(self._keys) - 1
+        if col != last:
+            last_key = self._keys[last]
+            self._matrix[:, col] = self._matrix[:, last]
+            self._expires[col] = self._expires[last]
+            self._keys[col] = last_key
+            self._features[col] = self._features[last]
+            self._terms[col] = self._terms[last]
+            self._rows[last_key] = col
+        self._matrix[self._features[last], last] = 0.0
+        self._expires[last] = 0.0
+        self._keys.pop()
+        self._features.pop()
+        self._terms.pop()
+
+    def lookup(self, message: str, k: int = 1) -> list[tuple[str, float]]:
+        """Return up to k live keys that pass the threshold and term check."""
+        count = len(self._keys)
+        if count == 0:
+            return []
+        ids, weights = self._vector(self._hashed_ngrams(message))
+        scores = weights @ self._matrix[ids, :count]
+        scores[self._expires[:count] < time.time()] = -math.inf
+        terms = MessageTerms(message)
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (self._keys[i], float(scores[i]))
+            for i in top
+            if scores[i] >= self.threshold
+            and self._terms[i].matches(terms, self.min_overlap)
+        ]
@@ -0,0 +1,27 @@
+"""In-process counters and gauges exposed by the /metrics endpoint."""
+
+from collections import defaultdict
+
+
+class Metrics:
+    """Collect simple named counters and gauges."""
+
+    def __init__(self) -> None:
+        self.counters: dict[str, int] = defaultdict(int)
+        self.gauges: dict[str, float] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {"counters": dict(self.counters), "gauges": dict(self.gauges)}
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.gauges.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class SessionSummary(BaseModel):
+    session_id: str
+    message_count: int
+    last_activity: float
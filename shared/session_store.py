@@ -0,0 +1,537 @@
+"""Bounded conversation memory for WhatsApp sessions."""
+
+import heapq
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from collections.abc import Callable, Sequence
+from typing import TypeVar
+
+import redis.asyncio as redis
+from redis.exceptions import WatchError
+
+from ai.mcp_models import AgentMessage
+from config import settings
+from shared.models import SessionSummary
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(message: AgentMessage) -> int:
+    """Cheap token estimate (~4 characters per token plus role overhead)."""
+    return len(message.content) // 4 + 4
+
+
+class _Session:
+    __slots__ = ("pinned", "summary", "turns", "tokens", "last_activity")
+
+    def __init__(self) -> None:
+        self.pinned: list[AgentMessage] = []
+        self.summary: AgentMessage | None = None
+        self.turns: deque[AgentMessage] = deque()
+        self.tokens = 0
+        self.last_activity = time.time()
+
+    def messages(self) -> list[AgentMessage]:
+        summary = [self.summary] if self.summary else []
+        return self.pinned + summary + list(self.turns)
+
+
+def _trim_window(
+    turns: list[AgentMessage], max_turns: int, max_tokens: int
+) -> list[AgentMessage]:
+    """Return the newest turns that fit the turn and token limits."""
+    turns = turns[-max_turns:] if max_turns > 0 else []
+    tokens = sum(estimate_tokens(m) for m in turns)
+    start = 0
+    while len(turns) - start > 1 and tokens > max_tokens:
+        tokens -= estimate_tokens(turns[start])
+        start += 1
+    # Never start the window with a dangling assistant reply
+    while len(turns) - start > 1 and turns[start].role != "user":
+        start += 1
+    return turns[start:]
+
+
+T = TypeVar("T")
+
+
+def _summarized_prefix(
+    turns: Sequence[T], summarized: Sequence[T], same: Callable[[T, T], bool]
+) -> int | None:
+    """Return how many leading turns to drop to remove ``summarized``.
+
+    ``summarized`` was a run of the oldest turns when the summary started.
+    Since then older turns may have been trimmed and newer ones appended,
+    so the run is found by its last message rather than counted. Returns
+    None when that message is gone or the run is not at the head.
+    """
+    if not summarized:
+        return None
+    last = len(summarized) - 1
+    for position, turn in enumerate(turns):
+        if not same(turn, summarized[last]):
+            continue
+        run = min(position, last)
+        if all(
+            same(turns[position - i], summarized[last - i]) for i in range(1, run + 1)
+        ):
+            return position + 1
+    return None
+
+
+class SessionStore(ABC):
+    """Interface shared by the conversation memory backends."""
+
+    async def initialize(self) -> None:
+        """Open backend connections."""
+        return None
+
+    async def close(self) -> None:
+        """Release backend connections."""
+        return None
+
+    @abstractmethod
+    async def get(self, session_id: str) -> list[AgentMessage]:
+        """Return pinned messages followed by the retained turns."""
+
+    async def peek(self, session_id: str) -> list[AgentMessage]:
+        """Like ``get`` but without counting as session activity."""
+        return await self.get(session_id)
+
+    @abstractmethod
+    async def append(
+        self, session_id: str, *messages: AgentMessage
+    ) -> list[AgentMessage]:
+        """Add messages to a session and return its trimmed history."""
+
+    @abstractmethod
+    async def compact(
+        self, session_id: str, summary: AgentMessage, summarized: list[AgentMessage]
+    ) -> bool:
+        """Replace the ``summarized`` turns with a rolling summary.
+
+        Returns False, changing nothing, when those turns are no longer the
+        oldest ones stored.
+        """
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> bool:
+        """Remove a session, returning False if it did not exist."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Remove every session."""
+
+    @abstractmethod
+    async def summary(self, session_id: str) -> SessionSummary | None:
+        """Return message count and last activity for one session."""
+
+    @abstractmethod
+    async def list_sessions(
+        self, cursor: str | None, limit: int
+    ) -> tuple[list[SessionSummary], str | None]:
+        """Return one page of session summaries and the cursor for the next."""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Return the number of live sessions."""
+
+
+class InMemorySessionStore(SessionStore):
+    """Keep recent turns per session within turn, token and idle limits.
+
+    System messages are pinned and never trimmed; the oldest turns go first.
+    Sessions are kept in LRU order so the coldest ones are evicted when the
+    global token budget is exceeded.
+    """
+
+    def __init__(
+        self,
+        max_turns: int,
+        max_tokens: int,
+        max_total_tokens: int,
+        idle_ttl: int,
+    ) -> None:
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.max_total_tokens = max_total_tokens
+        self.idle_ttl = idle_ttl
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._total_tokens = 0
+
+    async def get(self, session_id: str) -> list[AgentMessage]:
+        session = self._touch(session_id)
+        return session.messages() if session else []
+
+    async def peek(self, session_id: str) -> list[AgentMessage]:
+        # Admin reads must not keep idle sessions alive or reorder the LRU
+        session = self._sessions.get(session_id)
+        if session is None or time.time() - session.last_activity > self.idle_ttl:
+            return []
+        return session.messages()
+
+    async def append(
+        self, session_id: str, *messages: AgentMessage
+    ) -> list[AgentMessage]:
+        self._expire_idle()
+        session = self._touch(session_id)
+        if session is None:
+            session = _Session()
+            self._sessions[session_id] = session
+
+        for message in messages:
+            tokens = estimate_tokens(message)
+            if message.role == "system":
+                session.pinned.append(message)
+            else:
+                session.turns.append(message)
+            session.tokens += tokens
+            self._total_tokens += tokens
+
+        self._trim(session)
+        self._evict_cold(keep=session_id)
+        return session.messages()
+
+    async def compact(
+        self, session_id: str, summary: AgentMessage, summarized: list[AgentMessage]
+    ) -> bool:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        # History snapshots share the stored message objects
+        count = _summarized_prefix(session.turns, summarized, lambda a, b: a is b)
+        if count is None:
+            return False
+        if session.summary is not None:
+            session.tokens -= estimate_tokens(session.summary)
+            self._total_tokens -= estimate_tokens(session.summary)
+        session.summary = summary
+        session.tokens += estimate_tokens(summary)
+        self._total_tokens += estimate_tokens(summary)
+        for _ in range(count):
+            self._drop_oldest(session)
+        return True
+
+    async def delete(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._total_tokens -= session.tokens
+        return True
+
+    async def clear(self) -> None:
+        self._sessions.clear()
+        self._total_tokens = 0
+
+    async def summary(self, session_id: str) -> SessionSummary | None:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        return self._summarize(session_id, session)
+
+    async def list_sessions(
+        self, cursor: str | None, limit: int
+    ) -> tuple[list[SessionSummary], str | None]:
+        # Keyset pagination on the id: stable while sessions move in LRU order
+        self._expire_idle()
+        ids = heapq.nsmallest(
+            limit + 1,
+            (sid for sid in self._sessions if cursor is None or sid > cursor),
+        )
+        page = ids[:limit]
+        next_cursor = page[-1] if len(ids) > limit else None
+        return [self._summarize(sid, self._sessions[sid]) for sid in page], next_cursor
+
+    @staticmethod
+    def _summarize(session_id: str, session: _Session) -> SessionSummary:
+        return SessionSummary(
+            session_id=session_id,
+            message_count=len(session.messages()),
+            last_activity=session.last_activity,
+        )
+
+    async def count(self) -> int:
+        return len(self._sessions)
+
+    def _touch(self, session_id: str) -> _Session | None:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        now = time.time()
+        if now - session.last_activity > self.idle_ttl:
+            self._sessions.pop(session_id)
+            self._total_tokens -= session.tokens
+            return None
+        session.last_activity = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _trim(self, session: _Session) -> None:
+        turns = session.turns
+        while len(turns) > 1 and (
+            len(turns) > self.max_turns or session.tokens > self.max_tokens
+        ):
+            self._drop_oldest(session)
+        # Never start the window with a dangling assistant reply
+        while len(turns) > 1 and turns[0].role != "user":
+            self._drop_oldest(session)
+
+    def _drop_oldest(self, session: _Session) -> None:
+        tokens = estimate_tokens(session.turns.popleft())
+        session.tokens -= tokens
+        self._total_tokens -= tokens
+
+    def _evict_cold(self, keep: str) -> None:
+        while self._total_tokens > self.max_total_tokens and len(self._sessions) > 1:
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep:
+                break
+            self._sessions.popitem(last=False)
+            self._total_tokens -= session.tokens
+
+    def _expire_idle(self) -> None:
+        # LRU order is also last-activity order, so stop at the first live one
+        cutoff = time.time() - self.idle_ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_activity > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self._total_tokens -= session.tokens
+
+
+class RedisSessionStore(SessionStore):
+    """Share sessions across workers and nodes through Redis lists.
+
+    Turns live in a capped list per session and pinned system messages in a
+    second list; both expire after ``idle_ttl``. A sorted set indexes session
+    ids by last activity, and a second one with equal scores orders them by
+    id for paging. Every append is a single pipelined round trip.
+    The global memory cap is left to Redis' own ``maxmemory`` policy.
+    """
+
+    def __init__(self, url: str, max_turns: int, max_tokens: int, idle_ttl: int):
+        self.url = url
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.idle_ttl = idle_ttl
+        self.redis_client: redis.Redis | None = None
+        self.index_key = f"{settings.CACHE_PREFIX}:sessions"
+        self.ids_key = f"{settings.CACHE_PREFIX}:session-ids"
+
+    async def initialize(self) -> None:
+        self.redis_client = redis.from_url(
+            self.url, encoding="utf-8", decode_responses=True
+        )
+        await self.redis_client.ping()
+        # Sessions indexed before the id set existed; weight 0 keeps scores equal
+        await self.redis_client.zunionstore(
+            self.ids_key, {self.ids_key: 0, self.index_key: 0}
+        )
+        logger.info("Redis session store connected")
+
+    async def close(self) -> None:
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+            self.redis_client = None
+
+    def _turns_key(self, session_id: str) -> str:
+        return f"{settings.CACHE_PREFIX}:session:{session_id}:turns"
+
+    def _pinned_key(self, session_id: str) -> str:
+        return f"{settings.CACHE_PREFIX}:session:{session_id}:pinned"
+
+    def _summary_key(self, session_id: str) -> str:
+        return f"{settings.CACHE_PREFIX}:session:{session_id}:summary"
+
+    @property
+    def _client(self) -> redis.Redis:
+        if self.redis_client is None:
+            raise RuntimeError("Redis session store is not initialized")
+        return self.redis_client
+
+    def _history(
+        self, pinned: list[str], summary: str | None, turns: list[str]
+    ) -> list[AgentMessage]:
+        window = _trim_window(
+            [AgentMessage.model_validate_json(m) for m in turns],
+            self.max_turns,
+            self.max_tokens,
+        )
+        if summary:
+            pinned = pinned + [summary]
+        return [AgentMessage.model_validate_json(m) for m in pinned] + window
+
+    async def get(self, session_id: str) -> list[AgentMessage]:
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.lrange(self._pinned_key(session_id), 0, -1)
+            pipe.get(self._summary_key(session_id))
+            pipe.lrange(self._turns_key(session_id), 0, -1)
+            pinned, summary, turns = await pipe.execute()
+        return self._history(pinned, summary, turns)
+
+    async def append(
+        self, session_id: str, *messages: AgentMessage
+    ) -> list[AgentMessage]:
+        turns_key = self._turns_key(session_id)
+        pinned_key = self._pinned_key(session_id)
+        summary_key = self._summary_key(session_id)
+        pinned = [m.model_dump_json() for m in messages if m.role == "system"]
+        turns = [m.model_dump_json() for m in messages if m.role != "system"]
+        now = time.time()
+
+        async with self._client.pipeline(transaction=True) as pipe:
+            if pinned:
+                pipe.rpush(pinned_key, *pinned)
+            if turns:
+                pipe.rpush(turns_key, *turns)
+                pipe.ltrim(turns_key, -self.max_turns, -1)
+            pipe.expire(pinned_key, self.idle_ttl)
+            pipe.expire(turns_key, self.idle_ttl)
+            pipe.expire(summary_key, self.idle_ttl)
+            pipe.zadd(self.index_key, {session_id: now})
+            pipe.zadd(self.ids_key, {session_id: 0})
+            pipe.zremrangebyscore(self.index_key, "-inf", now - self.idle_ttl)
+            pipe.lrange(pinned_key, 0, -1)
+            pipe.get(summary_key)
+            pipe.lrange(turns_key, 0, -1)
+            results = await pipe.execute()
+        return self._history(results[-3], results[-2], results[-1])
+
+    async def compact(
+        self, session_id: str, summary: AgentMessage, summarized: list[AgentMessage]
+    ) -> bool:
+        # The list can hold older turns outside the history window, so match
+        # the summarized run by value instead of counting from the head
+        turns_key = self._turns_key(session_id)
+        expected = [m.model_dump_json() for m in summarized]
+        async with self._client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(turns_key)
+                    turns = await pipe.lrange(turns_key, 0, -1)
+                    count = _summarized_prefix(turns, expected, str.__eq__)
+                    if count is None:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.set(
+                        self._summary_key(session_id),
+                        summary.model_dump_json(),
+                        ex=self.idle_ttl,
+                    )
+                    pipe.ltrim(turns_key, count, -1)
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    # A turn was appended meanwhile; look again
+                    continue
+
+    async def delete(self, session_id: str) -> bool:
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.delete(
+                self._turns_key(session_id),
+                self._pinned_key(session_id),
+                self._summary_key(session_id),
+            )
+            pipe.zrem(self.index_key, session_id)
+            pipe.zrem(self.ids_key, session_id)
+            deleted, _, _ = await pipe.execute()
+        return bool(deleted)
+
+    async def clear(self) -> None:
+        pattern = f"{settings.CACHE_PREFIX}:session:*"
+        batch = []
+        async for key in self._client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await self._client.delete(*batch)
+                batch = []
+        if batch:
+            await self._client.delete(*batch)
+        await self._client.delete(self.index_key, self.ids_key)
+
+    async def summary(self, session_id: str) -> SessionSummary | None:
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.zscore(self.index_key, session_id)
+            pipe.llen(self._pinned_key(session_id))
+            pipe.exists(self._summary_key(session_id))
+            pipe.llen(self._turns_key(session_id))
+            last_activity, pinned, summary, turns = await pipe.execute()
+        if last_activity is None or time.time() - last_activity > self.idle_ttl:
+            return None
+        return SessionSummary(
+            session_id=session_id,
+            message_count=pinned + summary + turns,
+            last_activity=last_activity,
+        )
+
+    async def list_sessions(
+        self, cursor: str | None, limit: int
+    ) -> tuple[list[SessionSummary], str | None]:
+        # Keyset pagination on the id, like the in-memory store: activity
+        # scores change on every append, and ZSCAN COUNT is only a hint
+        await self._expire_index()
+        entries: list[tuple[str, float]] = []
+        start = f"({cursor}" if cursor else "-"
+        while len(entries) <= limit:
+            ids = await self._client.zrangebylex(
+                self.ids_key, start, "+", start=0, num=limit + 1
+            )
+            if not ids:
+                break
+            start = f"({ids[-1]}"
+            scores = await self._client.zmscore(self.index_key, ids)
+            found = list(zip(ids, scores, strict=True))
+            # Ids whose sessions went idle; the activity index already dropped them
+            stale = [sid for sid, score in found if score is None]
+            if stale:
+                await self._client.zrem(self.ids_key, *stale)
+            entries += [(sid, score) for sid, score in found if score is not None]
+            if len(ids) <= limit:
+                break
+        next_cursor = entries[limit - 1][0] if len(entries) > limit else None
+        entries = entries[:limit]
+        async with self._client.pipeline(transaction=False) as pipe:
+            for session_id, _ in entries:
+                pipe.llen(self._pinned_key(session_id))
+                pipe.exists(self._summary_key(session_id))
+                pipe.llen(self._turns_key(session_id))
+            lengths = await pipe.execute()
+        summaries = [
+            SessionSummary(
+                session_id=session_id,
+                message_count=sum(lengths[3 * i : 3 * i + 3]),
+                last_activity=last_activity,
+            )
+            for i, (session_id, last_activity) in enumerate(entries)
+        ]
+        return summaries, next_cursor
+
+    async def count(self) -> int:
+        await self._expire_index()
+        return await self._client.zcard(self.index_key)
+
+    async def _expire_index(self) -> None:
+        await self._client.zremrangebyscore(
+            self.index_key, "-inf", time.time() - self.idle_ttl
+        )
+
+
+def create_session_store() -> SessionStore:
+    """Build the session backend selected by SESSION_BACKEND."""
+    if settings.SESSION_BACKEND == "redis":
+        return RedisSessionStore(
+            url=settings.SESSION_REDIS_URL,
+            max_turns=settings.SESSION_MAX_TURNS,
+            max_tokens=settings.SESSION_MAX_TOKENS,
+            idle_ttl=settings.SESSION_IDLE_TTL,
+        )
+    return InMemorySessionStore(
+        max_turns=settings.SESSION_MAX_TURNS,
+        max_tokens=settings.SESSION_MAX_TOKENS,
+        max_total_tokens=settings.SESSION_MAX_TOTAL_TOKENS,
+        idle_ttl=settings.SESSION_IDLE_TTL,
+    )
@@ -5,13 +5,14 @@ from unittest.mock import AsyncMock, Mock
 
 import pytest
 import pytest_asyncio
-from fakeredis import aioredis
+from fakeredis import FakeServer, aioredis
 from fastapi.testclient import TestClient
 
+from ai.mcp_client import MCPClient
 from cache import CacheManager
-from messaging.evolution_client import EvolutionClient
+from cache_shards import ShardedRedis
 from main import app
-from mcp_client import MCPClient
+from messaging.evolution_client import EvolutionClient
 
 
 @pytest.fixture
@@ -94,6 +95,33 @@ async def cache_manager():
     return manager
 
 
+@pytest.fixture
+def redis_server():
+    """Fake Redis server; clients created on it share one dataset."""
+    return FakeServer()
+
+
+@pytest.fixture
+def make_cache_manager(redis_server):
+    """Factory for cache managers on fake Redis.
+
+    Managers share ``redis_server`` unless given their own shards, so two
+    of them behave like two workers on one Redis.
+    """
+
+    def make(shards=None, local_cache=None, semantic_index=None):
+        manager = CacheManager()
+        manager.cache_enabled = True
+        manager.shards = shards or ShardedRedis(
+            {"fake": aioredis.FakeRedis(server=redis_server, decode_responses=False)}
+        )
+        manager.local_cache = local_cache
+        manager.semantic_index = semantic_index
+        return manager
+
+    return make
+
+
 @pytest.fixture
 def mock_redis_client():
     """Mock Redis client."""
@@ -0,0 +1,94 @@
+"""Tests for the adaptive LLM concurrency limiter."""
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+
+import pytest
+
+from ai.adaptive_limiter import AdaptiveLimiter, RateLimitError, parse_retry_after
+
+
+def make_limiter(initial_limit=2, default_retry_after=0.05):
+    return AdaptiveLimiter(
+        initial_limit=initial_limit,
+        min_limit=1,
+        max_limit=4,
+        backoff=0.5,
+        default_retry_after=default_retry_after,
+    )
+
+
+class TestAdaptiveLimiter:
+    """Test AIMD limits, Retry-After pauses and priority admission."""
+
+    @pytest.mark.asyncio
+    async def test_successes_grow_the_limit_up_to_max(self):
+        """Test additive increase of about one slot per round of calls."""
+        limiter = make_limiter()
+
+        for _ in range(50):
+            async with limiter.slot():
+                pass
+
+        assert limiter.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_halves_limit_and_pauses(self):
+        """Test multiplicative decrease and the Retry-After hold."""
+        limiter = make_limiter(initial_limit=4)
+
+        with pytest.raises(RateLimitError):
+            async with limiter.slot():
+                raise RateLimitError("429", retry_after=0.05)
+
+        assert limiter.limit == 2
+        started = asyncio.get_running_loop().time()
+        async with limiter.slot():
+            waited = asyncio.get_running_loop().time() - started
+        assert waited >= 0.04
+
+    @pytest.mark.asyncio
+    async def test_lower_priority_value_is_admitted_first(self):
+        """Test that queued interactive turns overtake background work."""
+        limiter = make_limiter(initial_limit=1)
+        order = []
+
+        async def call(name, priority):
+            async with limiter.slot(priority):
+                order.append(name)
+
+        async with limiter.slot():
+            tasks = [
+                asyncio.create_task(call("summary", (1, 10))),
+                asyncio.create_task(call("long turn", (0, 900))),
+                asyncio.create_task(call("short turn", (0, 20))),
+            ]
+            await asyncio.sleep(0)
+            assert limiter.queued == 3
+        await asyncio.gather(*tasks)
+
+        assert order == ["short turn", "long turn", "summary"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_a_slot(self):
+        """Test that giving up while queued leaves the count intact."""
+        limiter = make_limiter(initial_limit=1)
+
+        async with limiter.slot():
+            waiter = asyncio.create_task(limiter.slot().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+
+        assert limiter.in_flight == 0
+        assert limiter.queued == 0
+
+    def test_parse_retry_after(self):
+        """Test both the delta-seconds and HTTP-date forms."""
+        later = datetime.now(UTC) + timedelta(seconds=30)
+
+        assert parse_retry_after("2") == 2.0
+        assert 25 < parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
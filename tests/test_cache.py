@@ -1,11 +1,27 @@
 """Tests for Redis cache manager."""
 
-from unittest.mock import AsyncMock, patch
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+from redis.asyncio.client import Pipeline
 
+from ai.ai_service import AgentService
+from ai.deepseek_models import ChatCompletion
+from ai.mcp_models import AgentMessage
 from cache import CacheManager
+from cache_codec import decode_entry
+from cache_shards import ShardedRedis
 from config import settings
+from local_cache import LocalCache
+from shared.metrics import metrics
+
+
+def popularity_key(cache_manager, message):
+    member = cache_manager._popularity_member(
+        cache_manager._generate_cache_key(message)
+    )
+    return cache_manager._popularity_key(cache_manager._bucket(member))
 
 
 class TestCacheManager:
@@ -14,7 +30,10 @@ class TestCacheManager:
     @pytest.mark.asyncio
     async def test_initialize_success(self):
         """Test successful cache initialization."""
-        with patch("redis.asyncio.from_url") as mock_redis:
+        with (
+            patch("redis.asyncio.from_url") as mock_redis,
+            patch.object(CacheManager, "_start_background_tasks") as mock_start,
+        ):
             mock_client = AsyncMock()
             mock_client.ping = AsyncMock()
             mock_redis.return_value = mock_client
@@ -23,6 +42,290 @@ class TestCacheManager:
             await cache_manager.initialize()
 
             assert cache_manager.cache_enabled is True
+            mock_start.assert_called_once()
             mock_redis.assert_called_once_with(
-                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+                settings.REDIS_URL,
+                decode_responses=False,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            )
+
+    def test_cacheable_message_policy(self):
+        """Test that only context-free, short user turns are cacheable."""
+        cache_manager = CacheManager()
+        cache_manager.cache_enabled = True
+        question = AgentMessage(role="user", content="What time do you open?")
+
+        assert cache_manager.cacheable_message([question]) == question.content
+        assert (
+            cache_manager.cacheable_message(
+                [AgentMessage(role="assistant", content="Hi!"), question]
+            )
+            is None
+        )
+        assert (
+            cache_manager.cacheable_message(
+                [AgentMessage(role="system", content="summary"), question]
             )
+            is None
+        )
+        long_question = AgentMessage(role="user", content="x" * 1000)
+        assert cache_manager.cacheable_message([long_question]) is None
+
+
+class TestCachePopularity:
+    """Test popularity tracking and bounded eviction."""
+
+    @pytest.fixture
+    def cache_manager(self, make_cache_manager):
+        return make_cache_manager()
+
+    @pytest.mark.asyncio
+    async def test_hits_bump_popularity_and_misses_do_not(self, cache_manager):
+        """Test that only reads of stored entries are counted."""
+        await cache_manager.set_cached_response("opening hours?", "9am")
+        await cache_manager.get_cached_response("opening hours?")
+        await cache_manager.get_cached_response("Opening  hours?")
+        await cache_manager.get_cached_response("never cached")
+
+        scores = await cache_manager.shards.clients["fake"].zrange(
+            popularity_key(cache_manager, "opening hours?"), 0, -1, withscores=True
+        )
+        assert [score for _, score in scores] == [2.0]
+
+    @pytest.mark.asyncio
+    async def test_eviction_keeps_popular_entries(self, cache_manager):
+        """Test that the cap evicts cold entries before popular ones."""
+        with (
+            patch.object(settings, "CACHE_MAX_ENTRIES", 2),
+            patch.object(settings, "CACHE_POPULAR_THRESHOLD", 2),
+            patch.object(settings, "CACHE_HASH_BUCKETS", 1),
+        ):
+            await cache_manager.set_cached_response("popular", "a")
+            for _ in range(2):
+                await cache_manager.get_cached_response("popular")
+            await cache_manager.set_cached_response("cold", "b")
+            await cache_manager.set_cached_response("newest", "c")
+
+            client = cache_manager.shards.clients["fake"]
+            assert await client.zcard(cache_manager._popularity_key("0")) == 2
+            assert await cache_manager.get_cached_response("popular") is not None
+            assert await cache_manager.get_cached_response("newest") is not None
+            assert await cache_manager.get_cached_response("cold") is None
+
+    @pytest.mark.asyncio
+    async def test_expired_popular_entries_are_reclaimed(self, cache_manager):
+        """Test that popular entries whose response expired do not pin slots."""
+        with (
+            patch.object(settings, "CACHE_MAX_ENTRIES", 1),
+            patch.object(settings, "CACHE_POPULAR_THRESHOLD", 1),
+            patch.object(settings, "CACHE_HASH_BUCKETS", 1),
+        ):
+            await cache_manager.set_cached_response("popular", "a")
+            await cache_manager.get_cached_response("popular")
+            await cache_manager.shards.clients["fake"].delete(
+                cache_manager._generate_cache_key("popular")
+            )
+            await cache_manager.set_cached_response("newest", "b")
+
+        members = await cache_manager.shards.clients["fake"].zrange(
+            cache_manager._popularity_key("0"), 0, -1
+        )
+        assert cache_manager._decode_members(members) == [
+            cache_manager._popularity_member(
+                cache_manager._generate_cache_key("newest")
+            )
+        ]
+
+    @pytest.mark.asyncio
+    async def test_legacy_popularity_set_is_dropped(self, cache_manager):
+        """Test that the unbucketed set from before sharding is deleted."""
+        client = cache_manager.shards.clients["fake"]
+        legacy_key = f"{settings.CACHE_PREFIX}:popularity"
+        await client.zadd(legacy_key, {"old": 5})
+        await cache_manager.set_cached_response("opening hours?", "9am")
+
+        await cache_manager._drop_legacy_keys()
+
+        assert await client.exists(legacy_key) == 0
+        assert await client.zcard(popularity_key(cache_manager, "opening hours?")) == 1
+
+
+class TestLocalCacheTier:
+    """Test the in-process tier and cross-worker invalidation."""
+
+    @pytest.fixture
+    def make_manager(self, make_cache_manager):
+        return lambda: make_cache_manager(
+            local_cache=LocalCache(max_bytes=10_000, ttl=60)
+        )
+
+    def test_local_cache_is_bounded_by_bytes(self):
+        """Test that the least recently used entries go first."""
+        local = LocalCache(max_bytes=100, ttl=60)
+        local.set("a", "A", 40)
+        local.set("b", "B", 40)
+        local.get("a")
+        local.set("c", "C", 40)
+
+        assert local.get("b") is None
+        assert local.get("a") == "A"
+        assert local.size == 80
+
+    def test_local_cache_ttl_override(self):
+        """Test that an entry can expire sooner than the default TTL."""
+        local = LocalCache(max_bytes=100, ttl=60)
+        local.set("short", "S", 10, ttl=0)
+        local.set("long", "L", 10)
+
+        assert local.get("short") is None
+        assert local.get("long") == "L"
+
+    @pytest.mark.asyncio
+    async def test_hits_are_counted_per_tier(self, make_manager):
+        """Test that repeat reads are served locally and flushed to Redis."""
+        metrics.reset()
+        writer, reader = make_manager(), make_manager()
+        await writer.set_cached_response("opening hours?", "9am")
+
+        await reader.get_cached_response("opening hours?")
+        await reader.get_cached_response("opening hours?")
+        await reader._flush_hits()
+
+        assert metrics.counters["cache_l2_hits"] == 1
+        assert metrics.counters["cache_l1_hits"] == 1
+        scores = await reader.shards.clients["fake"].zrange(
+            popularity_key(reader, "opening hours?"), 0, -1, withscores=True
+        )
+        assert [score for _, score in scores] == [2.0]
+
+    @pytest.mark.asyncio
+    async def test_overwrite_invalidates_other_workers(self, make_manager):
+        """Test that a write on one worker drops the local copy on another."""
+        writer, reader = make_manager(), make_manager()
+        reader._start_background_tasks()
+        try:
+            await writer.set_cached_response("opening hours?", "9am")
+            await reader.get_cached_response("opening hours?")
+            await asyncio.sleep(0.05)
+
+            await writer.set_cached_response("opening hours?", "10am")
+            for _ in range(50):
+                if len(reader.local_cache) == 0:
+                    break
+                await asyncio.sleep(0.01)
+
+            cached = await reader.get_cached_response("opening hours?")
+            assert cached["response"] == "10am"
+        finally:
+            await reader.close()
+
+    @pytest.mark.asyncio
+    async def test_invalidation_follows_the_write(self, make_manager):
+        """Test that workers are told to refetch only once Redis has changed."""
+        writer = make_manager()
+        client = writer.shards.clients["fake"]
+        cache_key = writer._generate_cache_key("opening hours?")
+        await writer.set_cached_response("opening hours?", "9am")
+        seen = []
+
+        async def publish(cache_keys):
+            data = await client.get(cache_key)
+            seen.append(data and decode_entry(data)["response"])
+
+        async def slow_execute(pipe, *args, **kwargs):
+            # Redis round trip slower than the pub/sub publish
+            await asyncio.sleep(0.01)
+            return await execute(pipe, *args, **kwargs)
+
+        execute = Pipeline.execute
+        writer._publish_invalidation = publish
+        with patch.object(Pipeline, "execute", slow_execute):
+            await writer.set_cached_response("opening hours?", "10am")
+            await writer.invalidate("opening hours?")
+
+        assert seen == ["10am", None]
+
+
+async def serve_resp(reader, writer):
+    """Answer just enough RESP for a client that subscribes and waits."""
+    try:
+        while line := await reader.readline():
+            args = []
+            for _ in range(int(line[1:])):
+                await reader.readline()
+                args.append((await reader.readline()).strip().decode())
+            if args[0].upper() == "SUBSCRIBE":
+                channel = args[1].encode()
+                writer.write(
+                    b"*3\r\n$9\r\nsubscribe\r\n$%d\r\n%b\r\n:1\r\n"
+                    % (len(channel), channel)
+                )
+            else:
+                writer.write(b"+OK\r\n")
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+class TestInvalidationListener:
+    """Test the pub/sub listener against a socket with a read timeout."""
+
+    @pytest.mark.asyncio
+    async def test_quiet_channel_keeps_shard_up(self, make_cache_manager):
+        """Test that no invalidations for a while is not a shard failure."""
+        server = await asyncio.start_server(serve_resp, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        shards = ShardedRedis.from_urls(
+            [f"redis://127.0.0.1:{port}"],
+            max_connections=4,
+            socket_timeout=0.1,
+            retry_after=30,
+        )
+        cache_manager = make_cache_manager(shards)
+        cache_manager._start_background_tasks()
+        try:
+            await asyncio.sleep(0.5)
+            assert shards.partition(["control"])
+        finally:
+            await cache_manager.close()
+            server.close()
+
+
+class TestAgentServiceCache:
+    """Test the response cache on the agent path."""
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_llm(self):
+        """Test that a cached answer is returned without calling DeepSeek."""
+        cache_manager = AsyncMock(spec=CacheManager)
+        cache_manager.cacheable_message = Mock(return_value="opening hours?")
+        cache_manager.get_cached_response.return_value = {"response": "9am-6pm"}
+        agent = AgentService(cache_manager)
+        agent.deepseek_service = AsyncMock()
+
+        result = await agent.send([AgentMessage(role="user", content="opening hours?")])
+
+        assert result.response == "9am-6pm"
+        agent.deepseek_service.chat_completion.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cache_miss_stores_response(self):
+        """Test that a fresh answer to a cacheable turn is stored."""
+        cache_manager = AsyncMock(spec=CacheManager)
+        cache_manager.cacheable_message = Mock(return_value="opening hours?")
+        cache_manager.get_cached_response.return_value = None
+        agent = AgentService(cache_manager)
+        agent.deepseek_service = AsyncMock()
+        agent.deepseek_service.chat_completion.return_value = ChatCompletion(
+            content="9am-6pm", model="deepseek-chat"
+        )
+
+        result = await agent.send([AgentMessage(role="user", content="opening hours?")])
+
+        assert result.response == "9am-6pm"
+        cache_manager.set_cached_response.assert_awaited_once_with(
+            "opening hours?", "9am-6pm"
+        )
@@ -0,0 +1,41 @@
+"""Tests for the binary cache entry format."""
+
+import pytest
+
+from cache_codec import FLAG_COMPRESSED, decode_entry, encode_entry
+
+
+class TestCacheCodec:
+    """Test encoding, compression and backward compatibility."""
+
+    def test_round_trip(self):
+        """Test that message, session and response survive encoding."""
+        data = encode_entry("Olá, horário?", "Abrimos às 9h", session_id="5511")
+
+        assert decode_entry(data) == {
+            "response": "Abrimos às 9h",
+            "message": "Olá, horário?",
+            "session_id": "5511",
+        }
+
+    def test_non_string_response(self):
+        """Test that structured responses are stored as JSON."""
+        data = encode_entry("hours?", {"open": 9, "close": 18})
+
+        assert decode_entry(data)["response"] == {"open": 9, "close": 18}
+
+    def test_large_entries_are_compressed(self):
+        """Test that bodies over the threshold are compressed."""
+        response = "We open at nine in the morning. " * 50
+        small = encode_entry("hours?", "9am", compress_min_bytes=64)
+        large = encode_entry("hours?", response, compress_min_bytes=64)
+
+        assert not small[1] & FLAG_COMPRESSED
+        assert large[1] & FLAG_COMPRESSED
+        assert len(large) < len(response)
+        assert decode_entry(large)["response"] == response
+
+    def test_unknown_version_is_rejected(self):
+        """Test that entries from a newer format fail loudly."""
+        with pytest.raises(ValueError):
+            decode_entry(b"\x09\x00")
@@ -0,0 +1,165 @@
+"""Tests for refresh-ahead and cache warm-up."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from cache_refresher import CacheRefresher
+from config import settings
+from local_cache import LocalCache
+
+
+@pytest.fixture
+def make_manager(make_cache_manager):
+    return lambda: make_cache_manager(local_cache=LocalCache(max_bytes=10_000, ttl=60))
+
+
+async def make_popular(cache_manager, message, hits):
+    await cache_manager.set_cached_response(message, f"old {message}")
+    member = cache_manager._popularity_member(
+        cache_manager._generate_cache_key(message)
+    )
+    bucket = cache_manager._bucket(member)
+    for key in (cache_manager._popularity_key, cache_manager._recent_hits_key):
+        await cache_manager.shards.clients["fake"].zadd(key(bucket), {member: hits})
+
+
+class TestCacheRefresher:
+    """Test regeneration of hot entries before they expire."""
+
+    @pytest.mark.asyncio
+    async def test_refreshes_popular_entries_close_to_expiry(self, make_manager):
+        """Test that only popular, soon-expiring entries are regenerated."""
+        cache_manager = make_manager()
+        await make_popular(cache_manager, "hot", settings.CACHE_POPULAR_THRESHOLD)
+        await make_popular(cache_manager, "cold", 0)
+        await make_popular(cache_manager, "fresh", settings.CACHE_POPULAR_THRESHOLD)
+        for message in ("hot", "cold"):
+            await cache_manager.shards.clients["fake"].expire(
+                cache_manager._generate_cache_key(message), 10
+            )
+
+        async def regenerate(message):
+            return f"new {message}"
+
+        refresher = CacheRefresher(
+            cache_manager, regenerate, 60, refresh_ahead=30, top_n=10, max_concurrency=2
+        )
+
+        assert await refresher.refresh_due() == 1
+        cached = await make_manager().get_cached_response("hot")
+        assert cached["response"] == "new hot"
+        ttl = await cache_manager.shards.clients["fake"].ttl(
+            cache_manager._generate_cache_key("hot")
+        )
+        assert ttl > 30
+
+    @pytest.mark.asyncio
+    async def test_each_entry_is_claimed_by_one_worker(self, make_manager):
+        """Test that a second worker skips entries already being refreshed."""
+        first, second = make_manager(), make_manager()
+        await make_popular(first, "hot", settings.CACHE_POPULAR_THRESHOLD)
+        await first.shards.clients["fake"].expire(first._generate_cache_key("hot"), 10)
+
+        assert len(await first.refresh_candidates(30, 10)) == 1
+        assert await second.refresh_candidates(30, 10) == []
+
+    @pytest.mark.asyncio
+    async def test_only_recent_hits_earn_another_refresh(self, make_manager):
+        """Test that hits before the last refresh no longer count."""
+        cache_manager = make_manager()
+        client = cache_manager.shards.clients["fake"]
+        cache_key = cache_manager._generate_cache_key("hot")
+        member = cache_manager._popularity_member(cache_key)
+        bucket = cache_manager._bucket(member)
+        recent_key = cache_manager._recent_hits_key(bucket)
+        await make_popular(cache_manager, "hot", 100 * settings.CACHE_POPULAR_THRESHOLD)
+
+        async def next_cycle():
+            await client.expire(cache_key, 10)
+            await client.delete(cache_manager._refresh_lock_key(member))
+            return await cache_manager.refresh_candidates(30, 10)
+
+        assert len(await next_cycle()) == 1
+        assert await client.zscore(recent_key, member) == 0
+        assert await next_cycle() == []
+
+        await client.zincrby(recent_key, settings.CACHE_POPULAR_THRESHOLD, member)
+        assert len(await next_cycle()) == 1
+        popularity_key = cache_manager._popularity_key(bucket)
+        assert await client.zscore(popularity_key, member) == pytest.approx(
+            100 * settings.CACHE_POPULAR_THRESHOLD
+        )
+
+    @pytest.mark.asyncio
+    async def test_refreshed_entry_survives_eviction(self, make_manager):
+        """Test that a refresh does not make a popular entry the next victim."""
+        with (
+            patch.object(settings, "CACHE_MAX_ENTRIES", 3),
+            patch.object(settings, "CACHE_HASH_BUCKETS", 1),
+        ):
+            cache_manager = make_manager()
+            await make_popular(cache_manager, "hot", 50)
+            await make_popular(cache_manager, "warm", 1)
+            await make_popular(cache_manager, "mild", 1)
+            await cache_manager.shards.clients["fake"].expire(
+                cache_manager._generate_cache_key("hot"), 10
+            )
+
+            async def regenerate(message):
+                return f"new {message}"
+
+            refresher = CacheRefresher(
+                cache_manager, regenerate, 60, 30, top_n=10, max_concurrency=1
+            )
+            assert await refresher.refresh_due() == 1
+            await cache_manager.set_cached_response("brand new", "answer")
+
+            cached = await make_manager().get_cached_response("hot")
+            assert cached["response"] == "new hot"
+
+    @pytest.mark.asyncio
+    async def test_regeneration_is_capped(self, make_manager):
+        """Test that no more than max_concurrency regenerations overlap."""
+        cache_manager = make_manager()
+        for i in range(5):
+            message = f"question {i}"
+            await make_popular(cache_manager, message, settings.CACHE_POPULAR_THRESHOLD)
+            await cache_manager.shards.clients["fake"].expire(
+                cache_manager._generate_cache_key(message), 10
+            )
+        running = peak = 0
+
+        async def regenerate(message):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "new"
+
+        refresher = CacheRefresher(
+            cache_manager, regenerate, 60, refresh_ahead=30, top_n=10, max_concurrency=2
+        )
+
+        assert await refresher.refresh_due() == 5
+        assert peak == 2
+
+
+class TestCacheWarmUp:
+    """Test preloading popular entries at startup."""
+
+    @pytest.mark.asyncio
+    async def test_warm_up_loads_most_popular_entries(self, make_manager):
+        """Test that the top-N entries land in the local tier."""
+        writer = make_manager()
+        for hits, message in enumerate(["a", "b", "c"]):
+            await make_popular(writer, message, hits)
+
+        cache_manager = make_manager()
+        assert await cache_manager.warm_up(2) == 2
+
+        assert cache_manager._generate_cache_key("c") in cache_manager.local_cache
+        assert cache_manager._generate_cache_key("b") in cache_manager.local_cache
+        assert cache_manager._generate_cache_key("a") not in cache_manager.local_cache
@@ -0,0 +1,94 @@
+"""Tests for sharding the response cache over several Redis nodes."""
+
+import pytest
+from fakeredis import FakeServer, aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from cache_shards import ShardedRedis, ShardUnavailable
+from shared.metrics import metrics
+
+MESSAGES = [f"question number {i}" for i in range(40)]
+
+
+def make_shards(servers):
+    return ShardedRedis(
+        {
+            f"redis://shard{i}": aioredis.FakeRedis(
+                server=server, decode_responses=False
+            )
+            for i, server in enumerate(servers)
+        },
+        retry_after=60,
+    )
+
+
+class TestShardedRedis:
+    """Test the consistent-hash ring."""
+
+    def test_removing_a_shard_only_moves_its_tags(self):
+        """Test that tags owned by surviving shards stay put."""
+        tags = [str(i) for i in range(256)]
+        three = make_shards([FakeServer() for _ in range(3)])
+        two = ShardedRedis(
+            {name: three.clients[name] for name in list(three.clients)[:2]}
+        )
+
+        owners = {tag: three.shard_for(tag) for tag in tags}
+        assert len(set(owners.values())) == 3
+        for tag, owner in owners.items():
+            if owner in two.clients:
+                assert two.shard_for(tag) == owner
+
+    def test_down_shard_is_skipped(self):
+        """Test that a failed shard is unavailable until retry_after passes."""
+        shards = make_shards([FakeServer(), FakeServer()])
+        tag = "7"
+        shards.report_failure(tag, RedisConnectionError("refused"))
+
+        with pytest.raises(ShardUnavailable):
+            shards.client(tag)
+        assert shards.shard_for(tag) not in shards.partition([tag])
+
+
+class TestShardedCacheManager:
+    """Test CacheManager on top of several shards."""
+
+    @pytest.mark.asyncio
+    async def test_entries_and_popularity_share_a_shard(self, make_cache_manager):
+        """Test that every entry lives next to the set tracking it."""
+        shards = make_shards([FakeServer(), FakeServer()])
+        cache_manager = make_cache_manager(shards)
+        for message in MESSAGES:
+            await cache_manager.set_cached_response(message, "answer")
+
+        used = set()
+        for message in MESSAGES:
+            cache_key = cache_manager._generate_cache_key(message)
+            member = cache_manager._popularity_member(cache_key)
+            bucket = cache_manager._bucket(member)
+            client = shards.client(bucket)
+            used.add(shards.shard_for(bucket))
+            assert await client.exists(cache_key)
+            assert (
+                await client.zscore(cache_manager._popularity_key(bucket), member)
+                is not None
+            )
+        assert len(used) == 2
+
+    @pytest.mark.asyncio
+    async def test_down_shard_degrades_to_misses(self, make_cache_manager):
+        """Test that losing a shard only loses the entries it held."""
+        metrics.reset()
+        servers = [FakeServer(), FakeServer()]
+        cache_manager = make_cache_manager(make_shards(servers))
+        for message in MESSAGES:
+            await cache_manager.set_cached_response(message, "answer")
+
+        servers[0].connected = False
+        hits = [await cache_manager.get_cached_response(m) for m in MESSAGES]
+        await cache_manager.set_cached_response("one more", "answer")
+
+        assert 0 < sum(hit is not None for hit in hits) < len(MESSAGES)
+        assert metrics.counters["cache_shard_failures"] == 1
+        assert metrics.counters["cache_shard_skips"] > 0
+        assert len(await cache_manager._top_members(100)) > 0
@@ -0,0 +1,49 @@
+"""Tests for webhook message deduplication."""
+
+import pytest
+from fakeredis import aioredis
+
+from messaging.deduplicator import MessageDeduplicator
+
+
+class TestMessageDeduplicator:
+    """Test local and Redis-backed duplicate detection."""
+
+    @pytest.mark.asyncio
+    async def test_local_duplicate_is_detected(self):
+        """Test that the same id is reported as duplicate on second delivery."""
+        dedup = MessageDeduplicator(max_entries=10, ttl=60)
+
+        assert await dedup.is_duplicate("mcp", "ABC") is False
+        assert await dedup.is_duplicate("mcp", "ABC") is True
+        assert await dedup.is_duplicate("other", "ABC") is False
+
+    @pytest.mark.asyncio
+    async def test_missing_id_is_never_duplicate(self):
+        """Test that messages without an id are always processed."""
+        dedup = MessageDeduplicator(max_entries=10, ttl=60)
+
+        assert await dedup.is_duplicate("mcp", None) is False
+        assert await dedup.is_duplicate("mcp", None) is False
+
+    @pytest.mark.asyncio
+    async def test_local_cache_is_bounded(self):
+        """Test that the local LRU evicts the oldest ids."""
+        dedup = MessageDeduplicator(max_entries=2, ttl=60)
+        for message_id in ["a", "b", "c"]:
+            await dedup.is_duplicate("mcp", message_id)
+
+        assert len(dedup._seen) == 2
+        assert await dedup.is_duplicate("mcp", "a") is False
+
+    @pytest.mark.asyncio
+    async def test_redis_detects_duplicate_from_other_worker(self):
+        """Test that a shared Redis catches ids seen by another process."""
+        redis_client = aioredis.FakeRedis()
+        first = MessageDeduplicator(max_entries=10, ttl=60)
+        second = MessageDeduplicator(max_entries=10, ttl=60)
+        first.redis_client = redis_client
+        second.redis_client = redis_client
+
+        assert await first.is_duplicate("mcp", "ABC") is False
+        assert await second.is_duplicate("mcp", "ABC") is True
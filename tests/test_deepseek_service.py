@@ -0,0 +1,76 @@
+"""Tests for the DeepSeek chat completions client."""
+
+import httpx
+import pytest
+
+from ai.adaptive_limiter import AdaptiveLimiter, RateLimitError
+from ai.llm_router import Backend, LLMRouter
+from ai.llm_transport import LLMTransport
+from ai.mcp_models import AgentMessage
+from ai.mcp_service import DeepSeekService
+
+
+def make_service(handler):
+    transport = LLMTransport(base_url="http://llm.local", api_key="key")
+    transport._client = httpx.AsyncClient(
+        base_url="http://llm.local", transport=httpx.MockTransport(handler)
+    )
+    limiter = AdaptiveLimiter(
+        initial_limit=4, min_limit=1, max_limit=8, backoff=0.5, default_retry_after=1
+    )
+    router = LLMRouter([Backend("test", transport, "deepseek-chat")])
+    return DeepSeekService(router, limiter)
+
+
+class TestDeepSeekService:
+    """Test blocking and streaming completions."""
+
+    @pytest.mark.asyncio
+    async def test_stream_completion_yields_deltas(self):
+        """Test that SSE chunks are parsed into content deltas."""
+        body = (
+            'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n'
+            'data: {"choices":[{"delta":{"content":"Hel"}}]}\n\n'
+            'data: {"choices":[{"delta":{"content":"lo"}}]}\n\n'
+            "data: [DONE]\n\n"
+        )
+
+        def handler(request):
+            assert b'"stream":true' in request.content.replace(b" ", b"")
+            return httpx.Response(200, text=body)
+
+        service = make_service(handler)
+        messages = [AgentMessage(role="user", content="hi")]
+
+        deltas = [d async for d in service.stream_completion(messages)]
+        assert deltas == ["Hel", "lo"]
+
+        result = await service.chat_completion(messages, stream=True)
+        assert result.content == "Hello"
+
+    @pytest.mark.asyncio
+    async def test_stream_completion_raises_on_error_status(self):
+        """Test that a non-200 stream response is reported."""
+        service = make_service(lambda request: httpx.Response(500, text="down"))
+
+        with pytest.raises(Exception, match="500"):
+            async for _ in service.stream_completion(
+                [AgentMessage(role="user", content="hi")]
+            ):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_backs_off_the_limiter(self):
+        """Test that a 429 surfaces Retry-After and shrinks the limit."""
+        service = make_service(
+            lambda request: httpx.Response(
+                429, headers={"Retry-After": "0.01"}, text="slow down"
+            )
+        )
+
+        with pytest.raises(RateLimitError) as error:
+            await service.chat_completion([AgentMessage(role="user", content="hi")])
+
+        assert error.value.retry_after == pytest.approx(0.01)
+        assert service.limiter.limit == 2
+        assert service.limiter.in_flight == 0
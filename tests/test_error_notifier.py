@@ -0,0 +1,38 @@
+"""Tests for throttled error notifications."""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from messaging.error_notifier import ErrorNotifier
+
+
+class TestErrorNotifier:
+    """Test that an outage produces one message, not one per failure."""
+
+    @pytest.mark.asyncio
+    async def test_errors_within_interval_are_suppressed(self):
+        """Test that only the first error in the interval is sent."""
+        evolution_client = AsyncMock()
+        notifier = ErrorNotifier(evolution_client, "5511999", interval=60)
+
+        for _ in range(5):
+            await notifier.notify(Exception("DeepSeek API error: 429"))
+
+        evolution_client.send_message.assert_awaited_once()
+        assert notifier.suppressed == 4
+
+    @pytest.mark.asyncio
+    async def test_next_notice_reports_suppressed_count(self):
+        """Test that dropped errors are summarized once the interval passes."""
+        evolution_client = AsyncMock()
+        notifier = ErrorNotifier(evolution_client, "5511999", interval=0)
+        notifier.suppressed = 3
+        notifier._last_sent = 0.0
+
+        await notifier.notify(Exception("boom"))
+
+        request = evolution_client.send_message.call_args.args[0]
+        assert request.number == "5511999"
+        assert "+3" in request.text
+        assert notifier.suppressed == 0
@@ -0,0 +1,66 @@
+"""Tests for the webhook ingestion queue."""
+
+import asyncio
+
+import pytest
+
+from messaging.ingestion_queue import IngestionQueue, IngestionQueueFull
+
+
+class TestIngestionQueue:
+    """Test bounded ingestion queue behaviour."""
+
+    @pytest.mark.asyncio
+    async def test_workers_process_submitted_events(self):
+        """Test that submitted events are drained by the worker pool."""
+        processed = []
+
+        async def handler(event):
+            processed.append(event)
+
+        queue = IngestionQueue(maxsize=10, workers=2)
+        await queue.start(handler)
+        for i in range(5):
+            queue.submit(i)
+        await queue.stop()
+
+        assert sorted(processed) == [0, 1, 2, 3, 4]
+        assert queue.running is False
+
+    @pytest.mark.asyncio
+    async def test_submit_raises_when_full(self):
+        """Test that a full queue rejects events instead of blocking."""
+        queue = IngestionQueue(maxsize=1, workers=1)
+        queue.submit("first")
+
+        with pytest.raises(IngestionQueueFull):
+            queue.submit("second")
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_do_not_kill_workers(self):
+        """Test that a failing event does not stop later events."""
+        processed = []
+
+        async def handler(event):
+            if event == "bad":
+                raise ValueError("boom")
+            processed.append(event)
+
+        queue = IngestionQueue(maxsize=10, workers=1)
+        await queue.start(handler)
+        queue.submit("bad")
+        queue.submit("good")
+        await asyncio.wait_for(queue._queue.join(), timeout=1)
+        await queue.stop()
+
+        assert processed == ["good"]
+
+    @pytest.mark.asyncio
+    async def test_submit_many_is_all_or_nothing(self):
+        """Test that a batch that does not fit is rejected as a whole."""
+        queue = IngestionQueue(maxsize=3, workers=1)
+        queue.submit_many([1, 2])
+
+        with pytest.raises(IngestionQueueFull):
+            queue.submit_many([3, 4])
+        assert queue.qsize() == 2
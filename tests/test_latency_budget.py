@@ -0,0 +1,196 @@
+"""Tests for reply deadlines and request hedging."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from ai.adaptive_limiter import AdaptiveLimiter
+from ai.latency_budget import DeadlineExceeded, HedgePolicy
+from ai.llm_router import Backend, LLMRouter
+from ai.llm_transport import LLMTransport
+from ai.mcp_models import AgentMessage
+from ai.mcp_service import DeepSeekService
+from shared.metrics import metrics
+
+COMPLETION = {
+    "id": "1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "deepseek-chat",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "ok"},
+            "finish_reason": "stop",
+        }
+    ],
+}
+
+
+def make_service(handler, hedging=None):
+    transport = LLMTransport(base_url="http://llm.local", api_key="key")
+    transport._client = httpx.AsyncClient(
+        base_url="http://llm.local", transport=httpx.MockTransport(handler)
+    )
+    limiter = AdaptiveLimiter(
+        initial_limit=4, min_limit=1, max_limit=8, backoff=0.5, default_retry_after=1
+    )
+    router = LLMRouter([Backend("test", transport, "deepseek-chat")])
+    return DeepSeekService(router, limiter, hedging)
+
+
+class TestHedgePolicy:
+    """Test the hedge delay and budget."""
+
+    def test_delay_needs_enough_samples(self):
+        """Test that no hedge delay is given before min_samples."""
+        policy = HedgePolicy(quantile=0.95, min_samples=3, window=10, budget_percent=5)
+        policy.record(0.1)
+        policy.record(0.2)
+        assert policy.delay() is None
+
+        policy.record(0.3)
+        assert policy.delay() == 0.3
+
+    def test_delay_uses_recent_window(self):
+        """Test that old samples fall out of the window."""
+        policy = HedgePolicy(quantile=0.5, min_samples=1, window=2, budget_percent=5)
+        for seconds in (10.0, 1.0, 2.0):
+            policy.record(seconds)
+        assert policy.delay() == 2.0
+
+    def test_budget_limits_hedges(self):
+        """Test that hedges stay within their share of requests."""
+        policy = HedgePolicy(quantile=0.95, min_samples=1, window=10, budget_percent=25)
+        granted = 0
+        for _ in range(8):
+            policy.on_request()
+            granted += policy.try_acquire()
+        assert granted == 2
+
+
+class TestDeadlines:
+    """Test deadline propagation into LLM calls."""
+
+    @pytest.mark.asyncio
+    async def test_chat_completion_deadline_exceeded(self):
+        """Test that a slow upstream fails once the deadline passes."""
+
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json=COMPLETION)
+
+        service = make_service(handler)
+        with pytest.raises(DeadlineExceeded):
+            await service.chat_completion(
+                [AgentMessage(role="user", content="hi")],
+                deadline=time.time() + 0.05,
+            )
+        assert service.limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_deadline_covers_first_byte(self):
+        """Test that a stream which never starts hits the deadline."""
+
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, text="data: [DONE]\n\n")
+
+        service = make_service(handler)
+        with pytest.raises(DeadlineExceeded):
+            async for _ in service.stream_completion(
+                [AgentMessage(role="user", content="hi")],
+                deadline=time.time() + 0.05,
+            ):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_no_deadline_waits(self):
+        """Test that calls without a deadline are not cut short."""
+        service = make_service(lambda request: httpx.Response(200, json=COMPLETION))
+        result = await service.chat_completion(
+            [AgentMessage(role="user", content="hi")]
+        )
+        assert result.content == "ok"
+
+
+class TestHedging:
+    """Test backup requests for slow first bytes."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self):
+        """Test that the hedge answers when the primary stalls."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                await asyncio.sleep(1)
+            return httpx.Response(200, json=COMPLETION)
+
+        policy = HedgePolicy(quantile=0.5, min_samples=1, window=10, budget_percent=100)
+        policy.record(0.01)
+        service = make_service(handler, policy)
+
+        started = time.monotonic()
+        result = await service.chat_completion(
+            [AgentMessage(role="user", content="hi")]
+        )
+
+        assert result.content == "ok"
+        assert len(calls) == 2
+        assert time.monotonic() - started < 0.5
+        counters = metrics.snapshot()["counters"]
+        assert counters["llm_hedges_sent"] == 1
+        assert counters["llm_hedges_won"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_error_does_not_beat_slow_success(self):
+        """Test that a hedge's 429 waits for the primary's answer."""
+        in_flight = []
+
+        async def handler(request):
+            in_flight.append(service.limiter.in_flight)
+            if len(in_flight) == 1:
+                await asyncio.sleep(0.1)
+                return httpx.Response(200, json=COMPLETION)
+            return httpx.Response(429, json={"error": "busy"})
+
+        policy = HedgePolicy(quantile=0.5, min_samples=1, window=10, budget_percent=100)
+        policy.record(0.01)
+        service = make_service(handler, policy)
+
+        result = await service.chat_completion(
+            [AgentMessage(role="user", content="hi")]
+        )
+
+        assert result.content == "ok"
+        assert in_flight == [1, 2]
+        assert service.limiter.in_flight == 0
+        assert "llm_hedges_won" not in metrics.snapshot()["counters"]
+
+    @pytest.mark.asyncio
+    async def test_hedge_budget_exhausted(self):
+        """Test that no hedge is sent without budget."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=COMPLETION)
+
+        policy = HedgePolicy(quantile=0.5, min_samples=1, window=10, budget_percent=0)
+        policy.record(0.01)
+        service = make_service(handler, policy)
+
+        result = await service.chat_completion(
+            [AgentMessage(role="user", content="hi")]
+        )
+
+        assert result.content == "ok"
+        assert len(calls) == 1
@@ -0,0 +1,210 @@
+"""Tests for routing LLM requests across several backends."""
+
+import time
+
+import httpx
+import pytest
+
+from ai.adaptive_limiter import AdaptiveLimiter
+from ai.llm_router import Backend, LLMRouter
+from ai.llm_transport import LLMTransport
+from ai.mcp_models import AgentMessage
+from ai.mcp_service import DeepSeekService
+from benchmarks.fake_openai_server import create_app
+from shared.metrics import metrics
+
+
+def make_backend(name, transport=None, models=None, **options):
+    llm_transport = LLMTransport(base_url=f"http://{name}", api_key="key")
+    llm_transport._client = httpx.AsyncClient(
+        base_url=f"http://{name}",
+        transport=transport
+        or httpx.ASGITransport(app=create_app(name=name, latency=0, **options)),
+    )
+    return Backend(name, llm_transport, f"{name}-model", models=models)
+
+
+def make_service(*backends):
+    limiter = AdaptiveLimiter(
+        initial_limit=4, min_limit=1, max_limit=8, backoff=0.5, default_retry_after=0
+    )
+    return DeepSeekService(LLMRouter(list(backends)), limiter)
+
+
+def served(backend):
+    return backend.transport.client._transport.app.state.requests
+
+
+class TestLLMRouter:
+    """Test backend scoring and selection."""
+
+    def test_prefers_lower_latency(self):
+        """Test that the backend with the lower EWMA latency wins."""
+        fast, slow = make_backend("fast"), make_backend("slow")
+        router = LLMRouter([slow, fast])
+        router.record_success(fast, 0.1)
+        router.record_success(slow, 0.5)
+
+        assert router.choose() is fast
+
+    def test_untried_backends_score_at_fleet_mean(self):
+        """Test that a backend without samples competes at the mean latency."""
+        fast, slow = make_backend("fast"), make_backend("slow")
+        fresh = make_backend("fresh")
+        router = LLMRouter([fast, slow, fresh])
+        router.record_success(fast, 0.1)
+        router.record_success(slow, 0.5)
+
+        assert router.score(fresh) == pytest.approx(0.3)
+        assert router.choose(exclude={"fast"}) is fresh
+        fresh.outstanding = 2
+        assert router.choose(exclude={"fast"}) is slow
+
+    def test_always_failing_backend_is_not_preferred(self):
+        """Test that errors count against a backend that never succeeded."""
+        broken, healthy = make_backend("broken"), make_backend("healthy")
+        router = LLMRouter([broken, healthy])
+        router.record_failure(broken)
+        router.record_success(healthy, 0.5)
+        broken.down_until = time.monotonic() - 1
+
+        assert router.choose() is healthy
+
+    def test_outstanding_requests_shift_load(self):
+        """Test that a busy fast backend loses to an idle slower one."""
+        fast, slow = make_backend("fast"), make_backend("slow")
+        router = LLMRouter([fast, slow])
+        router.record_success(fast, 0.1)
+        router.record_success(slow, 0.3)
+        fast.outstanding = 3
+
+        assert router.choose() is slow
+
+    def test_ewma_tracks_recent_latency(self):
+        """Test that latency samples are smoothed rather than replaced."""
+        backend = make_backend("a")
+        router = LLMRouter([backend], alpha=0.5)
+        router.record_success(backend, 1.0)
+        router.record_success(backend, 3.0)
+
+        assert backend.latency == pytest.approx(2.0)
+
+    def test_failed_backend_cools_down(self):
+        """Test that a failing backend is skipped until its cooldown ends."""
+        first, second = make_backend("first"), make_backend("second")
+        router = LLMRouter([first, second], cooldown=60)
+        router.record_success(first, 0.1)
+        router.record_success(second, 0.5)
+        router.record_failure(first)
+
+        assert first.error_rate > 0
+        assert router.choose() is second
+
+        first.down_until = time.monotonic() - 1
+        router.record_success(first, 0.1)
+        assert router.choose() is first
+
+    def test_all_down_still_routes(self):
+        """Test that some backend is returned when every one is cooling down."""
+        only = make_backend("only")
+        router = LLMRouter([only])
+        router.record_failure(only)
+
+        assert router.choose() is only
+        assert router.choose(exclude={"only"}) is only
+
+
+class TestBackendModels:
+    """Test resolving a caller's model name per backend."""
+
+    def test_passthrough_backend_serves_requested_model(self):
+        """Test that a backend without a model map sends any name as given."""
+        backend = make_backend("deepseek")
+        assert backend.model_for("deepseek-reasoner") == "deepseek-reasoner"
+        assert backend.model_for(None) == "deepseek-model"
+
+    def test_mapped_backend_serves_its_own_models(self):
+        """Test that unknown names fall back to the backend's own model."""
+        backend = make_backend("local", models={"deepseek-chat": "qwen-small"})
+        assert backend.model_for("deepseek-chat") == "qwen-small"
+        assert backend.model_for("deepseek-reasoner") == "local-model"
+
+    @pytest.mark.asyncio
+    async def test_explicit_model_is_resolved_on_the_chosen_backend(self):
+        """Test that a summary-style model override reaches a local backend."""
+        service = make_service(make_backend("local", models={}))
+        result = await service.chat_completion(
+            [AgentMessage(role="user", content="oi")], model="deepseek-chat"
+        )
+        assert result.model == "local-model"
+
+
+class TestRoutedService:
+    """Test DeepSeekService against fake OpenAI-compatible backends."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_fails_over_on_error_status(self):
+        """Test that an overloaded backend is retried elsewhere."""
+        broken = make_backend("broken", error_rate=1.0)
+        healthy = make_backend("healthy")
+        service = make_service(broken, healthy)
+
+        result = await service.chat_completion(
+            [AgentMessage(role="user", content="oi")]
+        )
+
+        assert result.model == "healthy-model"
+        assert served(broken) == 1
+        assert metrics.snapshot()["counters"]["llm_failovers"] == 1
+        assert broken.down_until > time.monotonic()
+        assert broken.outstanding == healthy.outstanding == 0
+
+    @pytest.mark.asyncio
+    async def test_backend_returning_500_is_not_retried_first(self):
+        """Test that a failing backend stays behind once its cooldown ends."""
+        broken = make_backend("broken", error_rate=1.0)
+        healthy = make_backend("healthy")
+        service = make_service(broken, healthy)
+
+        for _ in range(3):
+            broken.down_until = 0.0
+            result = await service.chat_completion(
+                [AgentMessage(role="user", content="oi")]
+            )
+            assert result.model == "healthy-model"
+
+        assert served(broken) == 1
+
+    @pytest.mark.asyncio
+    async def test_fails_over_on_connection_error(self):
+        """Test that an unreachable backend is retried elsewhere."""
+
+        def refuse(request):
+            raise httpx.ConnectError("refused", request=request)
+
+        down = make_backend("down", transport=httpx.MockTransport(refuse))
+        healthy = make_backend("healthy")
+        service = make_service(down, healthy)
+
+        deltas = [
+            d
+            async for d in service.stream_completion(
+                [AgentMessage(role="user", content="oi")]
+            )
+        ]
+
+        assert "".join(deltas) == "Olá! Como posso ajudar?"
+        assert down.outstanding == healthy.outstanding == 0
+
+    @pytest.mark.asyncio
+    async def test_last_backend_error_is_raised(self):
+        """Test that the error surfaces once every backend has failed."""
+        service = make_service(
+            make_backend("a", error_rate=1.0), make_backend("b", error_rate=1.0)
+        )
+
+        with pytest.raises(Exception, match="503"):
+            await service.chat_completion([AgentMessage(role="user", content="oi")])
@@ -0,0 +1,33 @@
+"""Tests for the shared LLM HTTP transport."""
+
+import pytest
+
+from ai.ai_service import AgentService
+from ai.llm_router import llm_router
+from ai.llm_transport import LLMTransport, llm_transport
+
+
+class TestLLMTransport:
+    """Test pooled client lifecycle."""
+
+    @pytest.mark.asyncio
+    async def test_client_is_reused_until_closed(self):
+        """Test that one client is shared and recreated only after close."""
+        transport = LLMTransport(base_url="http://llm.local", api_key="key")
+        client = transport.client
+
+        assert transport.client is client
+        assert client.headers["Authorization"] == "Bearer key"
+
+        await transport.close()
+        assert client.is_closed
+        assert transport.client is not client
+        await transport.close()
+
+    def test_agent_and_mcp_client_share_the_transport(self):
+        """Test that every caller uses the module-level transport."""
+        agent = AgentService()
+
+        assert agent.deepseek_service.router is llm_router
+        assert llm_router.backends[0].transport is llm_transport
+        assert agent.mcp_client.deepseek_service is agent.deepseek_service
@@ -1,11 +1,14 @@
 """Tests for main FastAPI application."""
 
+import asyncio
 from unittest.mock import AsyncMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
-from main import app, conversation_sessions
+from ai.mcp_models import AgentMessage
+from main import app, session_store
+from messaging.ingestion_queue import IngestionQueueFull
 
 
 class TestMainEndpoints:
@@ -16,7 +19,7 @@ class TestMainEndpoints:
         """Setup test fixtures."""
         self.client = TestClient(app)
         # Clear conversation sessions before each test
-        conversation_sessions.clear()
+        asyncio.run(session_store.clear())
 
     def test_root_endpoint(self):
         """Test root endpoint returns correct message."""
@@ -66,3 +69,69 @@ class TestMainEndpoints:
             assert response.status_code == 200
             assert response.json() == {"status": "success", "data": {"status": "sent"}}
             mock_evolution_client.send_message.assert_called_once()
+
+    def test_webhook_is_enqueued(self, sample_webhook_payload):
+        """Test that the webhook returns 202 once the event is queued."""
+        with patch("main.ingestion_queue") as mock_queue:
+            response = self.client.post("/webhook", json=sample_webhook_payload)
+            assert response.status_code == 202
+            assert response.json() == {"status": "received"}
+            mock_queue.submit.assert_called_once()
+
+    def test_webhook_rejects_when_queue_full(self, sample_webhook_payload):
+        """Test that a full ingestion queue pushes back with 503."""
+        with patch("main.ingestion_queue") as mock_queue:
+            mock_queue.submit.side_effect = IngestionQueueFull("full")
+            response = self.client.post("/webhook", json=sample_webhook_payload)
+            assert response.status_code == 503
+            assert "Retry-After" in response.headers
+
+    def test_webhook_batch_is_enqueued(self, sample_webhook_payload):
+        """Test that a batch of events is enqueued in one request."""
+        with patch("main.ingestion_queue") as mock_queue:
+            response = self.client.post(
+                "/webhook/batch", json=[sample_webhook_payload] * 3
+            )
+            assert response.status_code == 202
+            assert response.json() == {"status": "received", "accepted": 3}
+            assert len(mock_queue.submit_many.call_args[0][0]) == 3
+
+    def test_webhook_rejects_malformed_body(self):
+        """Test that a body without instance/data is rejected."""
+        with patch("main.ingestion_queue") as mock_queue:
+            response = self.client.post("/webhook", content=b'{"data": []}')
+            assert response.status_code == 422
+            mock_queue.submit.assert_not_called()
+
+    def test_sessions_summary_and_detail(self):
+        """Test paginated summaries and the per-session detail endpoint."""
+        asyncio.run(
+            session_store.append(
+                "whatsapp_1", AgentMessage(role="user", content="hello")
+            )
+        )
+
+        response = self.client.get("/sessions", params={"summary": True})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["next_cursor"] is None
+        assert body["sessions"][0]["session_id"] == "whatsapp_1"
+        assert "messages" not in body["sessions"][0]
+
+        response = self.client.get("/sessions/whatsapp_1")
+        assert response.json()["messages"] == [{"role": "user", "content": "hello"}]
+        assert self.client.get("/sessions/missing").status_code == 404
+
+    def test_sessions_export_streams_ndjson(self):
+        """Test that the export endpoint emits one JSON line per session."""
+        for i in range(3):
+            asyncio.run(
+                session_store.append(
+                    f"whatsapp_{i}", AgentMessage(role="user", content="hi")
+                )
+            )
+
+        response = self.client.get("/sessions/export")
+        lines = response.text.strip().split("\n")
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert len(lines) == 3
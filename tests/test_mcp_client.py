@@ -0,0 +1,324 @@
+"""Tests for the MCP JSON-RPC client and tool-calling loop."""
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from ai.adaptive_limiter import AdaptiveLimiter
+from ai.llm_router import Backend, LLMRouter
+from ai.llm_transport import LLMTransport
+from ai.mcp_client import MCPClient
+from ai.mcp_models import AgentMessage, CallToolRequest
+from ai.mcp_service import DeepSeekService
+from shared.metrics import metrics
+
+TOOLS = [
+    {
+        "name": "weather",
+        "description": "Current weather in a city",
+        "inputSchema": {"type": "object", "properties": {"city": {"type": "string"}}},
+    },
+    {
+        "name": "flights",
+        "description": "Flights between two airports",
+        "inputSchema": {"type": "object"},
+        "annotations": {"readOnlyHint": True},
+    },
+]
+
+
+def tool_call(call_id, name, arguments):
+    return {
+        "id": call_id,
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)},
+    }
+
+
+def completion(content="", tool_calls=None):
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return {"model": "deepseek-chat", "choices": [{"message": message}]}
+
+
+class FakeMCPServer:
+    """JSON-RPC handler for httpx.MockTransport."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.methods = []
+        self.sessions = 0
+
+    async def __call__(self, request):
+        payload = json.loads(request.content)
+        method = payload["method"]
+        self.methods.append(method)
+        if method == "initialize":
+            self.sessions += 1
+            return httpx.Response(
+                200,
+                json={"jsonrpc": "2.0", "id": payload["id"], "result": {}},
+                headers={"Mcp-Session-Id": f"session-{self.sessions}"},
+            )
+        if request.headers.get("mcp-session-id") != f"session-{self.sessions}":
+            return httpx.Response(404)
+        if "id" not in payload:
+            return httpx.Response(202)
+        if method == "tools/list":
+            result = {"tools": TOOLS}
+        elif method == "tools/call":
+            name = payload["params"]["name"]
+            await asyncio.sleep(self.delays.get(name, 0))
+            args = payload["params"]["arguments"]
+            result = {"content": [{"type": "text", "text": f"{name}: {args}"}]}
+        else:
+            result = {}
+        return httpx.Response(
+            200, json={"jsonrpc": "2.0", "id": payload["id"], "result": result}
+        )
+
+
+def make_client(llm_replies, server):
+    llm_requests = []
+
+    def llm_handler(request):
+        llm_requests.append(json.loads(request.content))
+        return httpx.Response(200, json=llm_replies.pop(0))
+
+    transport = LLMTransport(base_url="http://llm.local", api_key="key")
+    transport._client = httpx.AsyncClient(
+        base_url="http://llm.local", transport=httpx.MockTransport(llm_handler)
+    )
+    limiter = AdaptiveLimiter(
+        initial_limit=4, min_limit=1, max_limit=8, backoff=0.5, default_retry_after=1
+    )
+    service = DeepSeekService(
+        LLMRouter([Backend("test", transport, "deepseek-chat")]), limiter
+    )
+    client = MCPClient(service)
+    client.base_url = "http://mcp.local/mcp"
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    return client, llm_requests
+
+
+class TestMCPClient:
+    """Test the MCP session and the tool loop."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_tools_run_in_parallel(self):
+        """Test that one round's tool calls run concurrently."""
+        server = FakeMCPServer(delays={"weather": 0.2, "flights": 0.2})
+        client, llm_requests = make_client(
+            [
+                completion(
+                    tool_calls=[
+                        tool_call("1", "weather", {"city": "Lisboa"}),
+                        tool_call("2", "flights", {"from": "GRU", "to": "LIS"}),
+                    ]
+                ),
+                completion("Sol em Lisboa e voos às 22h."),
+            ],
+            server,
+        )
+
+        started = time.monotonic()
+        result = await client.run([AgentMessage(role="user", content="Viagem?")])
+
+        assert time.monotonic() - started < 0.35
+        assert result.content == "Sol em Lisboa e voos às 22h."
+        assert server.methods[:3] == [
+            "initialize",
+            "notifications/initialized",
+            "tools/list",
+        ]
+        first, second = llm_requests
+        assert [t["function"]["name"] for t in first["tools"]] == [
+            "weather",
+            "flights",
+        ]
+        tool_messages = [m for m in second["messages"] if m["role"] == "tool"]
+        assert [m["tool_call_id"] for m in tool_messages] == ["1", "2"]
+        assert "Lisboa" in tool_messages[0]["content"]
+        assert second["messages"][-3]["tool_calls"][0]["id"] == "1"
+
+    @pytest.mark.asyncio
+    async def test_slow_tool_times_out(self):
+        """Test that a slow tool reports a timeout instead of blocking."""
+        server = FakeMCPServer(delays={"flights": 1})
+        client, llm_requests = make_client(
+            [
+                completion(tool_calls=[tool_call("1", "flights", {})]),
+                completion("Não consegui consultar os voos."),
+            ],
+            server,
+        )
+        client.tool_timeouts = {"flights": 0.05}
+
+        result = await client.run([AgentMessage(role="user", content="Voos?")])
+
+        assert result.content == "Não consegui consultar os voos."
+        assert "timed out" in llm_requests[1]["messages"][-1]["content"]
+        assert metrics.snapshot()["counters"]["mcp_tool_timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_iterations_are_capped(self):
+        """Test that the loop ends with a tool-free call after the cap."""
+        looping = completion(tool_calls=[tool_call("1", "weather", {})])
+        client, llm_requests = make_client(
+            [looping, looping, completion("Resposta final")], FakeMCPServer()
+        )
+        client.max_iterations = 2
+
+        result = await client.run([AgentMessage(role="user", content="Tempo?")])
+
+        assert result.content == "Resposta final"
+        assert len(llm_requests) == 3
+        assert "tools" not in llm_requests[-1]
+
+    @pytest.mark.asyncio
+    async def test_expired_session_is_reinitialized(self):
+        """Test that a 404 for the old session starts a new one and retries."""
+        server = FakeMCPServer()
+        client, _ = make_client([], server)
+        await client.list_tools()
+
+        server.sessions += 1  # the server forgets session-1
+        result = await client.call_tool(
+            CallToolRequest(name="weather", arguments={"city": "Lisboa"})
+        )
+
+        assert "Lisboa" in result.content[0].text
+        assert server.methods.count("initialize") == 2
+        assert client._session_id == "session-3"
+        assert metrics.snapshot()["counters"]["mcp_session_restarts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_answers_without_tools_when_catalog_unavailable(self):
+        """Test that the model still answers when tools cannot be listed."""
+        client, llm_requests = make_client(
+            [completion("Olá!")], lambda request: httpx.Response(502)
+        )
+
+        result = await client.run([AgentMessage(role="user", content="Oi")])
+
+        assert result.content == "Olá!"
+        assert "tools" not in llm_requests[0]
+        assert metrics.snapshot()["counters"]["mcp_tools_unavailable"] == 1
+
+    @pytest.mark.asyncio
+    async def test_health_check(self):
+        """Test that health reflects whether the server answers a ping."""
+        client, _ = make_client([], FakeMCPServer())
+        assert await client.health_check() is True
+
+        client, _ = make_client([], lambda request: httpx.Response(502))
+        assert await client.health_check() is False
+
+
+class TestToolCaching:
+    """Test the cached tool catalog and memoized tool results."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_catalog_is_cached_until_ttl(self):
+        """Test that tools are listed once per TTL."""
+        server = FakeMCPServer()
+        client, _ = make_client([], server)
+
+        await client.preload()
+        await client.list_tools()
+        assert server.methods.count("tools/list") == 1
+
+        client._tools_expires_at = 0.0
+        await client.list_tools()
+        assert server.methods.count("tools/list") == 2
+
+    @pytest.mark.asyncio
+    async def test_stale_catalog_served_when_refresh_fails(self):
+        """Test that a failed refresh keeps the previous catalog."""
+        server = FakeMCPServer()
+        client, _ = make_client([], server)
+        tools = await client.list_tools()
+
+        client._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(502))
+        )
+        client._tools_expires_at = 0.0
+        assert await client.list_tools() is tools
+
+    @pytest.mark.asyncio
+    async def test_list_changed_notification_invalidates(self):
+        """Test that a tools/list_changed notification forces a refresh."""
+        server = FakeMCPServer()
+        client, _ = make_client([], server)
+        await client.list_tools()
+
+        body = (
+            'data: {"jsonrpc":"2.0","method":"notifications/tools/list_changed"}\n\n'
+            'data: {"jsonrpc":"2.0","id":9,"result":{}}\n\n'
+        )
+        client._parse(
+            httpx.Response(
+                200, text=body, headers={"content-type": "text/event-stream"}
+            )
+        )
+        await client.list_tools()
+        assert server.methods.count("tools/list") == 2
+
+    @pytest.mark.asyncio
+    async def test_read_only_results_are_memoized(self):
+        """Test that equal arguments in any key order reuse one result."""
+        server = FakeMCPServer()
+        client, _ = make_client([], server)
+        await client.list_tools()
+
+        first = await client.call_tool(
+            CallToolRequest(name="flights", arguments={"from": "GRU", "to": "LIS"})
+        )
+        second = await client.call_tool(
+            CallToolRequest(name="flights", arguments={"to": "LIS", "from": "GRU"})
+        )
+        await client.call_tool(
+            CallToolRequest(name="flights", arguments={"from": "GRU", "to": "MAD"})
+        )
+
+        assert second is first
+        assert server.methods.count("tools/call") == 2
+        assert metrics.snapshot()["counters"]["mcp_tool_cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_other_tools_are_not_memoized(self):
+        """Test that tools without hints or a configured TTL always run."""
+        server = FakeMCPServer()
+        client, _ = make_client([], server)
+        await client.list_tools()
+
+        for _ in range(2):
+            await client.call_tool(
+                CallToolRequest(name="weather", arguments={"city": "Lisboa"})
+            )
+        assert server.methods.count("tools/call") == 2
+
+    @pytest.mark.asyncio
+    async def test_per_tool_ttl(self):
+        """Test that a configured TTL memoizes a tool and sets its expiry."""
+        server = FakeMCPServer()
+        client, _ = make_client([], server)
+        client.result_ttls = {"weather": 0}
+        await client.list_tools()
+
+        for _ in range(2):
+            await client.call_tool(
+                CallToolRequest(name="weather", arguments={"city": "Lisboa"})
+            )
+        assert "weather" in client._memoized
+        assert server.methods.count("tools/call") == 2
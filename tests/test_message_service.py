@@ -0,0 +1,41 @@
+"""Tests for webhook message extraction."""
+
+from messaging.message_service import MessageService
+
+
+class TestMessageService:
+    """Test extraction of messages from Evolution API payloads."""
+
+    def test_extract_key_message_structure(self, sample_webhook_payload):
+        """Test extraction from the key/message payload shape."""
+        messages = MessageService.extract_messages(sample_webhook_payload["data"])
+
+        assert messages == [
+            {
+                "from": "5511999999999",
+                "text": "Hello, this is a test message",
+                "timestamp": 1633046400,
+                "id": "test_message_id",
+            }
+        ]
+
+    def test_extract_all_messages_from_messages_structure(self):
+        """Test that every entry of a messages payload is extracted."""
+        data = {
+            "messages": [
+                {"chatId": "551100@s.whatsapp.net", "body": "one", "id": "1"},
+                "not a message",
+                {"body": "missing chat id"},
+                {"chatId": "551100@s.whatsapp.net", "body": "two", "id": "2"},
+            ]
+        }
+
+        messages = MessageService.extract_messages(data)
+
+        assert [m["text"] for m in messages] == ["one", "two"]
+        assert MessageService.extract_message_data(data)["id"] == "1"
+
+    def test_unknown_structure_returns_nothing(self):
+        """Test that unknown payloads are ignored."""
+        assert MessageService.extract_messages({"foo": "bar"}) == []
+        assert MessageService.extract_message_data({"foo": "bar"}) == {}
@@ -0,0 +1,126 @@
+"""Tests for the semantic response cache tier."""
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+from semantic_cache import SemanticIndex
+from shared.metrics import metrics
+
+
+class TestSemanticIndex:
+    """Test the local n-gram vector index."""
+
+    @pytest.fixture
+    def index(self):
+        index = SemanticIndex(dim=2048, capacity=3, threshold=0.5, ttl=60)
+        index.add("hours", "What time do you open?")
+        index.add("price", "How much is a ticket to Lisbon?")
+        return index
+
+    @pytest.mark.parametrize(
+        "cached, query",
+        [
+            ("What time do you open?", "what time do you open??"),
+            ("What time do you open?", "When do you open"),
+            ("What time do you open?", "what time does it open"),
+            ("What are your opening hours?", "opening hours?"),
+            ("Is there wifi in the hotel?", "wifi in the hotel?"),
+        ],
+    )
+    def test_rephrased_message_matches(self, cached, query):
+        """Test that rephrasings which add or drop detail still match."""
+        index = SemanticIndex(dim=2048, capacity=3, threshold=0.5, ttl=60)
+        index.add("cached", cached)
+        index.add("cards", "Do you accept credit cards?")
+
+        assert [key for key, _ in index.lookup(query)] == ["cached"]
+
+    def test_unrelated_message_does_not_match(self, index):
+        """Test that the threshold filters weak matches."""
+        assert index.lookup("Do you accept credit cards?") == []
+
+    @pytest.mark.parametrize(
+        "cached, query",
+        [
+            ("How much is a flight to Rome?", "how much is a flight to paris"),
+            (
+                "How much is a flight to New York today?",
+                "how much is a flight to new york tomorrow",
+            ),
+            (
+                "Is the hotel in Madrid unavailable?",
+                "is the hotel in madrid available",
+            ),
+            ("Rooms for 2 adults", "rooms for 3 adults"),
+            ("how much is a flight to rome", "how much is a flight to paris"),
+            ("Do you have flights?", "do you have flights to Rome"),
+            ("Is the pool open?", "is the pool not open"),
+            ("Is the pool open?", "is the pool open on sunday"),
+        ],
+    )
+    def test_similar_spelling_different_meaning_does_not_match(self, cached, query):
+        """Test that high n-gram overlap alone is not a match."""
+        index = SemanticIndex(dim=2048, capacity=3, threshold=0.5, ttl=60)
+        index.add("cached", cached)
+
+        assert index.lookup(query) == []
+
+    def test_matrix_grows_with_entries(self):
+        """Test that columns are allocated as entries arrive, not upfront."""
+        index = SemanticIndex(dim=2048, capacity=100_000, threshold=0.5, ttl=60)
+        assert index._matrix.size == 0
+
+        for i in range(70):
+            index.add(f"key{i}", f"Question number {i}")
+
+        assert index._matrix.shape == (2048, 128)
+        assert index.lookup("question number 42")[0][0] == "key42"
+
+    def test_remove_and_capacity_eviction(self, index):
+        """Test that removed and evicted keys stop matching."""
+        index.remove("hours")
+        assert index.lookup("What time do you open?") == []
+
+        index.add("cards", "Do you accept credit cards?")
+        index.add("wifi", "Is there wifi in the hotel?")
+        index.add("pets", "Can I bring my dog?")
+
+        assert len(index) == 3
+        assert index.lookup("How much is a ticket to Lisbon?") == []
+
+    def test_expired_entries_are_ignored(self, index):
+        """Test that entries past their TTL are skipped."""
+        with patch("semantic_cache.time.time", return_value=time.time() + 120):
+            assert index.lookup("What time do you open?") == []
+
+
+class TestCacheManagerSemanticTier:
+    """Test the semantic fallback in CacheManager."""
+
+    @pytest.fixture
+    def cache_manager(self, make_cache_manager):
+        return make_cache_manager(
+            semantic_index=SemanticIndex(dim=2048, capacity=10, threshold=0.5, ttl=60)
+        )
+
+    @pytest.mark.asyncio
+    async def test_rephrased_question_hits_cache(self, cache_manager):
+        """Test that a near-duplicate returns the cached response."""
+        metrics.reset()
+        await cache_manager.set_cached_response("What time do you open?", "9am")
+
+        cached = await cache_manager.get_cached_response("When do you open")
+
+        assert cached["response"] == "9am"
+        assert metrics.counters["cache_semantic_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_index_follows_redis_expiry(self, cache_manager):
+        """Test that a match whose Redis entry is gone is dropped."""
+        await cache_manager.set_cached_response("What time do you open?", "9am")
+        await cache_manager.shards.clients["fake"].flushall()
+
+        assert await cache_manager.get_cached_response("what time do you open") is None
+        assert len(cache_manager.semantic_index) == 0
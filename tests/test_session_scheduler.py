@@ -0,0 +1,98 @@
+"""Tests for the per-session scheduler."""
+
+import asyncio
+
+import pytest
+
+from messaging.session_scheduler import SessionScheduler
+
+
+class TestSessionScheduler:
+    """Test ordering, parallelism and mailbox cleanup."""
+
+    @pytest.mark.asyncio
+    async def test_items_for_one_session_run_in_order(self):
+        """Test that a single session never interleaves its items."""
+        events = []
+
+        async def handler(key, batch):
+            events.append(("start", batch[0]))
+            await asyncio.sleep(0.01)
+            events.append(("end", batch[0]))
+
+        scheduler = SessionScheduler(handler, max_concurrency=10, max_pending=100)
+        for i in range(3):
+            await scheduler.submit("whatsapp_1", i)
+        await scheduler.stop()
+
+        assert events == [
+            ("start", 0),
+            ("end", 0),
+            ("start", 1),
+            ("end", 1),
+            ("start", 2),
+            ("end", 2),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_sessions_run_in_parallel(self):
+        """Test that different sessions do not wait for each other."""
+        started = asyncio.Event()
+        release = asyncio.Event()
+        seen = []
+
+        async def handler(key, batch):
+            if key == "slow":
+                started.set()
+                await release.wait()
+            seen.append(key)
+
+        scheduler = SessionScheduler(handler, max_concurrency=10, max_pending=100)
+        await scheduler.submit("slow", 1)
+        await started.wait()
+        await scheduler.submit("fast", 1)
+        await asyncio.sleep(0.01)
+
+        assert seen == ["fast"]
+        release.set()
+        await scheduler.stop()
+        assert seen == ["fast", "slow"]
+
+    @pytest.mark.asyncio
+    async def test_idle_mailboxes_are_released(self):
+        """Test that drained sessions leave no mailbox behind."""
+
+        async def handler(key, batch):
+            return None
+
+        scheduler = SessionScheduler(handler, max_concurrency=10, max_pending=100)
+        for i in range(50):
+            await scheduler.submit(f"whatsapp_{i}", i)
+        assert scheduler.active_sessions == 50
+
+        await scheduler.stop()
+
+        assert scheduler.active_sessions == 0
+        assert scheduler.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_burst_is_coalesced_into_one_batch(self):
+        """Test that messages inside the quiet window are merged."""
+        batches = []
+
+        async def handler(key, batch):
+            batches.append(batch)
+
+        scheduler = SessionScheduler(
+            handler,
+            max_concurrency=10,
+            max_pending=100,
+            coalesce_window=0.05,
+            coalesce_max=3,
+        )
+        for text in ["oi", "tudo bem?", "preciso de ajuda", "ainda ai?"]:
+            await scheduler.submit("whatsapp_1", text)
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+        assert batches == [["oi", "tudo bem?", "preciso de ajuda"], ["ainda ai?"]]
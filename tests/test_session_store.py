@@ -0,0 +1,214 @@
+"""Tests for bounded conversation memory."""
+
+from unittest.mock import patch
+
+import pytest
+from fakeredis import FakeServer, aioredis
+
+from ai.mcp_models import AgentMessage
+from shared.session_store import InMemorySessionStore, RedisSessionStore
+
+
+def user(text):
+    return AgentMessage(role="user", content=text)
+
+
+def assistant(text):
+    return AgentMessage(role="assistant", content=text)
+
+
+def make_store(**overrides):
+    options = {
+        "max_turns": 4,
+        "max_tokens": 10_000,
+        "max_total_tokens": 100_000,
+        "idle_ttl": 3600,
+    }
+    options.update(overrides)
+    return InMemorySessionStore(**options)
+
+
+class TestInMemorySessionStore:
+    """Test turn, token, memory and idle limits."""
+
+    @pytest.mark.asyncio
+    async def test_keeps_latest_turns_and_system_prompt(self):
+        """Test that trimming drops the oldest turns but keeps system messages."""
+        store = make_store()
+        await store.append("s", AgentMessage(role="system", content="be nice"))
+        for i in range(3):
+            await store.append("s", user(f"q{i}"), assistant(f"a{i}"))
+
+        history = await store.get("s")
+
+        assert [m.content for m in history] == ["be nice", "q1", "a1", "q2", "a2"]
+
+    @pytest.mark.asyncio
+    async def test_token_window_is_enforced(self):
+        """Test that a session stays within its token budget."""
+        store = make_store(max_turns=100, max_tokens=30)
+        for i in range(10):
+            await store.append("s", user("x" * 40), assistant(f"a{i}"))
+
+        history = await store.get("s")
+
+        assert history[0].role == "user"
+        assert history[-1].content == "a9"
+        assert len(history) < 20
+
+    @pytest.mark.asyncio
+    async def test_cold_sessions_are_evicted(self):
+        """Test that the least recently used session goes first."""
+        store = make_store(max_total_tokens=20)
+        await store.append("old", user("x" * 40))
+        await store.append("new", user("y" * 40))
+
+        assert await store.get("old") == []
+        assert [m.content for m in await store.get("new")] == ["y" * 40]
+
+    @pytest.mark.asyncio
+    async def test_idle_sessions_expire(self):
+        """Test that sessions idle longer than the TTL are dropped."""
+        store = make_store(idle_ttl=60)
+        with patch("shared.session_store.time.time", return_value=1000.0):
+            await store.append("s", user("hi"))
+        with patch("shared.session_store.time.time", return_value=1100.0):
+            assert await store.get("s") == []
+            assert await store.count() == 0
+
+    @pytest.mark.asyncio
+    async def test_peek_does_not_extend_idle_life(self):
+        """Test that admin reads leave the idle clock alone."""
+        store = make_store(idle_ttl=100)
+        with patch("shared.session_store.time.time", return_value=1000.0):
+            await store.append("s", user("hi"))
+        with patch("shared.session_store.time.time", return_value=1090.0):
+            assert [m.content for m in await store.peek("s")] == ["hi"]
+        with patch("shared.session_store.time.time", return_value=1150.0):
+            assert await store.peek("s") == []
+            assert await store.get("s") == []
+
+    @pytest.mark.asyncio
+    async def test_list_sessions_paginates_with_cursor(self):
+        """Test that pages are disjoint and the last page has no cursor."""
+        store = make_store()
+        for i in range(5):
+            await store.append(f"whatsapp_{i}", user("hi"), assistant("hello"))
+
+        first, cursor = await store.list_sessions(None, 2)
+        second, cursor = await store.list_sessions(cursor, 2)
+        third, cursor = await store.list_sessions(cursor, 2)
+
+        ids = [item.session_id for item in first + second + third]
+        assert ids == [f"whatsapp_{i}" for i in range(5)]
+        assert cursor is None
+        assert first[0].message_count == 2
+
+
+class TestRedisSessionStore:
+    """Test the Redis-backed session store with fake Redis."""
+
+    @pytest.fixture
+    def store(self):
+        store = RedisSessionStore(
+            url="redis://unused", max_turns=4, max_tokens=10_000, idle_ttl=3600
+        )
+        store.redis_client = aioredis.FakeRedis(
+            server=FakeServer(), decode_responses=True
+        )
+        return store
+
+    @pytest.mark.asyncio
+    async def test_append_returns_trimmed_history(self, store):
+        """Test that appends are capped to the latest turns."""
+        await store.append("s", AgentMessage(role="system", content="be nice"))
+        for i in range(3):
+            history = await store.append("s", user(f"q{i}"), assistant(f"a{i}"))
+
+        assert [m.content for m in history] == ["be nice", "q1", "a1", "q2", "a2"]
+        assert [m.content for m in await store.get("s")] == [
+            "be nice",
+            "q1",
+            "a1",
+            "q2",
+            "a2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_sessions_are_shared_between_instances(self, store):
+        """Test that another worker sees the same history."""
+        other = RedisSessionStore(
+            url="redis://unused", max_turns=4, max_tokens=10_000, idle_ttl=3600
+        )
+        other.redis_client = store.redis_client
+        await store.append("s", user("hello"))
+
+        assert [m.content for m in await other.get("s")] == ["hello"]
+        summaries, cursor = await other.list_sessions(None, 10)
+        assert [item.session_id for item in summaries] == ["s"]
+        assert summaries[0].message_count == 1
+        assert cursor is None
+        assert await other.count() == 1
+
+    @pytest.mark.asyncio
+    async def test_list_sessions_pages_never_exceed_limit(self, store):
+        """Test that pages hold at most ``limit`` ids and skip expired ones."""
+        for sid in ["a", "b", "c", "d", "e", "f"]:
+            await store.append(sid, user("hi"))
+        await store.redis_client.zadd(store.index_key, {"c": 0})
+
+        pages, cursor = [], None
+        while True:
+            summaries, cursor = await store.list_sessions(cursor, 2)
+            assert len(summaries) <= 2
+            pages.append([item.session_id for item in summaries])
+            if cursor is None:
+                break
+
+        assert pages == [["a", "b"], ["d", "e"], ["f"]]
+        assert await store.redis_client.zscore(store.ids_key, "c") is None
+
+    @pytest.mark.asyncio
+    async def test_initialize_indexes_existing_sessions_by_id(self, store):
+        """Test that sessions written before the id index are still listed."""
+        await store.append("a", user("hi"))
+        await store.redis_client.delete(store.ids_key)
+
+        with patch(
+            "shared.session_store.redis.from_url", return_value=store.redis_client
+        ):
+            await store.initialize()
+
+        summaries, _ = await store.list_sessions(None, 10)
+        assert [item.session_id for item in summaries] == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_delete_and_clear(self, store):
+        """Test that sessions can be removed individually or all at once."""
+        await store.append("a", user("hi"))
+        await store.append("b", user("hi"))
+
+        assert await store.delete("a") is True
+        assert await store.delete("a") is False
+        await store.clear()
+        assert await store.count() == 0
+        assert await store.get("b") == []
+
+    @pytest.mark.asyncio
+    async def test_compact_removes_only_summarized_turns(self, store):
+        """Test that turns appended after the snapshot survive compaction."""
+        await store.append(
+            "s", user("q0"), assistant("a0"), user("q1"), assistant("a1")
+        )
+        summarized = (await store.get("s"))[:2]
+        await store.append("s", user("q2"))
+        summary = AgentMessage(role="system", content="summary")
+
+        assert await store.compact("s", summary, summarized) is True
+        assert [m.content for m in await store.get("s")] == [
+            "summary",
+            "q1",
+            "a1",
+            "q2",
+        ]
+        assert await store.compact("s", summary, summarized) is False
@@ -0,0 +1,76 @@
+"""Tests for single-flight coalescing of identical LLM requests."""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ai.ai_service import AgentService
+from ai.deepseek_models import ChatCompletion
+from ai.mcp_models import AgentMessage
+
+QUESTION = [AgentMessage(role="user", content="Is the promo still on?")]
+
+
+def make_agent(cache_manager, delay=0.05, fail=False):
+    agent = AgentService(cache_manager)
+
+    async def chat_completion(**kwargs):
+        await asyncio.sleep(delay)
+        if fail:
+            raise Exception("DeepSeek API error: 500")
+        return ChatCompletion(content="Yes, until Sunday", model="deepseek-chat")
+
+    agent.deepseek_service = AsyncMock()
+    agent.deepseek_service.chat_completion.side_effect = chat_completion
+    return agent
+
+
+class TestSingleFlight:
+    """Test that concurrent identical turns share one upstream call."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_call(self, make_cache_manager):
+        """Test in-process followers reuse the leader's answer."""
+        agent = make_agent(make_cache_manager())
+
+        results = await asyncio.gather(*(agent.send(QUESTION) for _ in range(5)))
+
+        assert {r.response for r in results} == {"Yes, until Sunday"}
+        assert agent.deepseek_service.chat_completion.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_other_worker_waits_for_fill(self, make_cache_manager):
+        """Test a second worker waits for the first instead of calling."""
+        leader = make_agent(make_cache_manager())
+        follower = make_agent(make_cache_manager())
+        follower.cache_manager._start_background_tasks()
+        try:
+            await asyncio.sleep(0.01)
+
+            async def send_later():
+                await asyncio.sleep(0.01)
+                return await follower.send(QUESTION)
+
+            results = await asyncio.gather(leader.send(QUESTION), send_later())
+        finally:
+            await follower.cache_manager.close()
+
+        assert {r.response for r in results} == {"Yes, until Sunday"}
+        assert leader.deepseek_service.chat_completion.await_count == 1
+        assert follower.deepseek_service.chat_completion.await_count == 0
+
+    @pytest.mark.asyncio
+    async def test_followers_fall_back_when_leader_fails(self, make_cache_manager):
+        """Test that a failed leader does not fail its followers."""
+        agent = make_agent(make_cache_manager(), fail=True)
+        flight = await agent.single_flight.begin(QUESTION[0].content)
+        follower = asyncio.create_task(agent.single_flight.begin(QUESTION[0].content))
+        await asyncio.sleep(0)
+
+        await agent.single_flight.finish(flight, None)
+        result = await follower
+
+        assert flight.leader is True
+        assert result.leader is False
+        assert result.answer is None
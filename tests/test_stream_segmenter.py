@@ -0,0 +1,46 @@
+"""Tests for splitting streamed replies into WhatsApp messages."""
+
+import pytest
+
+from ai.stream_segmenter import segment_stream
+
+
+async def deltas(text, size=3):
+    for i in range(0, len(text), size):
+        yield text[i : i + size]
+
+
+async def collect(text, min_chars=20, max_chars=60):
+    return [s async for s in segment_stream(deltas(text), min_chars, max_chars)]
+
+
+class TestSegmentStream:
+    """Test sentence and paragraph segmentation."""
+
+    @pytest.mark.asyncio
+    async def test_short_answer_is_a_single_segment(self):
+        """Test that answers below the minimum are sent once."""
+        assert await collect("Opening hours: 9am.") == ["Opening hours: 9am."]
+
+    @pytest.mark.asyncio
+    async def test_long_answer_splits_on_sentences_and_paragraphs(self):
+        """Test that segments end at sentence or paragraph boundaries."""
+        text = (
+            "Lisbon is lovely in spring. The tram costs 3.5 euros.\n\n"
+            "Book the hotel early! Prices rise fast"
+        )
+
+        assert await collect(text) == [
+            "Lisbon is lovely in spring.",
+            "The tram costs 3.5 euros.",
+            "Book the hotel early!",
+            "Prices rise fast",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_text_without_boundaries_is_cut_at_max(self):
+        """Test that run-on text is split at whitespace before max_chars."""
+        segments = await collect("word " * 40)
+
+        assert all(len(s) <= 60 for s in segments)
+        assert " ".join(segments).split() == ["word"] * 40
@@ -0,0 +1,115 @@
+"""Tests for background conversation summarization."""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ai.deepseek_models import ChatCompletion
+from ai.mcp_models import AgentMessage
+from ai.summarizer import SUMMARY_PREFIX, ConversationSummarizer
+from shared.session_store import InMemorySessionStore
+
+
+class TestConversationSummarizer:
+    """Test threshold-triggered compaction."""
+
+    @pytest.fixture
+    def store(self):
+        return InMemorySessionStore(
+            max_turns=100, max_tokens=100_000, max_total_tokens=1_000_000, idle_ttl=3600
+        )
+
+    def make_summarizer(self, store, deepseek_service, threshold_tokens=50):
+        return ConversationSummarizer(
+            store,
+            deepseek_service,
+            threshold_tokens=threshold_tokens,
+            keep_turns=2,
+            model="cheap-model",
+            max_tokens=128,
+        )
+
+    @pytest.mark.asyncio
+    async def test_older_turns_are_replaced_by_summary(self, store):
+        """Test that compaction keeps the last turns verbatim."""
+        deepseek_service = AsyncMock()
+        deepseek_service.chat_completion.return_value = ChatCompletion(
+            content="user is planning a trip", model="cheap-model"
+        )
+        summarizer = self.make_summarizer(store, deepseek_service)
+        for i in range(4):
+            history = await store.append(
+                "s",
+                AgentMessage(role="user", content=f"question {i} " * 10),
+                AgentMessage(role="assistant", content=f"answer {i}"),
+            )
+
+        summarizer.maybe_schedule("s", history)
+        await asyncio.gather(*summarizer._tasks.values())
+
+        compacted = await store.get("s")
+        assert compacted[0].role == "system"
+        assert compacted[0].content == SUMMARY_PREFIX + "user is planning a trip"
+        assert [m.content for m in compacted[1:]] == ["question 3 " * 10, "answer 3"]
+        kwargs = deepseek_service.chat_completion.call_args.kwargs
+        assert kwargs["model"] == "cheap-model"
+
+    @pytest.mark.asyncio
+    async def test_short_sessions_are_not_summarized(self, store):
+        """Test that nothing runs below the token threshold."""
+        deepseek_service = AsyncMock()
+        summarizer = self.make_summarizer(store, deepseek_service, 10_000)
+        history = await store.append("s", AgentMessage(role="user", content="hi"))
+
+        summarizer.maybe_schedule("s", history)
+
+        assert summarizer._tasks == {}
+        deepseek_service.chat_completion.assert_not_called()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "exchanges, expected",
+        [
+            (1, ["q3", "a3", "q4", "a4"]),
+            # Every summarized turn was trimmed, so the summary is dropped
+            (3, ["q3", "a3", "q4", "a4", "q5", "a5", "q6", "a6"]),
+        ],
+    )
+    async def test_turns_appended_during_summary_are_kept(self, exchanges, expected):
+        """Test that only the summarized turns are removed."""
+        store = InMemorySessionStore(
+            max_turns=8, max_tokens=100_000, max_total_tokens=1_000_000, idle_ttl=3600
+        )
+        release = asyncio.Event()
+
+        async def slow_summary(*args, **kwargs):
+            await release.wait()
+            return ChatCompletion(content="summary", model="cheap-model")
+
+        deepseek_service = AsyncMock()
+        deepseek_service.chat_completion.side_effect = slow_summary
+        summarizer = self.make_summarizer(store, deepseek_service)
+        for i in range(4):
+            history = await store.append(
+                "s",
+                AgentMessage(role="user", content=f"q{i}"),
+                AgentMessage(role="assistant", content=f"a{i} " * 20),
+            )
+
+        summarizer.maybe_schedule("s", history)
+        await asyncio.sleep(0)
+        for i in range(4, 4 + exchanges):
+            await store.append(
+                "s",
+                AgentMessage(role="user", content=f"q{i}"),
+                AgentMessage(role="assistant", content=f"a{i} " * 20),
+            )
+        release.set()
+        await asyncio.gather(*summarizer._tasks.values())
+
+        compacted = await store.get("s")
+        assert [
+            m.content.split()[0] for m in compacted if m.role != "system"
+        ] == expected
+        assert (compacted[0].role == "system") is (exchanges == 1)
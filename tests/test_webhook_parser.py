@@ -0,0 +1,37 @@
+"""Tests for raw webhook body parsing."""
+
+import json
+
+import pytest
+
+from messaging.webhook_parser import (
+    WebhookParseError,
+    parse_webhook_batch_body,
+    parse_webhook_body,
+)
+
+
+class TestWebhookParser:
+    """Test the validation-free webhook fast path."""
+
+    def test_parse_single_event(self, sample_webhook_payload):
+        """Test that instance and data are read from the raw body."""
+        payload = parse_webhook_body(json.dumps(sample_webhook_payload).encode())
+
+        assert payload.instance == "test_instance"
+        assert payload.data == sample_webhook_payload["data"]
+
+    def test_parse_batch(self, sample_webhook_payload):
+        """Test that an array body yields one payload per event."""
+        raw = json.dumps([sample_webhook_payload, sample_webhook_payload]).encode()
+
+        assert len(parse_webhook_batch_body(raw)) == 2
+
+    @pytest.mark.parametrize(
+        "raw",
+        [b"not json", b"[]", b'{"instance": 1, "data": {}}', b'{"instance": "x"}'],
+    )
+    def test_invalid_bodies_are_rejected(self, raw):
+        """Test that malformed events raise WebhookParseError."""
+        with pytest.raises(WebhookParseError):
+            parse_webhook_body(raw)